@@ -1,16 +1,22 @@
 import streamlit as st
 import pandas as pd
-import mysql.connector
-import bcrypt
-import random
+from mysql.connector import pooling
 import time
+import threading
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo  # Fallback TZ si CONVERT_TZ no está disponible
 import hmac, hashlib, base64
-from urllib.parse import urlencode
-
-# ================== CONFIG ==================
-st.set_page_config(page_title="VicborDraft", layout="wide")
+import inspect
+import logging
+import perf
+from eta import RATE_REFIT_S, RateModel, RateModelCache
+from routing import ROUTE_STRATEGIES, parse_locations, sequence_items
+from waves import consolidate, put_wall_slots, split_text
+from writebuffer import PickWriteBuffer
+from listview import list_table
+from repository import (PickingRepository, DbClock, make_pool, normalize_search, TZ_BA,
+                        ORDERS_PAGE_SIZE, SEARCH_MIN_CHARS, ORDER_COLUMNS, ORDER_PROGRESS_COLUMNS)
+
+log = logging.getLogger("picking.app")
 
 # ================== HELPERS QUERY PARAMS (compat 1.25+) ==================
 def _qp_get() -> dict:
@@ -30,6 +36,18 @@ def _qp_set(d: dict):
         except Exception:
             pass
 
+# Fragmentos (st.fragment desde 1.37; experimental antes). Sin soporte, la
+# función corre normal dentro del rerun completo.
+_st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def fragment(fn=None, *, run_every=None):
+    """@fragment o @fragment(run_every=segundos) para refrescarse solo."""
+    def wrap(f):
+        if not _st_fragment:
+            return f
+        return _st_fragment(run_every=run_every)(f) if run_every else _st_fragment(f)
+    return wrap(fn) if fn is not None else wrap
+
 # ================== NAV EN QUERY PARAMS ==================
 def _nav_from_qp():
     qp = _qp_get()
@@ -63,7 +81,7 @@ def _nav_to_qp(page: str, pedido: int | None):
         _qp_set(qp)
 
 # ================== ESTILOS ==================
-st.markdown("""
+APP_STYLE = """
 <style>
 .block-container { padding-top: 2.5rem !important; }
 h1, h2, h3 { margin-top: 0.2rem !important; margin-bottom: 0.8rem !important; line-height: 1.2 !important; white-space: normal !important; }
@@ -104,6 +122,7 @@ div.stButton > button {
 .line { display: flex; align-items: center; justify-content: space-between; gap: 12px; width: 100%; }
 .line .sku { overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
 .line .qty { min-width: 72px; text-align: right; }
+.line .loc { font-weight: 600; margin-right: 6px; color: #0b5394; }
 
 /* Encabezado SKU | Cantidad */
 .header-line { display: flex; align-items: center; justify-content: space-between; gap: 12px;
@@ -127,9 +146,9 @@ div.stButton > button {
 .order-dot { display: inline-block; width: 10px; height: 10px; border-radius: 50%; margin-left: 8px; vertical-align: middle; }
 .order-dot.ok { background: #2ecc71; box-shadow: 0 0 0 2px rgba(46,204,113,.2); }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-st.markdown("""
+APP_SCRIPT = """
 <script>
 (function(){
   let startY = 0;
@@ -142,62 +161,72 @@ st.markdown("""
   }, {passive:false});
 })();
 </script>
-""", unsafe_allow_html=True)
+"""
+
+def setup_page():
+    """Config de página, estilos y script; primero en main() (importar el módulo no dibuja nada)."""
+    st.set_page_config(page_title="VicborDraft", layout="wide")
+    st.markdown(APP_STYLE, unsafe_allow_html=True)
+    st.markdown(APP_SCRIPT, unsafe_allow_html=True)
 
 # ================== CONEXIÓN MYSQL ==================
-def get_conn():
-    return mysql.connector.connect(
-        host=st.secrets["app_marco_new"]["host"],
-        user=st.secrets["app_marco_new"]["user"],
-        password=st.secrets["app_marco_new"]["password"],
-        database=st.secrets["app_marco_new"]["database"],
-        port=st.secrets["app_marco_new"].get("port", 3306),
-    )
+# Pool compartido por todo el proceso (todas las sesiones). Configurable en
+# st.secrets["app_marco_new"]: pool_size (default 10, máx. 32), pool_timeout
+# (segundos de espera si el pool está agotado, default 10). Las consultas
+# viven en repository.py; acá solo se arma el repositorio con la caché de
+# Streamlit.
+#
+# Réplica de lectura (opcional): st.secrets["app_marco_new"]["replica"] con
+# host/port/user/password/database/pool_size (lo que falte se toma del
+# primario), más replica_max_lag_s (default 5) y replica_ryw_s (default 15).
+# Listados y tablero leen de la réplica; escrituras, detalle del pedido y las
+# lecturas de una sesión durante replica_ryw_s tras escribir, del primario.
+# El usuario de la réplica necesita REPLICATION CLIENT para medir la demora;
+# sin eso se usa siempre el primario.
+def app_config():
+    return st.secrets["app_marco_new"]
+
+@st.cache_resource
+def get_pool() -> pooling.MySQLConnectionPool:
+    return make_pool(app_config())
+
+@st.cache_resource
+def get_replica_pool() -> pooling.MySQLConnectionPool | None:
+    cfg = app_config()
+    replica = cfg.get("replica")
+    if not replica:
+        return None
+    return make_pool({**cfg, "pool_name": "picking_replica", **replica})
 
-# ================== HELPERS USUARIOS (DB) ==================
-def ensure_usuarios_table():
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(50) NOT NULL UNIQUE,
-            password_hash VARCHAR(255) NOT NULL,
-            nombre VARCHAR(100),
-            rol VARCHAR(50),
-            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit(); cur.close(); conn.close()
-
-def count_usuarios():
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM usuarios")
-    n = cur.fetchone()[0]
-    cur.close(); conn.close()
-    return n
-
-def create_user(username: str, plain_password: str, nombre: str, rol: str):
-    conn = get_conn(); cur = conn.cursor()
-    hashed = bcrypt.hashpw(plain_password.encode("utf-8"), bcrypt.gensalt()).decode()
-    cur.execute(
-        "INSERT INTO usuarios (username, password_hash, nombre, rol) VALUES (%s, %s, %s, %s)",
-        (username, hashed, nombre, rol)
-    )
-    conn.commit(); cur.close(); conn.close()
+@st.cache_data(ttl=600, max_entries=2000)
+def _st_cached(name: str, key: tuple, _loader):
+    return _loader()
 
-def list_users():
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("SELECT username, rol FROM usuarios ORDER BY username")
-    rows = cur.fetchall()
-    cur.close(); conn.close()
-    return rows
+class StreamlitCache:
+    """Caché del repositorio sobre st.cache_data (la clave incluye el token de versión)."""
 
-def set_password(username: str, new_password: str):
-    conn = get_conn(); cur = conn.cursor()
-    hashed = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode()
-    cur.execute("UPDATE usuarios SET password_hash=%s WHERE username=%s", (hashed, username))
-    conn.commit(); cur.close(); conn.close()
+    def get_or_load(self, name, key, loader):
+        return _st_cached(name, key, loader)
 
+    def clear(self):
+        _st_cached.clear()
+
+@st.cache_resource
+def get_repo() -> PickingRepository:
+    cfg = app_config()
+    return PickingRepository(get_pool(), pool_timeout=float(cfg.get("pool_timeout", 10)),
+                             cache=StreamlitCache(), replica_pool=get_replica_pool(),
+                             max_lag_s=float(cfg.get("replica_max_lag_s", 5)))
+
+# ======= Leer lo propio recién escrito =======
+def mark_write():
+    """Tras una escritura de esta sesión, sus lecturas vuelven al primario un rato."""
+    st.session_state["primary_until"] = time.time() + float(app_config().get("replica_ryw_s", 15))
+
+def read_primary() -> bool:
+    return time.time() < st.session_state.get("primary_until", 0.0)
+
+# ================== HELPERS USUARIOS (sesión) ==================
 def get_user_role():
     u = st.session_state.get("user")
     return (u or {}).get("rol")
@@ -272,31 +301,13 @@ def go_and_sync(page: str):
     _nav_to_qp(page, st.session_state.get("selected_pedido"))
 
 # ================== AUTH ==================
-def validar_usuario(username: str, password: str):
-    if not username or not password:
-        return None
-    conn = get_conn(); cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT id, username, password_hash, nombre, rol FROM usuarios WHERE username = %s", (username,))
-    user = cur.fetchone()
-    cur.close(); conn.close()
-
-    if not user:
-        return None
-    stored = user.get("password_hash")
-    if not stored or not isinstance(stored, str) or not stored.startswith("$2"):
-        return None
-    try:
-        ok = bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
-    except ValueError:
-        return None
-    return user if ok else None
-
 def render_setup_panel():
     if st.secrets.get("SETUP_TOKEN") is None:
         return
+    repo = get_repo()
     try:
-        ensure_usuarios_table()
-        if count_usuarios() > 0:
+        repo.ensure_usuarios_table()
+        if repo.count_users() > 0:
             return
     except:
         pass
@@ -305,7 +316,7 @@ def render_setup_panel():
         with col1:
             if st.button("Crear tabla 'usuarios'", use_container_width=True):
                 try:
-                    ensure_usuarios_table()
+                    repo.ensure_usuarios_table()
                     st.success("Tabla 'usuarios' creada/verificada.")
                 except Exception as e:
                     st.error(f"No se pudo crear/verificar la tabla: {e}")
@@ -313,78 +324,18 @@ def render_setup_panel():
             tok = st.text_input("Token de setup", type="password")
             if st.button("Crear admin por defecto (admin / Admin123!)", type="secondary", use_container_width=True):
                 try:
-                    ensure_usuarios_table()
+                    repo.ensure_usuarios_table()
                     if tok != st.secrets.get("SETUP_TOKEN"):
                         st.error("Token inválido.")
                     else:
-                        conn = get_conn(); cur = conn.cursor()
-                        cur.execute("SELECT COUNT(*) FROM usuarios WHERE username=%s", ("admin",))
-                        exists = cur.fetchone()[0] > 0
-                        cur.close(); conn.close()
-                        if exists:
+                        if repo.get_user("admin"):
                             st.info("El usuario 'admin' ya existe.")
                         else:
-                            create_user("admin", "Admin123!", "Administrador", "admin")
+                            repo.create_user("admin", "Admin123!", "Administrador", "admin")
                             st.success("Usuario 'admin' creado. Probá iniciar sesión.")
                 except Exception as e:
                     st.error(f"No se pudo crear el admin: {e}")
 
-# ================== ADMIN PANEL: asignación robusta ==================
-def bulk_assign_usr_pick(pickers: list[str], mode: str = "all",
-                         chunk_size: int = 200, max_retries: int = 3) -> tuple[int, int]:
-    if not pickers:
-        raise ValueError("La lista de pickers está vacía.")
-    conn = get_conn()
-    conn.autocommit = True
-    cur = conn.cursor()
-    try: cur.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
-    except Exception: pass
-    try: cur.execute("SET SESSION innodb_lock_wait_timeout = 5")
-    except Exception: pass
-    if mode == "missing":
-        cur.execute("SELECT DISTINCT NUMERO FROM sap WHERE usr_pick IS NULL OR TRIM(usr_pick) = ''")
-    else:
-        cur.execute("SELECT DISTINCT NUMERO FROM sap")
-    numeros = [r[0] for r in cur.fetchall()]
-    if not numeros:
-        cur.close(); conn.close()
-        return (0, 0)
-    random.shuffle(numeros)
-    pedidos_afectados = 0
-    filas_actualizadas = 0
-    for i in range(0, len(numeros), chunk_size):
-        chunk = numeros[i:i+chunk_size]
-        for num in chunk:
-            usr = random.choice(pickers)
-            for attempt in range(max_retries):
-                try:
-                    if mode == "missing":
-                        cur.execute("""
-                            UPDATE sap
-                               SET usr_pick = %s
-                             WHERE NUMERO = %s
-                               AND (usr_pick IS NULL OR TRIM(usr_pick) = '')
-                        """, (usr, num))
-                    else:
-                        cur.execute("""
-                            UPDATE sap
-                               SET usr_pick = %s
-                             WHERE NUMERO = %s
-                        """, (usr, num))
-                    if cur.rowcount and cur.rowcount > 0:
-                        filas_actualizadas += cur.rowcount
-                        pedidos_afectados += 1
-                    break
-                except mysql.connector.errors.DatabaseError as e:
-                    if getattr(e, "errno", None) in (1205, 1213):
-                        time.sleep(0.4 * (attempt + 1) + random.random() * 0.3)
-                        continue
-                    else:
-                        cur.close(); conn.close()
-                        raise
-    cur.close(); conn.close()
-    return (pedidos_afectados, filas_actualizadas)
-
 # ================== LOGIN ==================
 def require_login():
     if "user" not in st.session_state:
@@ -402,13 +353,7 @@ def require_login():
             data = parse_auth_token(tok)
             if data:
                 try:
-                    conn = get_conn(); cur = conn.cursor(dictionary=True)
-                    cur.execute(
-                        "SELECT id, username, password_hash, nombre, rol FROM usuarios WHERE username=%s",
-                        (data["username"],)
-                    )
-                    u = cur.fetchone()
-                    cur.close(); conn.close()
+                    u = get_repo().get_user(data["username"])
                     if u and u.get("rol") == data.get("rol"):
                         st.session_state.user = u
                 except Exception:
@@ -443,18 +388,18 @@ def require_login():
     st.markdown('</div>', unsafe_allow_html=True)
 
     try:
-        if count_usuarios() == 0 and st.secrets.get("SETUP_TOKEN") is not None:
+        if get_repo().count_users() == 0 and st.secrets.get("SETUP_TOKEN") is not None:
             render_setup_panel()
     except Exception as e:
         st.error(f"Error verificando usuarios: {e}")
 
     if login_clicked:
         try:
-            ensure_usuarios_table()
+            get_repo().ensure_usuarios_table()
         except Exception as e:
             st.error(f"Error preparando tabla de usuarios: {e}")
             return False
-        user = validar_usuario(username, password)
+        user = get_repo().validate_user(username, password)
         if user:
             st.session_state.user = user
             t = issue_auth_token(user["username"], user.get("rol",""))
@@ -466,197 +411,168 @@ def require_login():
     return False
 
 # ================== DATA ACCESS ==================
-@st.cache_data(ttl=30)
-def get_orders(buscar: str | None = None) -> pd.DataFrame:
+def with_progress(orders_df: pd.DataFrame, primary: bool = False) -> pd.DataFrame:
     """
-    Trae TODOS los pedidos (sin filtrar por usuario),
-    con CLIENTE, usr_pick, rs, empresa y color_val (sap_color.color).
+    Agrega total_items / picked_items / has_any_y a un listado de get_orders().
+    El token es el de los pedidos mostrados: un toggle en otro pedido no lo invalida.
     """
-    params = []
-    where = []
-    base_from = """
-        FROM sap s
-        LEFT JOIN sap_color sc ON sc.empresa = s.empresa
+    numeros = tuple(int(n) for n in orders_df["NUMERO"].tolist())
+    repo = get_repo()
+    token = repo.cache_token(*[f"order:{n}" for n in numeros], primary=primary)
+    prog = repo.orders_progress(numeros, token=token, primary=primary)
+    out = orders_df.merge(prog, on="NUMERO", how="left")
+    out["total_items"] = out["total_items"].fillna(0).astype(int)
+    out["picked_items"] = out["picked_items"].fillna(0).astype(int)
+    out["has_any_y"] = out["has_any_y"].fillna(False).astype(bool)
+    return out
+
+def load_order_pages(state_key: str, **filters) -> tuple[pd.DataFrame, bool]:
     """
-    if buscar:
-        where.append("(CAST(s.NUMERO AS CHAR) LIKE %s OR s.CLIENTE LIKE %s OR CAST(s.rs AS CHAR) LIKE %s)")
-        params.extend([f"%{buscar}%", f"%{buscar}%", f"%{buscar}%"])
-    where_sql = (" WHERE " + " AND ".join(where)) if where else ""
-    q = f"""
-        SELECT
-          s.NUMERO,
-          MIN(s.CLIENTE) AS CLIENTE,
-          MIN(s.usr_pick) AS usr_pick,
-          MIN(s.rs) AS rs,
-          MIN(s.empresa) AS empresa,
-          MIN(sc.color) AS color_val
-        {base_from}
-        {where_sql}
-        GROUP BY s.NUMERO
-        ORDER BY s.NUMERO DESC
-        LIMIT 150
+    Páginas de get_orders() ya cargadas para un listado (con avance incluido).
+    La cantidad de páginas vive en session_state y vuelve a 1 cuando cambian
+    los filtros. Devuelve (pedidos, hay_mas).
     """
-    conn = get_conn()
-    df = pd.read_sql(q, conn, params=params)
-    conn.close()
-    if "CLIENTE" in df.columns:
-        df["CLIENTE"] = df["CLIENTE"].apply(
-            lambda x: str(int(x)) if isinstance(x,(int,float)) and float(x).is_integer() else str(x)
-        )
-    for col in ("rs","empresa","usr_pick","color_val"):
-        if col in df.columns:
-            df[col] = df[col].apply(lambda x: "" if x is None else str(x))
-    return df
-
-@st.cache_data(ttl=30)
-def get_distinct_users() -> list[str]:
-    """Usuarios distintos en usr_pick (no vacíos)."""
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("SELECT DISTINCT TRIM(usr_pick) FROM sap WHERE TRIM(COALESCE(usr_pick,'')) <> '' ORDER BY 1")
-    rows = [r[0] for r in cur.fetchall() if r and r[0]]
-    cur.close(); conn.close()
-    return rows
-
-@st.cache_data(ttl=30)
-def get_user_progress() -> pd.DataFrame:
+    sig = repr(sorted(filters.items()))
+    key = f"pages_{state_key}"
+    state = st.session_state.get(key)
+    if not state or state.get("sig") != sig:
+        state = {"sig": sig, "n": 1}
+        st.session_state[key] = state
+    usr = filters.get("usr_pick")
+    repo = get_repo()
+    primary = read_primary()  # token y datos de la misma fuente
+    scopes = ("users", f"user:{usr}") if usr else ("orders",)
+    token = repo.cache_token(*scopes, primary=primary)
+    frames, cursor, has_more = [], None, False
+    for _ in range(state["n"]):
+        page = repo.orders(**filters, before=cursor, page_size=ORDERS_PAGE_SIZE, token=token, primary=primary)
+        if page.empty:
+            has_more = False
+            break
+        frames.append(with_progress(page, primary))
+        has_more = len(page) == ORDERS_PAGE_SIZE
+        if not has_more:
+            break
+        cursor = int(page["NUMERO"].iloc[-1])
+    if not frames:
+        return pd.DataFrame(columns=ORDER_COLUMNS + ORDER_PROGRESS_COLUMNS[1:]), False
+    return pd.concat(frames, ignore_index=True), has_more
+
+def _more_pages(state_key: str):
+    st.session_state[f"pages_{state_key}"]["n"] += 1
+
+def render_load_more(state_key: str):
+    st.button("Cargar más pedidos", key=f"more_{state_key}", on_click=_more_pages,
+              args=(state_key,), use_container_width=True)
+
+# ======= Write-behind de toggles de picking =======
+@st.cache_resource
+def get_pick_buffer() -> PickWriteBuffer:
+    window = float(app_config().get("pick_flush_s", 2))
+    return PickWriteBuffer(window, get_repo())
+
+def flush_order_picks(numero: int):
+    """Vuelca los toggles pendientes de un pedido (al salir del detalle / confirmar)."""
+    get_pick_buffer().flush(numero)
+
+# ======= Agregador de avance del equipo =======
+class ProgressAggregator:
     """
-    Avance por usuario (usr_pick):
-      - usuario: TRIM(sap.usr_pick)
-      - pedidos: COUNT(DISTINCT NUMERO)
-      - items: COUNT(*)
-      - qty_total: SUM(CANTIDAD)
-      - qty_picked: SUM(CANTIDAD) donde PICKING='Y'
-    Solo considera usr_pick no vacíos.
+    Avance por usuario compartido por todas las sesiones del proceso. Un hilo
+    de fondo revisa el token "progress" cada `poll` segundos —o al instante si
+    una escritura de este proceso lo confirma (publish_versions)— y solo cuando
+    cambió vuelve a agregar. Los tableros leen el snapshot en memoria, así
+    que N supervisores mirando no suman consultas.
     """
-    conn = get_conn()
-    try:
-        sql = """
-            SELECT
-                TRIM(COALESCE(usr_pick,'')) AS usuario,
-                COUNT(DISTINCT NUMERO)      AS pedidos,
-                COUNT(*)                    AS items,
-                SUM(COALESCE(CAST(CANTIDAD AS DECIMAL(18,3)),0)) AS qty_total,
-                SUM(
-                    CASE
-                        WHEN UPPER(COALESCE(PICKING,'N')) = 'Y'
-                             THEN COALESCE(CAST(CANTIDAD AS DECIMAL(18,3)),0)
-                        ELSE 0
-                    END
-                ) AS qty_picked
-            FROM sap
-            WHERE TRIM(COALESCE(usr_pick,'')) <> ''
-            GROUP BY TRIM(COALESCE(usr_pick,''))
-            ORDER BY usuario
-        """
-        df = pd.read_sql(sql, conn)
-    finally:
-        conn.close()
-
-    # Normalizo tipos
-    for c in ("pedidos", "items"):
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
-    for c in ("qty_total", "qty_picked"):
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
-
-    if df is None or df.empty:
-        return pd.DataFrame(columns=["usuario","pedidos","items","qty_total","qty_picked"])
-    return df
-
-def get_order_items(numero: int) -> pd.DataFrame:
-    conn = get_conn()
-    df = pd.read_sql(
-        """
-        SELECT NUMERO, CLIENTE, CODIGO, ItemName, CANTIDAD, COALESCE(PICKING, 'N') AS PICKING, TS, empresa
-        FROM sap
-        WHERE NUMERO = %s
-        ORDER BY CODIGO
-        """,
-        conn, params=[numero]
-    )
-    conn.close()
-    df["PICKING"] = df["PICKING"].fillna("N").astype(str).str.strip().str.upper().replace({"": "N"})
-    if "CLIENTE" in df.columns:
-        df["CLIENTE"] = df["CLIENTE"].apply(
-            lambda x: str(int(x)) if isinstance(x,(int,float)) and float(x).is_integer() else str(x)
-        )
-    if "ItemName" in df.columns:
-        df["ItemName"] = df["ItemName"].apply(lambda x: "" if x is None else str(x))
-    df["CANTIDAD"] = pd.to_numeric(df["CANTIDAD"], errors="coerce").fillna(0)
-    df["CANTIDAD"] = df["CANTIDAD"].apply(lambda x: int(x) if float(x).is_integer() else x)
-    return df
-
-def update_picking_bulk(numero: int, sku_to_flag: list[tuple[str, str]]):
-    if not sku_to_flag:
-        return
-    conn = get_conn(); cur = conn.cursor()
-    cur.executemany(
-        "UPDATE sap SET PICKING = %s WHERE NUMERO = %s AND CODIGO = %s",
-        [(flag, numero, codigo) for (codigo, flag) in sku_to_flag]
-    )
-    conn.commit()
-    cur.close(); conn.close()
 
-def mark_order_all_items_Y(numero: int):
-    """Marca Y en TODOS los ítems, sella TS nulos y guarda TS_C."""
-    conn = get_conn(); cur = conn.cursor()
-    try:
-        cur.execute("UPDATE sap SET PICKING = 'Y' WHERE NUMERO = %s", (numero,))
-        cur.execute("UPDATE sap SET TS = NOW() WHERE NUMERO = %s AND TS IS NULL", (numero,))
-        cur.execute("UPDATE sap SET TS_C = NOW() WHERE NUMERO = %s", (numero,))
-        conn.commit()
-    finally:
-        cur.close(); conn.close()
+    def __init__(self, poll: float, repo: PickingRepository):
+        self.poll = poll
+        self._repo = repo
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._token: tuple | None = None
+        self._df: pd.DataFrame | None = None
+        self.updated_at: float | None = None
+        repo.add_version_listener(self._on_bump)
+        self._thread = threading.Thread(target=self._run, name="team-progress", daemon=True)
+        self._thread.start()
+
+    def _on_bump(self, scopes):
+        if "progress" in scopes or "sap" in scopes:
+            self._wake.set()
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-agrega si cambió el token (o si force). Devuelve True si recalculó."""
+        token = self._repo.cache_token("progress", primary=False)
+        if not force and self._df is not None and token == self._token:
+            return False
+        df = self._repo.read_user_progress()
+        with self._lock:
+            self._token, self._df, self.updated_at = token, df, time.time()
+        return True
+
+    def snapshot(self) -> pd.DataFrame:
+        with self._lock:
+            df = self._df
+        if df is None:  # primer uso: no esperar al hilo
+            self.refresh()
+            with self._lock:
+                df = self._df
+        return df.copy()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                log.warning("No se pudo refrescar el avance agregado; se reintenta en la próxima vuelta", exc_info=True)
+
+@st.cache_resource
+def get_progress_aggregator() -> ProgressAggregator:
+    poll = float(app_config().get("progress_poll_s", 5))
+    return ProgressAggregator(poll, get_repo())
+
+DASHBOARD_REFRESH_S = 10  # default de secrets.dashboard_refresh_s
+
+# ======= Pedidos nuevos en order_header =======
+HEADER_SYNC_S = 60  # default de secrets.header_sync_s
+
+@st.cache_resource
+def start_header_sync() -> threading.Thread:
+    """
+    Un hilo por proceso que cada header_sync_s suma a order_header los pedidos
+    que llegaron a sap por una recarga de SAP (sync_order_header).
+    """
+    every, repo = float(app_config().get("header_sync_s", HEADER_SYNC_S)), get_repo()
+    def run():
+        while True:
+            time.sleep(every)
+            try:
+                repo.sync_order_header()
+            except Exception:
+                log.warning("sync_order_header falló; se reintenta en %.0f s", every, exc_info=True)
+    th = threading.Thread(target=run, name="header-sync", daemon=True)
+    th.start()
+    return th
 
 # ======= TS / ETA helpers =======
-def get_order_timing(numero: int):
-    conn = get_conn(); cur = conn.cursor()
-    try:
-        cur.execute("""
-            SELECT
-              MAX(TS) AS ts_start,
-              CASE WHEN MAX(TS) IS NULL
-                   THEN NULL
-                   ELSE TIMESTAMPDIFF(MINUTE, MAX(TS), NOW())
-              END AS elapsed_min,
-              CONVERT_TZ(NOW(), @@session.time_zone, 'America/Argentina/Buenos_Aires')   AS now_ar,
-              CONVERT_TZ(MAX(TS), @@session.time_zone, 'America/Argentina/Buenos_Aires') AS ts_start_ar
-            FROM sap
-            WHERE NUMERO = %s
-        """, (numero,))
-        row = cur.fetchone()
-    finally:
-        cur.close(); conn.close()
-    ts_start    = row[0] if row else None
-    elapsed_min = row[1] if row and row[1] is not None else None
-    now_ar      = row[2] if row else None
-    ts_start_ar = row[3] if row else None
-    return ts_start, elapsed_min, now_ar, ts_start_ar
+@st.cache_resource
+def get_db_clock() -> DbClock:
+    refresh = float(app_config().get("clock_refresh_s", 600))
+    return DbClock(get_repo(), refresh)
+
+# ======= Modelo de ritmo (ETA / pronósticos) =======
+@st.cache_resource
+def get_rate_models() -> RateModelCache:
+    return RateModelCache(get_repo(), refit_s=float(app_config().get("eta_refit_s", RATE_REFIT_S)))
+
+def rate_model() -> RateModel:
+    return get_rate_models().model()
 
 def mysql_now_ba():
-    conn = get_conn(); cur = conn.cursor()
-    try:
-        cur.execute("SELECT CONVERT_TZ(NOW(), @@session.time_zone, 'America/Argentina/Buenos_Aires')")
-        row = cur.fetchone()
-        return row[0] if row else None
-    finally:
-        cur.close(); conn.close()
-
-def ensure_ts_if_started(numero: int):
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("""
-        SELECT SUM(CASE WHEN UPPER(COALESCE(PICKING,'N'))='Y' THEN 1 ELSE 0 END)
-        FROM sap WHERE NUMERO = %s
-    """, (numero,))
-    cnt_y = cur.fetchone()[0] or 0
-    if cnt_y > 0:
-        cur.execute("SELECT MIN(TS) FROM sap WHERE NUMERO = %s", (numero,))
-        has_ts = cur.fetchone()[0]
-        if not has_ts:
-            cur.execute("UPDATE sap SET TS = NOW() WHERE NUMERO = %s AND TS IS NULL", (numero,))
-            conn.commit()
-    cur.close(); conn.close()
+    return get_db_clock().now_ba()
 
 def fmt_duration(minutes: float) -> str:
     if minutes <= 0:
@@ -675,16 +591,21 @@ def render_topbar():
     with c1:
         st.title("VicborDraft")
     with csp:
-        n1, n2 = st.columns(2)
-        n1.button("Pedidos", on_click=go_and_sync, args=("list",), use_container_width=True)
-        n2.button("Equipo",  on_click=go_and_sync, args=("team",), use_container_width=True)
+        is_admin = get_user_role() == "admin"
+        navs = st.columns(5 if is_admin else 3)
+        navs[0].button("Pedidos", on_click=go_and_sync, args=("list",), use_container_width=True)
+        navs[1].button("Equipo",  on_click=go_and_sync, args=("team",), use_container_width=True)
+        navs[2].button("Ola",     on_click=go_and_sync, args=("wave",), use_container_width=True)
+        if is_admin:
+            navs[3].button("Admin", on_click=go_and_sync, args=("admin",), use_container_width=True)
+            navs[4].button("Diagnóstico", on_click=go_and_sync, args=("diag",), use_container_width=True)
     with c2:
         if st.button("Cerrar sesión", use_container_width=True):
             clear_query_auth()
             _qp_set({})
             st.session_state.user = None
             for k in list(st.session_state.keys()):
-                if k.startswith("pick_") or k.startswith("btn_pick_"):
+                if k.startswith(("pick_", "btn_pick_", "items_", "wave")):
                     del st.session_state[k]
                 if k in ("team_selected_user", "selected_pedido", "page"):
                     del st.session_state[k]
@@ -700,63 +621,119 @@ def page_list():
     with c1:
         buscar = st.text_input("Buscar por cliente, número o RS", placeholder="Ej: DIA, 100023120 o RS")
     with c2:
-        users = ["Todos"] + get_distinct_users()
+        repo, primary = get_repo(), read_primary()
+        users = ["Todos"] + repo.distinct_users(token=repo.cache_token("users", primary=primary), primary=primary)
         sel_user = st.selectbox("Filtrar por usuario asignado", users, index=0)
 
-    orders_df = get_orders(buscar=buscar)
+    # El texto se confirma con Enter / al salir del campo; además, los textos
+    # cortos no consultan y las variantes equivalentes comparten caché.
+    buscar_q = normalize_search(buscar)
+    if buscar.strip() and buscar_q is None:
+        st.caption(f"Ingresá al menos {SEARCH_MIN_CHARS} caracteres para buscar por cliente o RS.")
+    st.checkbox("Vista compacta", value=_list_mode() == "compact", key="list_compact",
+                help="Una tabla liviana para tablets; tocar una fila abre el detalle.")
 
-    # Filtro por usuario
-    if sel_user != "Todos":
-        orders_df = orders_df[orders_df["usr_pick"].astype(str).str.lower() == sel_user.lower()]
+    orders_df, has_more = load_order_pages(
+        "list", buscar=buscar_q, usr_pick=None if sel_user == "Todos" else sel_user
+    )
 
     st.markdown("**Resultados**")
     if orders_df.empty:
         st.info("No hay pedidos para mostrar.")
+        if has_more:
+            render_load_more("list")
         return
 
-    idx, total = 0, len(orders_df)
-    while idx < total:
-        cols = st.columns([1,1,1])
-        for col in cols:
-            if idx >= total: break
-            row = orders_df.iloc[idx]
-            numero   = row.NUMERO
-            cliente  = row.CLIENTE
-            rs_val   = str(row.get("rs",""))
-            empresa  = str(row.get("empresa",""))
-            assign   = str(row.get("usr_pick","")) or "—"
-            bg       = str(row.get("color_val","")).strip() or ""
-
-            items = get_order_items(numero)
-            total_items = len(items)
-            has_any_y = (items["PICKING"] == "Y").any()
-            picked = (items["PICKING"] == "Y").sum() if total_items > 0 else 0
-            pct = int((picked / total_items) * 100) if total_items > 0 else 0
-
-            with col:
-                extra_style = f' style="background:{bg}; border-color: rgba(0,0,0,0.08);"' if bg else ""
-                st.markdown(f'<div class="card"{extra_style}>', unsafe_allow_html=True)
-
-                title_html = f"<h4>Pedido #{numero}"
-                if has_any_y:
-                    title_html += '<span class="order-dot ok" title="Con picking confirmado"></span>'
-                title_html += "</h4>"
-                st.markdown(title_html, unsafe_allow_html=True)
-
-                st.markdown(
-                    f"<div><small>Cliente:</small> <b>{cliente}</b>"
-                    + (f" &nbsp;·&nbsp; <small>RS:</small> <b>{rs_val or '-'}</b>")
-                    + (f" &nbsp;·&nbsp; <small>Empresa:</small> <b>{empresa or '-'}</b>")
-                    + (f" &nbsp;·&nbsp; <small>Asignado:</small> <b>{assign}</b>")
-                    + "</div>",
-                    unsafe_allow_html=True
-                )
-                st.progress(pct/100 if total_items>0 else 0.0)
-                st.caption(f"Picking: {picked}/{total_items} ({pct}%)")
-                if st.button("Ver detalle", key=f"open_{numero}", use_container_width=True):
-                    nav_to("detail", selected_pedido=int(numero))
-                st.markdown("</div>", unsafe_allow_html=True)
-            idx += 1
+    if st.session_state.get("list_compact", _list_mode() == "compact"):
+        render_list_table(orders_df)
+    else:
+        render_list_cards(orders_df)
+    if has_more:
+        render_load_more("list")
+
+def render_list_cards(orders_df: pd.DataFrame):
+    sent_bytes = 0
+    with perf.timed("render.list_cards"):
+        idx, total = 0, len(orders_df)
+        while idx < total:
+            cols = st.columns([1,1,1])
+            for col in cols:
+                if idx >= total: break
+                row = orders_df.iloc[idx]
+                numero   = row.NUMERO
+                cliente  = row.CLIENTE
+                rs_val   = str(row.get("rs",""))
+                empresa  = str(row.get("empresa",""))
+                assign   = str(row.get("usr_pick","")) or "—"
+                bg       = str(row.get("color_val","")).strip() or ""
+
+                total_items = int(row.total_items)
+                has_any_y = bool(row.has_any_y)
+                picked = int(row.picked_items)
+                pct = int((picked / total_items) * 100) if total_items > 0 else 0
+
+                with col:
+                    extra_style = f' style="background:{bg}; border-color: rgba(0,0,0,0.08);"' if bg else ""
+                    st.markdown(f'<div class="card"{extra_style}>', unsafe_allow_html=True)
+
+                    title_html = f"<h4>Pedido #{numero}"
+                    if has_any_y:
+                        title_html += '<span class="order-dot ok" title="Con picking confirmado"></span>'
+                    title_html += "</h4>"
+                    st.markdown(title_html, unsafe_allow_html=True)
+
+                    info_html = (
+                        f"<div><small>Cliente:</small> <b>{cliente}</b>"
+                        + (f" &nbsp;·&nbsp; <small>RS:</small> <b>{rs_val or '-'}</b>")
+                        + (f" &nbsp;·&nbsp; <small>Empresa:</small> <b>{empresa or '-'}</b>")
+                        + (f" &nbsp;·&nbsp; <small>Asignado:</small> <b>{assign}</b>")
+                        + "</div>"
+                    )
+                    st.markdown(info_html, unsafe_allow_html=True)
+                    st.progress(pct/100 if total_items>0 else 0.0)
+                    st.caption(f"Picking: {picked}/{total_items} ({pct}%)")
+                    if st.button("Ver detalle", key=f"open_{numero}", use_container_width=True):
+                        nav_to("detail", selected_pedido=int(numero))
+                    st.markdown("</div>", unsafe_allow_html=True)
+                    sent_bytes += len(extra_style) + len(title_html) + len(info_html) + 60
+                idx += 1
+    # ~8 elementos por tarjeta (4 markdown, progress, caption, button + columna)
+    perf.annotate(list_mode="cards", list_elements=8 * len(orders_df),
+                  list_html_kb=round(sent_bytes / 1024, 1))
+
+# ======= Listado compacto (una tabla) =======
+LIST_MODE = "cards"  # default de secrets.list_mode: cards | compact (opt-in)
+_DF_SELECT = "on_select" in inspect.signature(st.dataframe).parameters  # Streamlit >= 1.35
+
+def _list_mode() -> str:
+    return str(app_config().get("list_mode", LIST_MODE))
+
+def render_list_table(orders_df: pd.DataFrame):
+    """
+    Todo el listado en un st.dataframe: elegir una fila abre el detalle en la
+    misma sesión (búsqueda, páginas cargadas y buffer de picks quedan). La
+    key cambia en cada apertura para que al volver no quede la fila elegida.
+    """
+    table = list_table(orders_df)
+    gen = st.session_state.setdefault("list_table_gen", 0)
+    config = {"Avance": st.column_config.ProgressColumn("Avance", format="%d%%", min_value=0, max_value=100),
+              "Pedido": st.column_config.NumberColumn("Pedido", format="%d"),
+              "Confirmado": st.column_config.CheckboxColumn("Confirmado")}
+    with perf.timed("render.list_table"):
+        if _DF_SELECT:
+            event = st.dataframe(table, key=f"list_table_{gen}", on_select="rerun", selection_mode="single-row",
+                                 hide_index=True, use_container_width=True, column_config=config)
+            rows = event.selection.rows
+        else:
+            st.dataframe(table, hide_index=True, use_container_width=True, column_config=config)
+            c1, c2 = st.columns([3, 1])
+            sel = c1.selectbox("Pedido", table["Pedido"].tolist(), key=f"list_pick_{gen}", label_visibility="collapsed")
+            rows = [table.index[table["Pedido"] == sel][0]] if c2.button("Ver detalle", key="list_open") else []
+    # sin HTML propio: el peso de la tabla (Arrow) lo mide bench/bench_list.py
+    perf.annotate(list_mode="compact", list_elements=1 if _DF_SELECT else 4, list_html_kb=0.0)
+    if rows:
+        st.session_state["list_table_gen"] = gen + 1
+        nav_to("detail", selected_pedido=int(table["Pedido"].iat[rows[0]]))
 
 # ================== PÁGINA: EQUIPO ==================
 def render_team_dashboard():
@@ -768,11 +745,62 @@ def render_team_dashboard():
         return
 
     st.subheader("Equipo – Avance por usuario (usr_pick)")
-    df = get_user_progress()
+    filtro = st.text_input("Filtrar usuario", "")
+    # el intervalo se lee en cada rerun: cambiar dashboard_refresh_s no pide reiniciar
+    fragment(run_every=_dashboard_refresh_s())(render_team_cards)(filtro)
+
+def _dashboard_refresh_s() -> float:
+    try:
+        return float(app_config().get("dashboard_refresh_s", DASHBOARD_REFRESH_S))
+    except Exception:
+        return DASHBOARD_REFRESH_S
+
+def render_shift_forecast(df: pd.DataFrame, now: datetime):
+    """Pronóstico del turno: cuándo termina el último usuario con lo asignado (y contra secrets.shift_end, "HH:MM")."""
+    pending = df[df["restante_min"] > 0]
+    if pending.empty:
+        st.caption("Pronóstico del turno: no queda trabajo asignado pendiente.")
+        return
+    last = pending.loc[pending["restante_min"].idxmax()]
+    fin = now + timedelta(minutes=float(last["restante_min"]))
+    txt = (f"Pronóstico del turno: {len(pending)} usuarios con trabajo pendiente · "
+           f"el último ({last['usuario']}) termina ~{fin.strftime('%H:%M')}")
+    shift_end = app_config().get("shift_end")
+    if shift_end:
+        try:
+            hh, mm = (int(x) for x in str(shift_end).split(":"))
+            end = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
+            late = (fin - end).total_seconds() / 60.0
+            txt += (f" · excede el fin de turno ({shift_end}) por {fmt_duration(late)}" if late > 0
+                    else f" · dentro del turno ({shift_end})")
+        except Exception:
+            pass
+    st.caption(txt)
+
+def render_team_cards(filtro: str = ""):
+    """
+    Tarjetas por usuario desde el agregador en memoria. render_team_dashboard
+    la corre como fragmento que se re-dibuja solo cada dashboard_refresh_s.
+    """
+    agg = get_progress_aggregator()
+    df = agg.snapshot()
     if df.empty:
         st.info("No hay pedidos asignados a usuarios (usr_pick está vacío).")
         return
-    filtro = st.text_input("Filtrar usuario", "")
+    if agg.updated_at:
+        st.caption(f"Actualizado: {datetime.fromtimestamp(agg.updated_at, TZ_BA).strftime('%H:%M:%S')}")
+
+    # Pronóstico: minutos de trabajo pendiente de cada usuario según su ritmo histórico
+    model = rate_model()
+    df = df.assign(restante_min=[
+        float(model.minutes(max(int(r.items) - int(r.items_picked), 0), max(float(r.qty_total) - float(r.qty_picked), 0.0),
+                            str(r.usuario), pedidos=int(r.pedidos_abiertos)))
+        for r in df.itertuples()])
+    try:
+        now = mysql_now_ba()
+    except Exception:
+        now = datetime.now(TZ_BA)
+    render_shift_forecast(df, now)
     if filtro:
         df = df[df["usuario"].astype(str).str.contains(filtro, case=False, na=False)]
 
@@ -788,6 +816,7 @@ def render_team_dashboard():
             qty_total = float(r.get("qty_total", 0) or 0)
             qty_picked = float(r.get("qty_picked", 0) or 0)
             pct = int((qty_picked/qty_total)*100) if qty_total > 0 else 0
+            restante = float(r.get("restante_min", 0) or 0)
 
             with col:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -795,6 +824,9 @@ def render_team_dashboard():
                 st.caption(f"Pedidos: {pedidos} · Ítems: {items}")
                 st.progress((qty_picked/qty_total) if qty_total > 0 else 0.0)
                 st.caption(f"Avance por cantidades: {int(qty_picked)}/{int(qty_total)} ({pct}%)")
+                if restante > 0:
+                    st.caption(f"Termina ~{(now + timedelta(minutes=restante)).strftime('%H:%M')} "
+                               f"(faltan {fmt_duration(restante)})")
                 if st.button("Ver pedidos", key=f"ver_{usuario}", use_container_width=True):
                     st.session_state.team_selected_user = usuario
                     go_and_sync("team_user")
@@ -824,8 +856,7 @@ def page_team_user_orders():
     with h_right:
         st.button("← Seleccionar otro usuario", on_click=go_and_sync, args=("team",), use_container_width=True)
 
-    from_data = get_orders()
-    odf = from_data[from_data["usr_pick"].astype(str).str.lower() == sel.lower()]
+    odf, has_more = load_order_pages("team_user", usr_pick=sel)
     if odf.empty:
         st.info("No hay pedidos para este usuario.")
         c1, c2 = st.columns([1,1])
@@ -848,10 +879,9 @@ def page_team_user_orders():
             assign   = str(row.get("usr_pick","")) or "—"
             bg       = str(row.get("color_val","")).strip() or ""
 
-            items_df = get_order_items(numero)
-            total_items = len(items_df)
-            has_any_y = (items_df["PICKING"] == "Y").any()
-            picked = (items_df["PICKING"] == "Y").sum() if total_items > 0 else 0
+            total_items = int(row.total_items)
+            has_any_y = bool(row.has_any_y)
+            picked = int(row.picked_items)
             pct_card = int((picked/total_items)*100) if total_items > 0 else 0
 
             with c:
@@ -879,6 +909,9 @@ def page_team_user_orders():
                 st.markdown("</div>", unsafe_allow_html=True)
             i2 += 1
 
+    if has_more:
+        render_load_more("team_user")
+
     c1, c2 = st.columns([1,1])
     with c1:
         st.button("← Volver al equipo", on_click=go_and_sync, args=("team",), use_container_width=True)
@@ -886,40 +919,53 @@ def page_team_user_orders():
         st.button("Ir a Pedidos", on_click=go_and_sync, args=("list",), use_container_width=True)
 
 # ================== PÁGINA: DETALLE ==================
-def page_detail():
-    numero = st.session_state.selected_pedido
-
-    if not numero:
-        st.warning("No hay pedido seleccionado.")
-        if st.button("Volver a pedidos", use_container_width=True):
-            nav_to("list", selected_pedido=None)
-        return
-
-    left, right = st.columns([3,1])
-    with left:
-        st.title(f"Detalle Pedido #{numero}")
-    with right:
-        st.write("")
-        if st.button("Volver a pedidos", use_container_width=True):
-            nav_to("list", selected_pedido=None)
-            return
-
-    items_df = get_order_items(numero)
-    if items_df.empty:
-        st.info("Este pedido no tiene ítems.")
-        return
+def _route_strategy() -> str | None:
+    """secrets.pick_route: s_shape (default), nearest o codigo (sin ruta, orden por SKU)."""
+    strategy = app_config().get("pick_route", "s_shape")
+    return strategy if strategy in ROUTE_STRATEGIES else None
 
-    # Estado inicial por SKU
-    for _, r in items_df.iterrows():
-        logical_key = f"pick_{numero}_{r['CODIGO']}"
-        if logical_key not in st.session_state:
-            st.session_state[logical_key] = (str(r["PICKING"]).upper() == "Y")
+def load_order_items(numero: int) -> pd.DataFrame:
+    """
+    Ítems del pedido, en el orden de la ruta de picking, guardados en
+    session_state tras la primera lectura; se vuelven a leer solo cuando
+    cambia la versión del pedido (order:<n>). La ruta sale de una caché
+    aparte por pedido y versión de ubicaciones.
+    """
+    repo = get_repo()
+    token = repo.cache_token(f"order:{numero}")
+    key = f"items_{numero}"
+    held = st.session_state.get(key)
+    if held is None or held[0] != token:
+        items = repo.order_items(numero)
+        strategy = _route_strategy()
+        if strategy and not items.empty:
+            items = sequence_items(items, repo.order_route(numero, strategy, token=repo.cache_token("locations")))
+        held = (token, items)
+        st.session_state[key] = held
+    return held[1]
+
+def _toggle_pick(numero: int, codigo: str):
+    logical_key = f"pick_{numero}_{codigo}"
+    active = not st.session_state.get(logical_key, False)
+    st.session_state[logical_key] = active
+    get_pick_buffer().put(numero, codigo, "Y" if active else "N")  # TS se sella al volcar
+    mark_write()
+    if active and st.session_state.get(f"eta_start_{numero}") is None:
+        try:
+            st.session_state[f"eta_start_{numero}"] = mysql_now_ba()
+        except Exception:
+            pass
 
-    total_qty = pd.to_numeric(items_df["CANTIDAD"], errors="coerce").fillna(0).sum()
-    picked_qty = sum(
-        float(r["CANTIDAD"]) for _, r in items_df.iterrows()
-        if st.session_state.get(f"pick_{numero}_{r['CODIGO']}", False)
-    )
+@fragment
+def render_pick_lines(numero: int, items_df: pd.DataFrame):
+    """
+    Avance, ETA y líneas del pedido. Es un fragmento: tocar "Picking" solo
+    re-ejecuta esto (sin login, topbar ni consultas del resto de la página).
+    """
+    pick_keys = [f"pick_{numero}_{c}" for c in items_df["CODIGO"]]
+    picked_mask = [bool(st.session_state.get(k, False)) for k in pick_keys]
+    total_qty = float(items_df["CANTIDAD"].sum())
+    picked_qty = float(items_df["CANTIDAD"][picked_mask].sum())
     pct_qty = int((picked_qty / total_qty) * 100) if total_qty > 0 else 0
 
     st.progress((picked_qty / total_qty) if total_qty > 0 else 0.0)
@@ -927,29 +973,26 @@ def page_detail():
     total_str  = str(int(total_qty))  if float(total_qty).is_integer()  else str(total_qty)
     st.caption(f"Avance por cantidades: {picked_str} / {total_str} ({pct_qty}%)")
 
-    ts_start, elapsed_min_db, now_ar, ts_start_ar = get_order_timing(numero)
-    if now_ar is None:
-        try:
-            now_ar = datetime.now(ZoneInfo("America/Argentina/Buenos_Aires"))
-        except Exception:
-            now_ar = datetime.now()
+    ts_max = items_df["TS"].max() if "TS" in items_df.columns else None
+    ts_start, elapsed_min_db, now_ar, ts_start_ar = get_db_clock().timing(None if pd.isna(ts_max) else ts_max)
     start_ref_ar = st.session_state.get(f"eta_start_{numero}") or ts_start_ar
     if start_ref_ar is not None and now_ar is not None:
         elapsed_calc_min = max((now_ar - start_ref_ar).total_seconds() / 60.0, 0.0)
     else:
         elapsed_calc_min = elapsed_min_db if elapsed_min_db is not None else None
 
-    if (start_ref_ar is not None) and (picked_qty > 0):
-        elapsed_safe = max(float(elapsed_calc_min or 0), 1.0)
-        remaining_qty = max(float(total_qty) - float(picked_qty), 0.0)
-        eta_minutes = (elapsed_safe * remaining_qty) / float(picked_qty) if remaining_qty > 0 else 0.0
-        eta_text  = fmt_duration(eta_minutes)
-        eta_clock_dt = now_ar + timedelta(minutes=eta_minutes)
-        eta_clock = eta_clock_dt.strftime("%H:%M")
+    # ETA del modelo de ritmo (historia del picker y la empresa), corregido por lo observado en este pedido
+    started = (start_ref_ar is not None) and (picked_qty > 0)
+    empresa = str(items_df["empresa"].iloc[0]) if "empresa" in items_df.columns else None
+    eta_minutes = rate_model().remaining(len(items_df), total_qty, sum(picked_mask), picked_qty,
+                                         elapsed_calc_min if started else None, get_username(), empresa)
+    eta_text = fmt_duration(eta_minutes)
+    eta_clock = (now_ar + timedelta(minutes=eta_minutes)).strftime("%H:%M")
+    if started:
         st.caption(f"Tiempo estimado restante: {eta_text} (ETA {eta_clock})")
         st.caption(f"Inicio de picking: {start_ref_ar.strftime('%Y-%m-%d %H:%M:%S') if start_ref_ar else '—'}")
     else:
-        st.caption("Tiempo estimado restante: — (se mostrará cuando inicie el picking)")
+        st.caption(f"Tiempo estimado: {eta_text} según el ritmo histórico (se ajusta al empezar)")
         if start_ref_ar:
             st.caption(f"Inicio de picking: {start_ref_ar.strftime('%Y-%m-%d %H:%M:%S')}")
         elif ts_start:
@@ -966,66 +1009,414 @@ def page_detail():
     with c_right:
         st.markdown("&nbsp;", unsafe_allow_html=True)
 
-    for i, r in items_df.iterrows():
-        logical_key = f"pick_{numero}_{r['CODIGO']}"
-        widget_key  = f"btn_{numero}_{r['CODIGO']}_{i}"
-        active = st.session_state[logical_key]
-        item_name = r.get("ItemName") or ""
-        c_left, c_right = st.columns([7,3])
-        with c_left:
-            sku_txt = str(r["CODIGO"])
-            cant = r["CANTIDAD"]
-            cant_txt = str(int(cant)) if isinstance(cant,(int,float)) and float(cant).is_integer() else str(cant)
-            st.markdown(f'''
-                <div class="detail-row">
-                  <div class="line">
-                    <span class="sku">{sku_txt} – {item_name}</span>
-                    <span class="qty">{cant_txt}</span>
-                  </div>
-                </div>''', unsafe_allow_html=True)
-        with c_right:
-            btn_type = "primary" if active else "secondary"
-            if st.button("Picking", key=widget_key, type=btn_type, use_container_width=True):
-                st.session_state[logical_key] = not active
-                if not active:
-                    try:
-                        if st.session_state.get(f"eta_start_{numero}") is None:
-                            st.session_state[f"eta_start_{numero}"] = mysql_now_ba() \
-                                or datetime.now(ZoneInfo("America/Argentina/Buenos_Aires"))
-                        conn = get_conn(); cur = conn.cursor()
-                        cur.execute("UPDATE sap SET TS = NOW() WHERE NUMERO = %s AND TS IS NULL", (numero,))
-                        conn.commit(); cur.close(); conn.close()
-                    except Exception:
-                        pass
-                st.rerun()
+    ubicaciones = items_df["ubicacion"] if "ubicacion" in items_df.columns else [""] * len(items_df)
+    with perf.timed("render.detail_lines"):
+        for i, (codigo, item_name, cant, active, ubic) in enumerate(zip(
+                items_df["CODIGO"], items_df["ItemName"], items_df["CANTIDAD"], picked_mask, ubicaciones)):
+            c_left, c_right = st.columns([7,3])
+            with c_left:
+                cant_txt = str(int(cant)) if float(cant).is_integer() else str(cant)
+                loc_html = f'<span class="loc">{ubic}</span>' if ubic else ""
+                st.markdown(f'''
+                    <div class="detail-row">
+                      <div class="line">
+                        <span class="sku">{loc_html}{codigo} – {item_name or ""}</span>
+                        <span class="qty">{cant_txt}</span>
+                      </div>
+                    </div>''', unsafe_allow_html=True)
+            with c_right:
+                st.button("Picking", key=f"btn_{numero}_{codigo}_{i}", type="primary" if active else "secondary",
+                          on_click=_toggle_pick, args=(numero, codigo), use_container_width=True)
+
+def page_detail():
+    numero = st.session_state.selected_pedido
+
+    if not numero:
+        st.warning("No hay pedido seleccionado.")
+        if st.button("Volver a pedidos", use_container_width=True):
+            nav_to("list", selected_pedido=None)
+        return
+
+    left, right = st.columns([3,1])
+    with left:
+        st.title(f"Detalle Pedido #{numero}")
+    with right:
+        st.write("")
+        if st.button("Volver a pedidos", use_container_width=True):
+            try:
+                flush_order_picks(numero)
+            except Exception:
+                log.warning("No se pudo guardar el picking del pedido %s; lo reintenta el hilo de fondo", numero, exc_info=True)
+            mark_write()
+            nav_to("list", selected_pedido=None)
+            return
+
+    items_df = load_order_items(numero)
+    if items_df.empty:
+        st.info("Este pedido no tiene ítems.")
+        return
+
+    # Estado inicial por SKU (lo pendiente en el buffer pisa lo leído de la DB)
+    pending = get_pick_buffer().pending_for(numero)
+    for codigo, flag in zip(items_df["CODIGO"], items_df["PICKING"]):
+        logical_key = f"pick_{numero}_{codigo}"
+        if logical_key not in st.session_state:
+            flag = pending.get(str(codigo), flag)
+            st.session_state[logical_key] = (str(flag).upper() == "Y")
+
+    render_pick_lines(numero, items_df)
 
     st.markdown('<div class="confirm-bar">', unsafe_allow_html=True)
     ccf, _, _ = st.columns([1,1,2])
     with ccf:
         if st.button("Confirmar Picking", key="confirm", use_container_width=True, type="primary"):
             try:
-                mark_order_all_items_Y(numero)
+                flush_order_picks(numero)
+                get_repo().complete_order(numero)
+                mark_write()
                 st.success("Picking actualizado (todos los ítems marcados en Y).")
-                st.cache_data.clear()
                 st.session_state.pop(f"eta_start_{numero}", None)
+                st.session_state.pop(f"items_{numero}", None)
                 nav_to("list", selected_pedido=None)
             except Exception as e:
                 st.error(f"Error al actualizar: {e}")
     st.markdown('</div>', unsafe_allow_html=True)
 
-# ================== APP ==================
-if require_login():
-    render_topbar()
+# ================== PÁGINA: OLA DE PICKING ==================
+# Varios pedidos de un mismo usuario en un recorrido: lista consolidada por
+# SKU (en orden de ruta) y reparto por casillero del put-wall. Los toggles
+# van al mismo buffer de escritura que el detalle, una entrada por pedido.
+WAVE_MAX_ORDERS = 8  # default de secrets.wave_max_orders (casilleros del put-wall)
 
-    # (Opcional) Panel de administración — reservado a admin
-    if st.session_state.get("user", {}).get("rol") == "admin":
-        pass
+def _wave_max_orders() -> int:
+    return int(app_config().get("wave_max_orders", WAVE_MAX_ORDERS))
+
+def load_wave(numeros: tuple[int, ...]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (líneas de los pedidos, lista consolidada) de la ola, guardadas en
+    session_state; se rearman solo si cambia la versión de algún pedido.
+    """
+    repo = get_repo()
+    token = (numeros, repo.cache_token(*[f"order:{n}" for n in numeros]))
+    held = st.session_state.get("wave_items")
+    if held is None or held[0] != token:
+        items = repo.wave_items(numeros)
+        strategy = _route_strategy()
+        route = repo.wave_route(numeros, strategy, token=repo.cache_token("locations")) if strategy else None
+        held = (token, items, consolidate(items, put_wall_slots(numeros), route))
+        st.session_state["wave_items"] = held
+    return held[1], held[2]
+
+def _clear_wave(numeros=()):
+    for k in [k for k in st.session_state if k.startswith("wave_pick_")]:
+        del st.session_state[k]
+    for n in numeros:
+        st.session_state.pop(f"items_{n}", None)
+    st.session_state.pop("wave_items", None)
+    st.session_state.pop("wave", None)
+
+def _toggle_wave_pick(codigo: str, reparto: tuple):
+    key = f"wave_pick_{codigo}"
+    active = not st.session_state.get(key, False)
+    st.session_state[key] = active
+    buf = get_pick_buffer()
+    for _, numero, _ in reparto:
+        buf.put(numero, codigo, "Y" if active else "N")
+        st.session_state[f"pick_{numero}_{codigo}"] = active  # el detalle del pedido lo ve igual
+    mark_write()
+
+@fragment
+def render_wave_lines(wave_df: pd.DataFrame):
+    """Avance y líneas consolidadas de la ola (fragmento, como render_pick_lines)."""
+    picked_mask = [bool(st.session_state.get(f"wave_pick_{c}", False)) for c in wave_df["CODIGO"]]
+    total_qty = float(wave_df["CANTIDAD"].sum())
+    picked_qty = float(wave_df["CANTIDAD"][picked_mask].sum())
+    st.progress((picked_qty / total_qty) if total_qty > 0 else 0.0)
+    st.caption(f"Líneas: {sum(picked_mask)} / {len(wave_df)} · Unidades: {picked_qty:g} / {total_qty:g}")
+
+    with perf.timed("render.wave_lines"):
+        for i, row in enumerate(wave_df.itertuples(index=False)):
+            c_left, c_right = st.columns([7,3])
+            with c_left:
+                loc_html = f'<span class="loc">{row.ubicacion}</span>' if row.ubicacion else ""
+                st.markdown(f'''
+                    <div class="detail-row">
+                      <div class="line">
+                        <span class="sku">{loc_html}{row.CODIGO} – {row.ItemName or ""}</span>
+                        <span class="qty">{row.CANTIDAD:g}</span>
+                      </div>
+                      <small>Reparto: {split_text(row.reparto)}</small>
+                    </div>''', unsafe_allow_html=True)
+            with c_right:
+                st.button("Picking", key=f"wbtn_{row.CODIGO}_{i}", type="primary" if picked_mask[i] else "secondary",
+                          on_click=_toggle_wave_pick, args=(row.CODIGO, row.reparto), use_container_width=True)
+
+def render_wave_builder():
+    repo, primary = get_repo(), read_primary()
+    if get_user_role() in ("admin", "jefe"):
+        users = repo.distinct_users(token=repo.cache_token("users", primary=primary), primary=primary)
+        if not users:
+            st.info("No hay pedidos asignados.")
+            return
+        usr = st.selectbox("Usuario asignado", users)
+    else:
+        usr = get_username()
+
+    odf, _ = load_order_pages("wave", usr_pick=usr)
+    pend = odf[odf["picked_items"] < odf["total_items"]] if not odf.empty else odf
+    if pend.empty:
+        st.info(f"{usr} no tiene pedidos pendientes.")
+        return
+    labels = {int(r.NUMERO): f"#{r.NUMERO} · {r.CLIENTE} · {int(r.total_items) - int(r.picked_items)} líneas pendientes"
+              for r in pend.itertuples()}
+    max_n = _wave_max_orders()
+    sel = st.multiselect(f"Pedidos de la ola (hasta {max_n}, uno por casillero)", list(labels),
+                         format_func=labels.get, max_selections=max_n)
+    if st.button("Armar ola", type="primary", disabled=not sel, use_container_width=True):
+        _clear_wave()
+        st.session_state.wave = [int(n) for n in sel]
+        st.rerun()
+
+def page_wave():
+    st.subheader("Ola de picking")
+    numeros = tuple(st.session_state.get("wave") or ())
+    if not numeros:
+        render_wave_builder()
+        return
+
+    items, wave_df = load_wave(numeros)
+    if wave_df.empty:
+        st.info("Los pedidos de la ola no tienen ítems.")
+        _clear_wave(numeros)
+        return
+
+    # Estado inicial por SKU: picked si está en Y en todos los pedidos (lo pendiente en el buffer pisa la DB)
+    buf = get_pick_buffer()
+    pending = {n: buf.pending_for(n) for n in numeros}
+    flags = {(int(n), str(c)): f for n, c, f in zip(items["NUMERO"], items["CODIGO"], items["PICKING"])}
+    for codigo, reparto in zip(wave_df["CODIGO"], wave_df["reparto"]):
+        key = f"wave_pick_{codigo}"
+        if key not in st.session_state:
+            st.session_state[key] = all(
+                str(pending[n].get(str(codigo), flags.get((n, str(codigo)), "N"))).upper() == "Y"
+                for _, n, _ in reparto)
+
+    slots = put_wall_slots(numeros)
+    heads = items.groupby("NUMERO").agg(cliente=("CLIENTE", "first"), lineas=("CODIGO", "size"))
+    st.markdown("**Put-wall**")
+    st.dataframe(pd.DataFrame([{"Casillero": f"C{slot}", "Pedido": n, "Cliente": heads.at[n, "cliente"],
+                                "Líneas": int(heads.at[n, "lineas"])}
+                               for n, slot in slots.items() if n in heads.index]),
+                 use_container_width=True, hide_index=True)
+    st.caption(f"{len(wave_df)} SKUs para {len(items)} líneas de {len(numeros)} pedidos.")
+
+    render_wave_lines(wave_df)
+
+    c1, c2, _ = st.columns([1,1,2])
+    with c1:
+        if st.button("Confirmar ola", key="confirm_wave", type="primary", use_container_width=True):
+            try:
+                for n in numeros:
+                    flush_order_picks(n)
+                done = get_repo().complete_orders(numeros)
+                mark_write()
+                for n in numeros:
+                    st.session_state.pop(f"eta_start_{n}", None)
+                _clear_wave(numeros)
+                st.success(f"Ola confirmada: {len(done)} pedidos, {sum(d.filas for d in done.values())} líneas.")
+                nav_to("list", selected_pedido=None)
+            except Exception as e:
+                st.error(f"Error al confirmar la ola: {e}")
+    with c2:
+        if st.button("Deshacer ola", use_container_width=True,
+                     help="Vuelve a elegir pedidos; lo marcado hasta ahora queda guardado."):
+            for n in numeros:
+                try:
+                    flush_order_picks(n)
+                except Exception:
+                    log.warning("No se pudo guardar el picking del pedido %s; lo reintenta el hilo de fondo", n, exc_info=True)
+            mark_write()
+            _clear_wave(numeros)
+            st.rerun()
+
+# ================== PÁGINA: ADMIN ==================
+def page_admin():
+    if get_user_role() != "admin":
+        st.warning("No tenés permisos para ver esta sección.")
+        go_and_sync("list")
+        st.rerun()
+        return
+
+    st.subheader("Administración")
+
+    st.markdown("**Esquema e índices de `sap`**")
+    repo = get_repo()
+    feats = repo.features()
+    st.caption("Columnas normalizadas (usr_pick_n, picking_y): "
+               + ("aplicadas" if feats.get("sap_norm") else "pendientes")
+               + " · Búsqueda FULLTEXT: " + ("sí" if feats.get("sap_search") else "no")
+               + " · Resumen order_header: " + ("sí" if feats.get("order_header") else "no"))
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        if st.button("Aplicar migración de índices", use_container_width=True):
+            try:
+                applied = repo.ensure_sap_schema()
+                if applied:
+                    st.success("Aplicado: " + ", ".join(applied))
+                else:
+                    st.info("El esquema ya estaba al día.")
+            except Exception as e:
+                st.error(f"No se pudo aplicar la migración: {e}")
+    with c2:
+        if st.button("Reconstruir order_header", use_container_width=True,
+                     help="Los pedidos nuevos de una recarga de SAP entran solos cada header_sync_s "
+                          "(los que solo cambiaron en SAP, no): esto regenera todo el resumen."):
+            try:
+                n = repo.rebuild_order_header()
+                st.success(f"order_header reconstruido: {n} pedidos.")
+            except Exception as e:
+                st.error(f"No se pudo reconstruir order_header: {e}")
+    with c3:
+        if st.button("Reporte EXPLAIN", use_container_width=True):
+            try:
+                st.session_state.admin_explain = repo.explain_report()
+            except Exception as e:
+                st.error(f"No se pudo generar el reporte: {e}")
+    rep = st.session_state.get("admin_explain")
+    if rep is not None:
+        st.dataframe(rep, use_container_width=True, hide_index=True)
+
+    st.markdown("**Ubicaciones del depósito (ruta de picking)**")
+    st.caption("CSV con CODIGO y pasillo, posicion[, nivel] — o una columna ubicacion tipo A03-12-2. "
+               "El detalle ordena las líneas por ruta "
+               f"({_route_strategy() or 'desactivada: orden por SKU'}).")
+    up = st.file_uploader("Archivo de ubicaciones", type=["csv"], key="admin_locations_csv")
+    replace = st.checkbox("Reemplazar todas las ubicaciones (borra las que no vienen en el archivo)")
+    if up is not None and st.button("Cargar ubicaciones", use_container_width=True):
+        try:
+            loc = parse_locations(pd.read_csv(up, dtype=str, sep=None, engine="python"))
+            n = repo.load_locations(loc, replace=replace)
+            st.success(f"Ubicaciones cargadas: {n}.")
+        except Exception as e:
+            st.error(f"No se pudieron cargar las ubicaciones: {e}")
+
+    st.markdown("**Asignación automática de pedidos**")
+    st.caption("Reparte los pedidos abiertos según líneas, unidades, la carga abierta de cada picker "
+               "y su ritmo histórico (pedidos cerrados de los últimos 30 días). Primero se ve la vista previa.")
+    try:
+        usuarios = repo.list_users()
+    except Exception:
+        usuarios = []
+    all_users = [u for u, _ in usuarios]
+    default_pickers = [u for u, rol in usuarios if (rol or "") != "admin"]
+    pickers = st.multiselect("Pickers", all_users, default=default_pickers, key="admin_assign_pickers")
+    mode = st.radio("Pedidos", ["missing", "all"], horizontal=True, key="admin_assign_mode",
+                    format_func={"missing": "Solo sin asignar", "all": "Todos los no empezados (reasigna)"}.get)
+    if st.button("Vista previa", use_container_width=True, disabled=not pickers):
+        try:
+            st.session_state.admin_assign_plan = (mode, repo.plan_assignment(pickers, mode, model=rate_model()))
+        except Exception as e:
+            st.error(f"No se pudo calcular el reparto: {e}")
+    held = st.session_state.get("admin_assign_plan")
+    if held is not None:
+        plan_mode, plan = held
+        try:
+            now = mysql_now_ba()
+        except Exception:
+            now = datetime.now(TZ_BA)
+        view = plan.resumen.assign(fin_estimado=[(now + timedelta(minutes=float(m))).strftime("%d/%m %H:%M")
+                                                 for m in plan.resumen["fin_min"]])
+        m = plan.modelo
+        st.caption(f"{len(plan.mapping)} pedidos · termina el último en {fmt_duration(plan.makespan_min)} · "
+                   f"modelo: {m.por_pedido:.1f} min/pedido + {m.por_linea:.2f} min/línea + "
+                   f"{m.por_unidad:.3f} min/unidad ({m.pedidos_historia} pedidos de historia)")
+        if plan.conservados:
+            quedan = "ya empezados" if plan_mode == "all" else "ya asignados"
+            st.caption(f"{plan.conservados} pedidos {quedan} quedan con su picker "
+                       "(cuentan en carga_previa_min).")
+        st.dataframe(view, use_container_width=True, hide_index=True)
+        if st.button("Aplicar asignación", type="primary", use_container_width=True, disabled=not plan.mapping):
+            try:
+                res = repo.apply_assignment(plan.mapping, mode=plan_mode)
+                st.session_state.pop("admin_assign_plan", None)
+                st.success(f"Asignados {res.pedidos} pedidos ({res.filas} líneas).")
+            except Exception as e:
+                st.error(f"No se pudo aplicar la asignación: {e}")
+
+# ================== PÁGINA: DIAGNÓSTICO ==================
+RENDER_BUDGET_MS = 1500  # default de secrets.render_budget_ms
 
-    if st.session_state.page == "list":
-        page_list()
-    elif st.session_state.page == "team":
-        render_team_dashboard()
-    elif st.session_state.page == "team_user":
-        page_team_user_orders()
-    elif st.session_state.page == "detail":
-        page_detail()
+def _render_budget_ms() -> float:
+    try:
+        return float(app_config().get("render_budget_ms", RENDER_BUDGET_MS))
+    except Exception:
+        return RENDER_BUDGET_MS
+
+def page_diagnostics():
+    if get_user_role() != "admin":
+        st.warning("No tenés permisos para ver esta sección.")
+        go_and_sync("list")
+        st.rerun()
+        return
+
+    st.subheader("Diagnóstico de rendimiento")
+    st.caption(f"Métricas de este proceso desde su arranque (o el último reinicio). "
+               f"Presupuesto por rerun: {int(_render_budget_ms())} ms.")
+
+    g = perf.gauges().get("db.en_uso", {"value": 0, "peak": 0})
+    try:
+        pool_size = get_pool().pool_size
+    except Exception:
+        pool_size = "?"
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Conexiones en uso", g["value"])
+    m2.metric("Pico de conexiones", g["peak"])
+    m3.metric("Tamaño del pool", pool_size)
+
+    rs = get_repo().replica_status()
+    if rs["configured"]:
+        rg = perf.gauges().get("db.replica.en_uso", {"value": 0, "peak": 0})
+        r1, r2, r3 = st.columns(3)
+        r1.metric("Réplica", "en uso" if rs["ok"] else "primario")
+        r2.metric("Demora réplica (s)", "—" if rs["lag_s"] is None else f"{rs['lag_s']:.0f}",
+                  help=f"Sobre {rs['max_lag_s']:.0f} s las lecturas vuelven al primario.")
+        r3.metric("Conexiones réplica (pico)", f"{rg['value']} ({rg['peak']})")
+        if rs["error"]:
+            st.caption(f"No se pudo medir la demora: {rs['error']}")
+
+    st.markdown("**Consultas y bloques de render**")
+    st.dataframe(perf.snapshot(), use_container_width=True, hide_index=True)
+    st.markdown("**Últimos reruns**")
+    st.caption("`consultas` cuenta las lecturas reales a la DB (sin aciertos de caché); "
+               "un número que crece con las tarjetas es un N+1.")
+    st.dataframe(perf.recent_reruns(), use_container_width=True, hide_index=True)
+    if st.button("Reiniciar métricas"):
+        perf.reset()
+        st.rerun()
+
+# ================== APP ==================
+# Streamlit ejecuta el script como __main__; importado (bench/) no dibuja nada.
+def main():
+    setup_page()
+    if require_login():
+        start_header_sync()
+        with perf.rerun(st.session_state.page, budget_ms=_render_budget_ms(), user=get_username()):
+            render_topbar()
+
+            if st.session_state.page == "list":
+                page_list()
+            elif st.session_state.page == "team":
+                render_team_dashboard()
+            elif st.session_state.page == "team_user":
+                page_team_user_orders()
+            elif st.session_state.page == "detail":
+                page_detail()
+            elif st.session_state.page == "wave":
+                page_wave()
+            elif st.session_state.page == "admin":
+                page_admin()
+            elif st.session_state.page == "diag":
+                page_diagnostics()
+
+if __name__ == "__main__":
+    main()
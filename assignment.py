@@ -0,0 +1,85 @@
+"""
+Asignación de pedidos a pickers balanceando la carga.
+
+El trabajo de cada pedido se estima en minutos con el modelo de ritmo de
+eta.py (líneas, unidades, empresa y velocidad de cada picker). El reparto es
+un problema de makespan mínimo en máquinas con distinta velocidad: LPT (el
+pedido más largo primero, al picker que termina antes contando lo que ya
+tiene abierto) y después una búsqueda local que mueve pedidos desde el que
+termina último mientras eso baje el makespan.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from eta import RateModel
+
+IMPROVE_MAX_MOVES = 500
+
+SUMMARY_COLUMNS = ["picker", "pedidos", "lineas", "unidades", "carga_previa_min", "asignado_min", "fin_min"]
+
+
+class AssignmentPlan(NamedTuple):
+    mapping: dict[int, str]
+    resumen: pd.DataFrame
+    makespan_min: float
+    modelo: RateModel
+    conservados: int = 0  # pedidos que quedan con su picker (cuentan como carga previa)
+
+
+def plan_balanced_assignment(orders: pd.DataFrame, pickers: list[str], model: RateModel,
+                             open_minutes: dict[str, float] | None = None) -> AssignmentPlan:
+    """
+    Reparte `orders` (NUMERO, lineas, unidades[, empresa]) entre `pickers` minimizando
+    la hora de fin del último, partiendo de la carga ya abierta de cada uno
+    (`open_minutes`, en minutos de trabajo).
+    """
+    if not pickers:
+        raise ValueError("La lista de pickers está vacía.")
+    pickers = list(dict.fromkeys(pickers))
+    open_minutes = open_minutes or {}
+    speeds = np.array([model.speed.get(p, 1.0) for p in pickers])
+    prev = np.array([float(open_minutes.get(p, 0.0)) for p in pickers])
+    loads = prev.copy()
+    empresa = orders["empresa"] if "empresa" in orders.columns else None
+    base = model.minutes(orders["lineas"], orders["unidades"], empresa=empresa) if len(orders) else np.zeros(0)
+    numeros = orders["NUMERO"].to_numpy() if len(orders) else np.zeros(0, dtype=int)
+
+    # LPT: el más largo primero, al picker que lo termina antes
+    owner = np.empty(len(numeros), dtype=int)
+    for i in np.argsort(-base, kind="stable"):
+        j = int(np.argmin(loads + base[i] / speeds))
+        owner[i] = j
+        loads[j] += base[i] / speeds[j]
+
+    # Búsqueda local: mover pedidos del que termina último si baja el makespan
+    for _ in range(IMPROVE_MAX_MOVES):
+        a = int(np.argmax(loads))
+        moved = False
+        for i in np.flatnonzero(owner == a)[np.argsort(-base[owner == a])]:
+            cand = loads + base[i] / speeds
+            cand[a] = np.inf
+            b = int(np.argmin(cand))
+            if max(loads[a] - base[i] / speeds[a], cand[b]) < loads[a] - 1e-9:
+                loads[a] -= base[i] / speeds[a]
+                loads[b] = cand[b]
+                owner[i] = b
+                moved = True
+                break
+        if not moved:
+            break
+
+    lineas = orders["lineas"].to_numpy(dtype=float) if len(orders) else np.zeros(0)
+    unidades = orders["unidades"].to_numpy(dtype=float) if len(orders) else np.zeros(0)
+    resumen = pd.DataFrame({
+        "picker": pickers,
+        "pedidos": np.bincount(owner, minlength=len(pickers)),
+        "lineas": np.bincount(owner, weights=lineas, minlength=len(pickers)).astype(int),
+        "unidades": np.bincount(owner, weights=unidades, minlength=len(pickers)).round(1),
+        "carga_previa_min": prev.round(1),
+        "asignado_min": (loads - prev).round(1),
+        "fin_min": loads.round(1),
+    })[SUMMARY_COLUMNS]
+    mapping = {int(n): pickers[j] for n, j in zip(numeros, owner)}
+    return AssignmentPlan(mapping, resumen, float(loads.max()) if len(loads) else 0.0, model)
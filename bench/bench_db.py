@@ -0,0 +1,134 @@
+"""
+Benchmark de la capa de datos contra una base MySQL/MariaDB local cargada con
+datagen.py. Mide los métodos de repository.py (los mismos que usa la app, sin
+Streamlit y sin caché) en varios tamaños y agrega una línea JSON por corrida a --out, para comparar
+resultados entre commits.
+
+    docker compose -f bench/docker-compose.yml up -d
+    python bench/bench_db.py --sizes 10000,100000,1000000 --schema both --out bench/results.jsonl
+
+--schema legacy mide la tabla tal como viene de SAP (sin índices); migrated
+aplica antes ensure_sap_schema() (índices, columnas normalizadas, order_header).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import perf  # noqa: E402
+from datagen import add_db_args, add_shape_args, connect, load  # noqa: E402
+from repository import NoCache, PickingRepository, make_pool  # noqa: E402
+
+
+def stats_ms(times: list[float]) -> dict:
+    a = np.array(times) * 1000.0
+    return {"n": len(a), "min_ms": round(float(a.min()), 2), "p50_ms": round(float(np.median(a)), 2),
+            "p95_ms": round(float(np.percentile(a, 95)), 2), "max_ms": round(float(a.max()), 2)}
+
+
+def measure(fn, repeat: int, before=None) -> dict:
+    times = []
+    for i in range(repeat):
+        if before:
+            before(i)
+        t0 = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - t0)
+    return stats_ms(times)
+
+
+def run_cases(repo: PickingRepository, info: dict, repeat: int, rng: random.Random) -> dict:
+    numeros = [rng.randint(info["numero_min"], info["numero_max"]) for _ in range(repeat * 2)]
+    pickers = info["pickers"]
+    token = lambda: repo.cache_token("orders")  # noqa: E731
+    codes = {n: list(repo.order_items(n)["CODIGO"])[:20] for n in numeros[:repeat]}
+    cases = {
+        "cache_token": measure(lambda i: token(), repeat),
+        "get_orders": measure(lambda i: repo.orders(token=token()), repeat),
+        "get_orders_next_page": measure(lambda i: repo.orders(before=numeros[i], token=token()), repeat),
+        "get_orders_usr_pick": measure(
+            lambda i: repo.orders(usr_pick=pickers[i % len(pickers)], token=token()), repeat),
+        "get_orders_buscar_numero": measure(
+            lambda i: repo.orders(buscar=str(numeros[i])[:6], token=token()), repeat),
+        "get_orders_buscar_texto": measure(lambda i: repo.orders(buscar="distribuidora", token=token()), repeat),
+        "get_orders_progress": measure(lambda i: repo.orders_progress(tuple(numeros[:150]), token=token()), repeat),
+        "get_order_items": measure(lambda i: repo.order_items(numeros[i]), repeat),
+        "get_user_progress": measure(lambda i: repo.user_progress(token=token()), repeat),
+        "update_picking_many": measure(
+            lambda i: repo.update_picking_many([(numeros[i], c, "Y") for c in codes[numeros[i]]]), repeat),
+        "complete_order": measure(lambda i: repo.complete_order(numeros[repeat + i]), repeat),
+        "bulk_assign_usr_pick": measure(
+            lambda i: repo.bulk_assign(pickers, mode="all", strategy="balanced"), max(1, repeat // 3)),
+    }
+    return cases
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return None
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_args(p)
+    add_shape_args(p)
+    p.add_argument("--sizes", default="10000,100000,1000000")
+    p.add_argument("--schema", choices=("legacy", "migrated", "both"), default="migrated")
+    p.add_argument("--repeat", type=int, default=9)
+    p.add_argument("--pool-size", type=int, default=4)
+    p.add_argument("--out", help="archivo JSONL donde agregar el resultado")
+    args = p.parse_args()
+
+    shape = {k: getattr(args, k) for k in ("pickers", "companies", "skus", "assigned", "picked", "seed")}
+    shape["per_order"] = args.lines_per_order
+    repo = PickingRepository(make_pool({
+        "host": args.host, "port": args.port, "user": args.user, "password": args.password,
+        "database": args.database, "pool_size": args.pool_size, "pool_name": "bench",
+    }), cache=NoCache())
+    schemas = ("legacy", "migrated") if args.schema == "both" else (args.schema,)
+
+    conn = connect(args)
+    cur = conn.cursor()
+    cur.execute("SELECT VERSION()")
+    server = cur.fetchone()[0]
+    cur.close()
+
+    runs = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        for schema in schemas:
+            print(f"== {size:,} líneas · {schema}", file=sys.stderr)
+            info = load(conn, size, shape, log=lambda m: print(m, file=sys.stderr))
+            migration = repo.ensure_sap_schema() if schema == "migrated" else []
+            repo.features(refresh=True)
+            perf.reset()
+            cases = run_cases(repo, info, args.repeat, random.Random(args.seed))
+            acquire = perf.snapshot().set_index("metrica").loc["db.acquire"].to_dict()
+            runs.append({
+                "lines": size, "orders": info["orders"], "schema": schema, "load_s": info["load_s"],
+                "migration": migration, "cases": cases,
+                "pool_acquire": {k: acquire[k] for k in ("llamadas", "p50_ms", "p95_ms", "max_ms")},
+            })
+    conn.close()
+
+    result = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": git_rev(), "server": server,
+        "python": platform.python_version(), "repeat": args.repeat, "shape": shape, "runs": runs,
+    }
+    print(json.dumps(result, indent=2, default=str))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
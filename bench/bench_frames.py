@@ -0,0 +1,116 @@
+"""
+Benchmark de la normalización de frames: implementación previa (apply fila a
+fila) contra frames.py (vectorizada) sobre un extracto sintético de `sap`.
+
+    python bench/bench_frames.py --rows 100000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frames import items_frame, order_frame  # noqa: E402
+
+
+def synthetic_sap(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_orders = max(rows // 12, 1)
+    numeros = 100_000_000 + rng.integers(0, n_orders, rows)
+    empresas = np.array(["VICBOR", "DIA", "COTO", "JUMBO", "CARREFOUR"])
+    pickers = np.array([f"picker{i:02d}" for i in range(30)] + [None], dtype=object)
+    cliente = (200_000 + numeros % 5_000).astype(float)
+    return pd.DataFrame({
+        "NUMERO": numeros,
+        "CLIENTE": cliente,
+        "rs": pd.Series(numeros % 900, dtype="Int64").astype(object),
+        "empresa": empresas[rng.integers(0, len(empresas), rows)],
+        "usr_pick": pickers[rng.integers(0, len(pickers), rows)],
+        "color_val": np.array(["#fff3cd", "#d1ecf1", None], dtype=object)[rng.integers(0, 3, rows)],
+        "CODIGO": [f"SKU{c:06d}" for c in rng.integers(0, 20_000, rows)],
+        "ItemName": np.array(["Caja x12", "Pack x6", None], dtype=object)[rng.integers(0, 3, rows)],
+        "CANTIDAD": rng.integers(1, 48, rows).astype(float),
+        "PICKING": np.array(["Y", "N", " y", None, ""], dtype=object)[rng.integers(0, 5, rows)],
+    })
+
+
+# ---- implementación previa (copiada de app.py antes del cambio) ----
+def legacy_orders(df: pd.DataFrame) -> pd.DataFrame:
+    df["CLIENTE"] = df["CLIENTE"].apply(
+        lambda x: str(int(x)) if isinstance(x, (int, float)) and float(x).is_integer() else str(x)
+    )
+    for col in ("rs", "empresa", "usr_pick", "color_val"):
+        df[col] = df[col].apply(lambda x: "" if x is None else str(x))
+    return df
+
+
+def legacy_items(df: pd.DataFrame) -> pd.DataFrame:
+    df["PICKING"] = df["PICKING"].fillna("N").astype(str).str.strip().str.upper().replace({"": "N"})
+    df["CLIENTE"] = df["CLIENTE"].apply(
+        lambda x: str(int(x)) if isinstance(x, (int, float)) and float(x).is_integer() else str(x)
+    )
+    df["ItemName"] = df["ItemName"].apply(lambda x: "" if x is None else str(x))
+    df["CANTIDAD"] = pd.to_numeric(df["CANTIDAD"], errors="coerce").fillna(0)
+    df["CANTIDAD"] = df["CANTIDAD"].apply(lambda x: int(x) if float(x).is_integer() else x)
+    return df
+
+
+def legacy_picked_qty(df: pd.DataFrame, state: dict) -> float:
+    return sum(float(r["CANTIDAD"]) for _, r in df.iterrows() if state.get(f"pick_{r['CODIGO']}", False))
+
+
+def vector_picked_qty(df: pd.DataFrame, state: dict) -> float:
+    mask = [bool(state.get(f"pick_{c}", False)) for c in df["CODIGO"]]
+    return float(df["CANTIDAD"][mask].sum())
+
+
+def best_of(fn, make_input, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        data = make_input()
+        t0 = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    base = synthetic_sap(args.rows)
+    orders = base[["NUMERO", "CLIENTE", "rs", "empresa", "usr_pick", "color_val"]]
+    items = base[["NUMERO", "CLIENTE", "CODIGO", "ItemName", "CANTIDAD", "PICKING"]]
+    detail = items_frame(items.head(300).copy())
+    state = {f"pick_{c}": i % 2 == 0 for i, c in enumerate(detail["CODIGO"])}
+
+    cases = {
+        "order_frame": (legacy_orders, order_frame, lambda: orders.copy()),
+        "items_frame": (legacy_items, items_frame, lambda: items.copy()),
+        "picked_qty_300": (lambda d: legacy_picked_qty(d, state), lambda d: vector_picked_qty(d, state),
+                           lambda: detail),
+    }
+    results = {"rows": args.rows, "cases": {}}
+    for name, (old, new, make_input) in cases.items():
+        t_old = best_of(old, make_input, args.repeat)
+        t_new = best_of(new, make_input, args.repeat)
+        results["cases"][name] = {
+            "legacy_s": round(t_old, 5),
+            "vectorized_s": round(t_new, 5),
+            "speedup": round(t_old / t_new, 1) if t_new else None,
+        }
+    results["memory_mb"] = {
+        "legacy_orders": round(legacy_orders(orders.copy()).memory_usage(deep=True).sum() / 2**20, 1),
+        "order_frame": round(order_frame(orders.copy()).memory_usage(deep=True).sum() / 2**20, 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
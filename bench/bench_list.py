@@ -0,0 +1,100 @@
+"""
+Benchmark del listado: tarjetas (render_list_cards) contra la tabla compacta
+(render_list_table) sobre una página sintética de pedidos, sin DB.
+
+Cada modo se dibuja con streamlit.testing (AppTest) llamando a la misma
+función que usa page_list(). Reporta elementos enviados al navegador, bytes
+de protobuf de esos elementos (el payload del rerun, sin el sobre del
+websocket) y la latencia del rerun completo (mediana y p95).
+
+    python bench/bench_list.py --orders 60 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from repository import ORDERS_PAGE_SIZE  # noqa: E402
+
+SCRIPT = """
+import sys
+sys.path[:0] = [{root!r}, {bench!r}]
+import app
+from bench_list import synthetic_orders
+df = synthetic_orders({orders})
+(app.render_list_table if {mode!r} == "compact" else app.render_list_cards)(df)
+"""
+
+
+def synthetic_orders(n: int, seed: int = 5) -> pd.DataFrame:
+    """Una página del listado con las columnas de order_frame + avance."""
+    rng = np.random.default_rng(seed)
+    total = rng.integers(1, 60, n)
+    picked = (total * rng.uniform(0, 1, n)).astype(int)
+    return pd.DataFrame({
+        "NUMERO": 100_000_000 + np.arange(n)[::-1],
+        "CLIENTE": [f"{200_000 + i}" for i in rng.integers(0, 5_000, n)],
+        "rs": rng.integers(1, 900, n).astype(str),
+        "empresa": np.array(["VICBOR", "DIA", "COTO", "JUMBO"])[rng.integers(0, 4, n)],
+        "usr_pick": np.array([f"picker{i:02d}" for i in range(30)] + [""])[rng.integers(0, 31, n)],
+        "color_val": np.array(["#fff3cd", "#d1ecf1", ""])[rng.integers(0, 3, n)],
+        "total_items": total,
+        "picked_items": picked,
+        "has_any_y": picked > 0,
+    })
+
+
+def _elements(node):
+    children = getattr(node, "children", None)
+    if children is None:
+        yield node
+        return
+    for child in children.values():
+        yield from _elements(child)
+
+
+def measure(mode: str, orders: int, repeat: int, timeout: float) -> dict:
+    src = SCRIPT.format(root=ROOT, bench=os.path.dirname(os.path.abspath(__file__)), orders=orders, mode=mode)
+    at = AppTest.from_string(src, default_timeout=timeout).run()  # calienta imports y cachés
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    ms = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        at.run()
+        ms.append((time.perf_counter() - t0) * 1000.0)
+    elems = [e for e in _elements(at.main) if getattr(e, "proto", None) is not None]
+    return {
+        "modo": mode, "pedidos": orders,
+        "elementos": len(elems),
+        "payload_kb": round(sum(e.proto.ByteSize() for e in elems) / 1024, 1),
+        "rerun_ms_p50": round(float(np.percentile(ms, 50)), 1),
+        "rerun_ms_p95": round(float(np.percentile(ms, 95)), 1),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--orders", type=int, default=ORDERS_PAGE_SIZE, help="pedidos en la página")
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--timeout", type=float, default=30.0)
+    p.add_argument("--out", help="archivo JSONL donde agregar el resultado")
+    args = p.parse_args()
+
+    result = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "modos": [measure(m, args.orders, args.repeat, args.timeout) for m in ("cards", "compact")]}
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
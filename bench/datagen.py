@@ -0,0 +1,181 @@
+"""
+Generador de datos sintéticos para `sap`, `sap_color` y `usuarios` en una
+base de prueba MySQL/MariaDB (nunca producción: la base debe terminar en
+"_bench").
+
+    docker compose -f bench/docker-compose.yml up -d
+    python bench/datagen.py --lines 100000 --lines-per-order 12 --pickers 30 --companies 5
+
+Las tablas se recrean con la forma de producción (texto en CLIENTE,
+CANTIDAD y PICKING, sin índices); `--migrate` aplica además
+ensure_sap_schema() para medir el esquema con índices y order_header.
+"""
+import argparse
+import os
+import sys
+import time
+
+import bcrypt
+import mysql.connector
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from repository import USUARIOS_DDL  # noqa: E402
+
+FIRST_NUMERO = 100_000_000
+BATCH = 5_000
+
+SAP_DDL = """
+    CREATE TABLE sap (
+        NUMERO   BIGINT NOT NULL,
+        CLIENTE  VARCHAR(100),
+        rs       VARCHAR(150),
+        empresa  VARCHAR(50),
+        CODIGO   VARCHAR(50) NOT NULL,
+        ItemName VARCHAR(255),
+        CANTIDAD VARCHAR(20),
+        PICKING  VARCHAR(5),
+        usr_pick VARCHAR(50),
+        TS       DATETIME NULL,
+        TS_C     DATETIME NULL
+    )
+"""
+SAP_COLOR_DDL = """
+    CREATE TABLE sap_color (
+        empresa VARCHAR(50),
+        color   VARCHAR(20)
+    )
+"""
+DROP_TABLES = ("sap", "sap_color", "usuarios", "order_header", "order_header_new",
+               "order_header_old", "cache_version", "ubicaciones")
+RS_WORDS = ("DISTRIBUIDORA", "MAYORISTA", "SUPERMERCADO", "ALMACEN", "AUTOSERVICIO",
+            "COMERCIAL", "LOGISTICA", "NORTE", "SUR", "CENTRO", "SAN", "MARTIN", "DEL", "PLATA")
+COLORS = ("#fff3cd", "#d1ecf1", "#d4edda", "#f8d7da", "#e2e3e5", "#cce5ff")
+
+
+def connect(args):
+    if not args.database.endswith("_bench"):
+        raise SystemExit(f"La base '{args.database}' no termina en _bench; no se toca.")
+    return mysql.connector.connect(host=args.host, port=args.port, user=args.user,
+                                   password=args.password, database=args.database,
+                                   autocommit=False)
+
+
+def add_db_args(p: argparse.ArgumentParser):
+    p.add_argument("--host", default=os.environ.get("BENCH_DB_HOST", "127.0.0.1"))
+    p.add_argument("--port", type=int, default=int(os.environ.get("BENCH_DB_PORT", 3307)))
+    p.add_argument("--user", default=os.environ.get("BENCH_DB_USER", "root"))
+    p.add_argument("--password", default=os.environ.get("BENCH_DB_PASSWORD", "bench"))
+    p.add_argument("--database", default=os.environ.get("BENCH_DB_NAME", "picking_bench"))
+
+
+def add_shape_args(p: argparse.ArgumentParser):
+    p.add_argument("--lines-per-order", type=float, default=12.0, help="promedio (Poisson, mínimo 1)")
+    p.add_argument("--pickers", type=int, default=30)
+    p.add_argument("--companies", type=int, default=5)
+    p.add_argument("--skus", type=int, default=20_000)
+    p.add_argument("--assigned", type=float, default=0.7, help="fracción de pedidos con usr_pick")
+    p.add_argument("--picked", type=float, default=0.3, help="fracción de líneas en Y")
+    p.add_argument("--seed", type=int, default=7)
+
+
+def picker_names(n: int) -> list[str]:
+    return [f"picker{i:02d}" for i in range(n)]
+
+
+def _order_lines(rng, lines: int, per_order: float) -> np.ndarray:
+    """Cantidad de líneas por pedido (Poisson >= 1) que suma exactamente `lines`."""
+    sizes = np.maximum(rng.poisson(per_order, int(lines / per_order) + 16), 1)
+    csum = np.cumsum(sizes)
+    n = int(np.searchsorted(csum, lines)) + 1
+    sizes = sizes[:n].copy()
+    sizes[-1] -= int(csum[n - 1]) - lines
+    return sizes[sizes > 0]
+
+
+def generate(lines: int, per_order: float = 12.0, pickers: int = 30, companies: int = 5,
+             skus: int = 20_000, assigned: float = 0.7, picked: float = 0.3, seed: int = 7):
+    """Itera lotes de filas de `sap` (tuplas en el orden de SAP_DDL)."""
+    rng = np.random.default_rng(seed)
+    sizes = _order_lines(rng, lines, per_order)
+    n_orders = len(sizes)
+    empresas = np.array([f"EMP{i:02d}" for i in range(companies)], dtype=object)
+    users = np.array(picker_names(pickers) or [None], dtype=object)
+    clientes = 200_000 + rng.integers(0, max(n_orders // 4, 1), n_orders)
+    rs = np.array([" ".join(rng.choice(RS_WORDS, 3)) for _ in range(min(n_orders, 5_000))], dtype=object)
+    order_emp = empresas[rng.integers(0, companies, n_orders)]
+    order_usr = np.where(rng.random(n_orders) < assigned, users[rng.integers(0, len(users), n_orders)], None)
+    order_rs = rs[clientes % len(rs)]
+
+    order_idx = np.repeat(np.arange(n_orders), sizes)
+    for start in range(0, lines, BATCH):
+        idx = order_idx[start:start + BATCH]
+        n = len(idx)
+        codigos = rng.integers(0, skus, n)
+        qty = rng.integers(1, 48, n)
+        flags = np.where(rng.random(n) < picked, "Y", np.array(["N", "", None], dtype=object)[rng.integers(0, 3, n)])
+        yield [
+            (int(FIRST_NUMERO + o), str(clientes[o]), order_rs[o], order_emp[o],
+             f"SKU{c:06d}", f"Articulo {c} x{1 + c % 24}", str(q), f, order_usr[o], None, None)
+            for o, c, q, f in zip(idx, codigos, qty, flags)
+        ]
+
+
+def load(conn, lines: int, shape: dict | None = None, log=print) -> dict:
+    """Recrea las tablas y carga `lines` líneas. Devuelve el resumen del dataset."""
+    shape = dict(shape or {})
+    t0 = time.perf_counter()
+    cur = conn.cursor()
+    for t in DROP_TABLES:
+        cur.execute(f"DROP TABLE IF EXISTS {t}")
+    cur.execute(SAP_DDL)
+    cur.execute(SAP_COLOR_DDL)
+    cur.execute(USUARIOS_DDL)
+    companies = shape.get("companies", 5)
+    cur.executemany("INSERT INTO sap_color (empresa, color) VALUES (%s, %s)",
+                    [(f"EMP{i:02d}", COLORS[i % len(COLORS)]) for i in range(companies)])
+    pw = bcrypt.hashpw(b"bench", bcrypt.gensalt(rounds=4)).decode()
+    users = picker_names(shape.get("pickers", 30))
+    cur.executemany("INSERT INTO usuarios (username, password_hash, nombre, rol) VALUES (%s, %s, %s, %s)",
+                    [(u, pw, u.title(), "picker") for u in users] + [("admin", pw, "Admin", "admin")])
+    done = 0
+    for batch in generate(lines, **shape):
+        cur.executemany(
+            "INSERT INTO sap (NUMERO, CLIENTE, rs, empresa, CODIGO, ItemName, CANTIDAD, PICKING, usr_pick, TS, TS_C) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", batch)
+        conn.commit()
+        done += len(batch)
+        if done % 100_000 < BATCH:
+            log(f"  {done:,} líneas")
+    cur.execute("SELECT COUNT(DISTINCT NUMERO), MIN(NUMERO), MAX(NUMERO) FROM sap")
+    n_orders, lo, hi = cur.fetchone()
+    cur.close()
+    return {"lines": lines, "orders": int(n_orders), "numero_min": int(lo), "numero_max": int(hi),
+            "pickers": users, "load_s": round(time.perf_counter() - t0, 2), **shape}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_args(p)
+    add_shape_args(p)
+    p.add_argument("--lines", type=int, default=100_000)
+    p.add_argument("--migrate", action="store_true", help="aplica ensure_sap_schema() al terminar")
+    args = p.parse_args()
+    shape = {k: getattr(args, k) for k in ("lines_per_order", "pickers", "companies", "skus",
+                                           "assigned", "picked", "seed")}
+    shape["per_order"] = shape.pop("lines_per_order")
+    conn = connect(args)
+    try:
+        info = load(conn, args.lines, shape)
+    finally:
+        conn.close()
+    print(f"{info['lines']:,} líneas / {info['orders']:,} pedidos en {info['load_s']} s")
+    if args.migrate:
+        from repository import PickingRepository, make_pool
+        repo = PickingRepository(make_pool({"host": args.host, "port": args.port, "user": args.user,
+                                            "password": args.password, "database": args.database}))
+        print("Migración:", ", ".join(repo.ensure_sap_schema()) or "nada")
+
+
+if __name__ == "__main__":
+    main()
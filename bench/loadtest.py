@@ -0,0 +1,263 @@
+"""
+Generador de carga sin navegador: N pickers concurrentes contra app.py con
+streamlit.testing (AppTest), sobre la base de prueba de datagen.py.
+
+Cada usuario virtual entra por el login de require_login, mira el listado,
+abre pedidos, toca "Picking" en algunas líneas y vuelve (o confirma), con
+tiempos de espera exponenciales entre acciones.
+
+AppTest usa un runtime y secrets globales del proceso y no es thread-safe:
+dentro de un proceso los reruns van de a uno (la latencia se mide sin la
+espera) y las sesiones de un mismo proceso comparten el pool, st.cache_data y
+el buffer de picks, como en el servidor real. `--procs` reparte las sesiones
+en varios procesos para tener reruns concurrentes contra la DB. Los fallos
+del arnés (excepciones de AppTest) se cuentan aparte de los errores de la app.
+
+    python bench/datagen.py --lines 100000 --migrate
+    python bench/loadtest.py --users 40 --procs 4 --ramp 0 --duration 120 --think 3
+
+Reporta latencia de rerun (p50/p95/p99, total y por acción), consultas a la
+DB por rerun (de perf.py), el pico de conexiones en uso y, para el listado,
+elementos y KB de HTML por rerun. `--list-mode cards|compact` compara las
+tarjetas con la tabla compacta; AppTest no sabe elegir filas de un
+st.dataframe, así que en la tabla abrir un pedido se emula con los query
+params (?page=detail&pedido=N) en la misma sesión. El payload de cada modo
+sin DB lo mide bench/bench_list.py.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import perf  # noqa: E402
+from datagen import add_db_args, picker_names  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+_RUN_LOCK = threading.Lock()  # un rerun de AppTest a la vez por proceso
+
+
+class VirtualPicker:
+    """Una sesión de Streamlit (AppTest) que sigue el recorrido de un picker."""
+
+    def __init__(self, username: str, args, rng: random.Random, samples: list, lock: threading.Lock):
+        self.username = username
+        self.args = args
+        self.rng = rng
+        self.samples = samples
+        self.lock = lock
+        self.errors = 0
+        self.harness_errors = 0
+        with _RUN_LOCK:
+            self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        self.at.secrets["app_marco_new"] = {
+            "host": args.host, "port": args.port, "user": args.user, "password": args.password,
+            "database": args.database, "pool_size": args.pool_size, "pool_name": "loadtest",
+            "list_mode": args.list_mode,
+        }
+        self.at.secrets["APP_AUTH_SECRET"] = "loadtest"
+
+    def _step(self, action: str, fn):
+        with _RUN_LOCK:
+            t0 = time.perf_counter()
+            try:
+                fn()
+                error = "app" if self.at.exception else None
+            except Exception:
+                error = "harness"
+            ms = (time.perf_counter() - t0) * 1000.0
+        if error == "app":
+            self.errors += 1
+        elif error:
+            self.harness_errors += 1
+        with self.lock:
+            self.samples.append({"action": action, "ms": ms, "ok": error is None, "error": error})
+        return error is None
+
+    def _think(self):
+        time.sleep(self.rng.expovariate(1.0 / self.args.think) if self.args.think > 0 else 0)
+
+    def _button(self, label: str | None = None, key_prefix: str | None = None):
+        for b in self.at.button:
+            if (label and b.label == label) or (key_prefix and (b.key or "").startswith(key_prefix)):
+                yield b
+
+    def login(self) -> bool:
+        if not self._step("abrir", self.at.run):
+            return False
+        for t in self.at.text_input:
+            if t.label == "Usuario":
+                t.input(self.username)
+            elif t.label == "Contraseña":
+                t.input(self.args.user_password)
+        ingresar = next(self._button("Ingresar"), None)
+        return ingresar is not None and self._step("login", ingresar.click().run)
+
+    def _table_orders(self) -> list[int]:
+        for df in self.at.dataframe:
+            if "Pedido" in df.value.columns:
+                return [int(n) for n in df.value["Pedido"]]
+        return []
+
+    def _open_row(self, numero: int):
+        self.at.query_params["page"] = "detail"
+        self.at.query_params["pedido"] = str(numero)
+        self.at.run()
+
+    def open_order(self) -> bool:
+        cards = list(self._button(key_prefix="open_"))
+        if cards:
+            return self._step("abrir_pedido", self.rng.choice(cards).click().run)
+        rows = self._table_orders()
+        if rows:
+            return self._step("abrir_pedido", lambda: self._open_row(self.rng.choice(rows)))
+        return self._step("listado", self.at.run)
+
+    def pick_lines(self):
+        lines = list(self._button(key_prefix="btn_"))
+        if not lines:
+            return
+        k = max(1, int(len(lines) * self.rng.uniform(0.2, 1.0)))
+        for b in self.rng.sample(lines, min(k, self.args.max_picks)):
+            self._think()
+            self._step("toggle_pick", b.click().run)
+            if self.at.exception:
+                return
+
+    def leave_order(self):
+        self._think()
+        if self.rng.random() < self.args.confirm_ratio:
+            b = next(self._button("Confirmar Picking"), None)
+            action = "confirmar"
+        else:
+            b = next(self._button("Volver a pedidos"), None)
+            action = "volver"
+        if b is not None:
+            self._step(action, b.click().run)
+
+    def run(self, stop_at: float):
+        if not self.login():
+            return
+        while time.time() < stop_at:
+            self._think()
+            if self.open_order():
+                self.pick_lines()
+                self.leave_order()
+
+
+def pct(a: np.ndarray, q: float) -> float:
+    return round(float(np.percentile(a, q)), 1) if len(a) else 0.0
+
+
+def summarize(samples: list[dict], reruns: list[dict], elapsed: float, peaks: list[int]) -> dict:
+    ms = np.array([s["ms"] for s in samples if s["ok"]])
+    by_action = {}
+    for action in sorted({s["action"] for s in samples}):
+        a = np.array([s["ms"] for s in samples if s["action"] == action and s["ok"]])
+        by_action[action] = {"n": len(a), "p50_ms": pct(a, 50), "p95_ms": pct(a, 95), "p99_ms": pct(a, 99),
+                             "errores": sum(1 for s in samples if s["action"] == action and s["error"] == "app"),
+                             "fallos_arnes": sum(1 for s in samples
+                                                 if s["action"] == action and s["error"] == "harness")}
+    q = np.array([r.get("query_n", 0) for r in reruns])
+    acq = np.array([r.get("acquire_ms", 0.0) for r in reruns])
+    calls: dict[str, int] = {}
+    for r in reruns:
+        for k, v in r["calls"].items():
+            calls[k] = calls.get(k, 0) + v
+    lists = [r for r in reruns if r.get("list_mode")]
+    listado = {
+        "reruns": len(lists),
+        "elementos_prom": round(float(np.mean([r["list_elements"] for r in lists])), 1) if lists else 0,
+        "html_kb_prom": round(float(np.mean([r["list_html_kb"] for r in lists])), 1) if lists else 0,
+        "render_ms_p95": pct(np.array([r.get("render_ms", 0.0) for r in lists]), 95),
+        "total_ms_p95": pct(np.array([r["total_ms"] for r in lists]), 95),
+    }
+    return {
+        "acciones": len(samples), "acciones_por_s": round(len(samples) / elapsed, 2) if elapsed else 0,
+        "rerun_ms": {"p50": pct(ms, 50), "p95": pct(ms, 95), "p99": pct(ms, 99), "max": pct(ms, 100)},
+        "por_accion": by_action,
+        "consultas_por_rerun": {"prom": round(float(q.mean()), 2) if len(q) else 0, "p95": pct(q, 95),
+                                "max": int(q.max()) if len(q) else 0},
+        "espera_pool_ms": {"p95": pct(acq, 95), "max": pct(acq, 100)},
+        "conexiones_pico": {"por_proceso_max": max(peaks, default=0), "suma": sum(peaks)},
+        "listado": listado,
+        "consultas_por_helper": dict(sorted(calls.items(), key=lambda kv: -kv[1])),
+        "reruns_servidor": len(reruns),
+        "sobre_presupuesto": sum(1 for r in reruns if r.get("over_budget")),
+    }
+
+
+def run_worker(args, indices: list[int], t_start: float, stop_at: float) -> dict:
+    """Sesiones `indices` en este proceso; devuelve muestras, reruns y pico de conexiones."""
+    samples, reruns, lock = [], [], threading.Lock()
+    perf.reset()
+    perf.add_sink(reruns.append)
+    names = picker_names(args.pickers)
+    users = [VirtualPicker(names[i % len(names)], args, random.Random(args.seed + i), samples, lock)
+             for i in indices]
+    threads = []
+    for i, u in zip(indices, users):
+        delay = max(t_start + args.ramp * i / max(args.users - 1, 1) - time.time(), 0.0)
+        th = threading.Timer(delay, u.run, args=(stop_at,))
+        th.daemon = True
+        th.start()
+        threads.append(th)
+    for th in threads:
+        th.join(max(stop_at - time.time(), 0) + args.timeout * 4)
+    perf.remove_sink(reruns.append)
+    return {"samples": samples, "reruns": reruns,
+            "peak": perf.gauges().get("db.en_uso", {"peak": 0})["peak"],
+            "errores": sum(u.errors for u in users), "fallos_arnes": sum(u.harness_errors for u in users)}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_args(p)
+    p.add_argument("--users", type=int, default=40)
+    p.add_argument("--procs", type=int, default=1, help="procesos; las sesiones se reparten entre ellos")
+    p.add_argument("--ramp", type=float, default=0.0, help="segundos para escalonar los logins (0 = todos juntos)")
+    p.add_argument("--duration", type=float, default=60.0)
+    p.add_argument("--think", type=float, default=3.0, help="espera media entre acciones (s)")
+    p.add_argument("--max-picks", type=int, default=15, help="líneas tocadas como máximo por pedido")
+    p.add_argument("--confirm-ratio", type=float, default=0.3)
+    p.add_argument("--pool-size", type=int, default=10)
+    p.add_argument("--list-mode", choices=("cards", "compact"), default="cards")
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--user-password", default="bench")
+    p.add_argument("--pickers", type=int, default=30, help="pickers creados por datagen.py")
+    p.add_argument("--seed", type=int, default=11)
+    p.add_argument("--out", help="archivo JSONL donde agregar el resultado")
+    args = p.parse_args()
+
+    procs = max(1, min(args.procs, args.users))
+    t_start = time.time() + 2.0  # margen para levantar los procesos
+    stop_at = t_start + args.ramp + args.duration
+    jobs = [(args, list(range(k, args.users, procs)), t_start, stop_at) for k in range(procs)]
+    with multiprocessing.get_context("spawn").Pool(procs) as pool:
+        parts = pool.starmap(run_worker, jobs)
+
+    result = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "users": args.users, "procs": procs, "ramp_s": args.ramp,
+        "duration_s": args.duration, "think_s": args.think, "pool_size": args.pool_size,
+        "list_mode": args.list_mode,
+        "errores": sum(r["errores"] for r in parts),
+        "fallos_arnes": sum(r["fallos_arnes"] for r in parts),
+        **summarize([s for r in parts for s in r["samples"]], [x for r in parts for x in r["reruns"]],
+                    time.time() - t_start, [r["peak"] for r in parts]),
+    }
+    print(json.dumps(result, indent=2, default=str))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Modelo de ritmo de picking para ETAs, pronósticos del tablero y asignación.
+
+Se ajusta sobre pedidos cerrados (del primer TS a TS_C):
+
+    minutos = (por_pedido + por_linea * líneas + por_unidad * unidades)
+              / (factor_empresa * factor_picker)
+
+Los coeficientes son globales; los factores (1 = promedio) van en jerarquía
+global -> empresa -> picker y cada uno se encoge hacia el nivel de arriba con
+PRIOR_ORDERS pedidos "promedio", así un picker con tres pedidos de historia
+casi no se aparta del ritmo de su empresa.
+
+RateModelCache mantiene el modelo vigente del proceso y lo reajusta en un
+hilo de fondo: las páginas solo hacen una consulta en memoria.
+"""
+import logging
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MIN_PER_ORDER = 2.0
+DEFAULT_MIN_PER_LINE = 1.0
+MIN_HISTORY_ORDERS = 20
+MAX_ORDER_MINUTES = 8 * 60   # más que un turno: pedido abandonado, no es ritmo
+PRIOR_ORDERS = 10
+FACTOR_BOUNDS = (0.25, 4.0)
+ETA_PRIOR_MINUTES = 10.0     # peso de la historia frente a lo observado en el pedido en curso
+RATE_REFIT_S = 900
+
+log = logging.getLogger("picking.eta")
+
+
+class RateModel(NamedTuple):
+    por_pedido: float
+    por_linea: float
+    por_unidad: float
+    empresa: dict[str, float]
+    speed: dict[str, float]
+    pedidos_historia: int
+
+    def factor(self, picker: str | None = None, empresa=None):
+        """Factor de velocidad combinado; `empresa` puede ser un valor o un array (uno por pedido)."""
+        if empresa is None:
+            f_emp = 1.0
+        elif isinstance(empresa, str):
+            f_emp = self.empresa.get(empresa, 1.0)
+        else:
+            f_emp = pd.Series(np.asarray(empresa, dtype=object)).map(self.empresa).fillna(1.0).to_numpy(dtype=float)
+        return f_emp * (self.speed.get(picker, 1.0) if picker else 1.0)
+
+    def minutes(self, lineas, unidades, picker: str | None = None, empresa=None, pedidos=1):
+        """Minutos de trabajo para `lineas`/`unidades` (escalares o arrays) en `pedidos` pedidos."""
+        work = self.por_pedido * np.asarray(pedidos, dtype=float) \
+            + self.por_linea * np.asarray(lineas, dtype=float) \
+            + self.por_unidad * np.asarray(unidades, dtype=float)
+        return work / self.factor(picker, empresa)
+
+    def remaining(self, lineas: int, unidades: float, lineas_hechas: int, unidades_hechas: float,
+                  elapsed_min: float | None = None, picker: str | None = None, empresa: str | None = None) -> float:
+        """
+        Minutos que faltan para un pedido. Sin avance, es la estimación del
+        modelo; con avance, el modelo se corrige por lo observado en el pedido
+        (tiempo transcurrido contra lo esperado para lo hecho), con un peso que
+        crece con lo hecho: al principio manda la historia.
+        """
+        started = lineas_hechas > 0
+        rest = float(self.minutes(max(lineas - lineas_hechas, 0), max(unidades - unidades_hechas, 0.0),
+                                  picker, empresa, pedidos=0 if started else 1))
+        if not started or elapsed_min is None:
+            return rest
+        expected = float(self.minutes(lineas_hechas, unidades_hechas, picker, empresa))
+        ratio = (float(elapsed_min) + ETA_PRIOR_MINUTES) / (expected + ETA_PRIOR_MINUTES)
+        return rest * min(max(ratio, 1 / FACTOR_BOUNDS[1]), 1 / FACTOR_BOUNDS[0])
+
+
+DEFAULT_MODEL = RateModel(DEFAULT_MIN_PER_ORDER, DEFAULT_MIN_PER_LINE, 0.0, {}, {}, 0)
+
+
+def clean_history(history: pd.DataFrame) -> pd.DataFrame:
+    """Pedidos cerrados con duración creíble (0 < minutos <= MAX_ORDER_MINUTES) y al menos una línea."""
+    h = history.dropna(subset=["minutos"])
+    return h[(h["minutos"] > 0) & (h["minutos"] <= MAX_ORDER_MINUTES) & (h["lineas"] > 0)]
+
+
+def _shrunk_factors(keys: pd.Series, pred: np.ndarray, real: np.ndarray, prior: float) -> dict[str, float]:
+    g = pd.DataFrame({"k": keys.to_numpy(), "pred": pred, "real": real}).dropna(subset=["k"]) \
+        .groupby("k")[["pred", "real"]].sum()
+    return ((g["pred"] + prior) / (g["real"] + prior)).clip(*FACTOR_BOUNDS).to_dict()
+
+
+def fit_rate_model(history: pd.DataFrame) -> RateModel:
+    """
+    Ajusta el modelo sobre la historia (NUMERO, usr_pick, empresa, lineas,
+    unidades, minutos). Con menos de MIN_HISTORY_ORDERS pedidos usa DEFAULT_MODEL.
+    """
+    h = clean_history(history)
+    if len(h) < MIN_HISTORY_ORDERS:
+        return DEFAULT_MODEL._replace(pedidos_historia=len(h))
+    y = h["minutos"].to_numpy(dtype=float)
+    X = np.column_stack([np.ones(len(h)), h["lineas"].to_numpy(dtype=float), h["unidades"].to_numpy(dtype=float)])
+    cols = [0, 1, 2]
+    while True:  # mínimos cuadrados no negativos "a mano": se quita el coeficiente negativo y se reajusta
+        coef, *_ = np.linalg.lstsq(X[:, cols], y, rcond=None)
+        if (coef >= 0).all() or len(cols) == 1:
+            break
+        cols.pop(int(np.argmin(coef)))
+    full = np.zeros(3)
+    full[cols] = np.maximum(coef, 0.0)
+    if full[1] == 0 and full[2] == 0:
+        full[1] = DEFAULT_MIN_PER_LINE
+    pred = full[0] + full[1] * X[:, 1] + full[2] * X[:, 2]
+    prior = PRIOR_ORDERS * float(pred.mean())
+
+    empresa = _shrunk_factors(h["empresa"], pred, y, prior) if "empresa" in h.columns else {}
+    f_emp = h["empresa"].map(empresa).fillna(1.0).to_numpy(dtype=float) if empresa else np.ones(len(h))
+    speed = _shrunk_factors(h["usr_pick"], pred / f_emp, y, prior)
+    return RateModel(float(full[0]), float(full[1]), float(full[2]), empresa, speed, len(h))
+
+
+class RateModelCache:
+    """
+    Modelo vigente compartido por el proceso. El primer uso lo ajusta en el
+    momento; después un hilo de fondo lo reajusta cada `refit_s` segundos
+    desde repo.pick_history(). Si la DB falla, queda el último modelo bueno.
+    """
+
+    def __init__(self, repo, refit_s: float = RATE_REFIT_S, days: int = 30):
+        self._repo = repo
+        self.refit_s = refit_s
+        self.days = days
+        self._lock = threading.Lock()
+        self._model: RateModel | None = None
+        self.fitted_at: float | None = None
+        self._thread = threading.Thread(target=self._run, name="rate-model", daemon=True)
+        self._thread.start()
+
+    def refresh(self) -> RateModel:
+        model = fit_rate_model(self._repo.pick_history(self.days))
+        with self._lock:
+            self._model, self.fitted_at = model, time.time()
+        return model
+
+    def model(self) -> RateModel:
+        with self._lock:
+            model = self._model
+        if model is None:
+            try:
+                model = self.refresh()
+            except Exception:
+                log.warning("No se pudo ajustar el modelo de ritmo; se usa el modelo por defecto", exc_info=True)
+                with self._lock:  # no reintentar en cada rerun: lo hace el hilo de fondo
+                    self._model = model = DEFAULT_MODEL
+        return model
+
+    def _run(self):
+        while True:
+            time.sleep(self.refit_s)
+            try:
+                self.refresh()
+            except Exception:
+                log.warning("No se pudo reajustar el modelo de ritmo; se reintenta en la próxima vuelta", exc_info=True)
@@ -0,0 +1,86 @@
+"""
+Normalización de DataFrames leídos de `sap`.
+
+Las columnas se convierten una sola vez y con operaciones vectorizadas; las
+de texto repetitivo (empresa, usr_pick, color) quedan como categóricas.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+ORDER_TEXT_COLS = ("rs", "empresa", "usr_pick", "color_val")
+ORDER_CATEGORICAL_COLS = ("empresa", "usr_pick", "color_val")
+
+
+def _missing(x) -> bool:
+    return x is None or x is pd.NA or (isinstance(x, (float, np.floating)) and math.isnan(x))
+
+
+def _text(x) -> str:
+    return "" if _missing(x) else str(x)
+
+
+def _cliente(x) -> str:
+    if _missing(x):
+        return ""
+    if isinstance(x, (int, float, np.integer, np.floating)) and float(x).is_integer():
+        return str(int(x))
+    return str(x)
+
+
+def _per_unique(s: pd.Series, fn, categorical: bool = False) -> pd.Series:
+    """
+    Aplica `fn` una vez por valor distinto (pd.factorize) y reexpande con los
+    códigos: las columnas de sap repiten mucho (clientes, empresas, pickers).
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    mapped = np.array([fn(x) for x in uniques], dtype=object)
+    if categorical:
+        cats, inverse = np.unique(mapped.astype(str), return_inverse=True)
+        return pd.Series(pd.Categorical.from_codes(inverse[codes], categories=cats), index=s.index)
+    return pd.Series(mapped[codes], index=s.index, dtype=object)
+
+
+def clean_text(s: pd.Series, categorical: bool = False) -> pd.Series:
+    """None/NaN -> "", el resto str(x)."""
+    return _per_unique(s, _text, categorical)
+
+
+def clean_cliente(s: pd.Series) -> pd.Series:
+    """CLIENTE como texto; None/NaN -> "" y los números enteros sin ".0" (12345.0 -> "12345")."""
+    return _per_unique(s, _cliente)
+
+
+def clean_cantidad(s: pd.Series) -> pd.Series:
+    """CANTIDAD numérica (inválidos -> 0); entera si todos los valores lo son."""
+    q = pd.to_numeric(s, errors="coerce").fillna(0)
+    if pd.api.types.is_float_dtype(q) and (q % 1 == 0).all():
+        return q.astype("int64")
+    return q
+
+
+def clean_flag(s: pd.Series, default: str = "N") -> pd.Series:
+    """Flags Y/N: mayúsculas, sin espacios, vacío/None -> default."""
+    return s.fillna(default).astype(str).str.strip().str.upper().replace({"": default})
+
+
+def order_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Encabezados de pedido (get_orders): CLIENTE y columnas de texto normalizadas."""
+    if "CLIENTE" in df.columns:
+        df["CLIENTE"] = clean_cliente(df["CLIENTE"])
+    for col in ORDER_TEXT_COLS:
+        if col in df.columns:
+            df[col] = clean_text(df[col], categorical=col in ORDER_CATEGORICAL_COLS)
+    return df
+
+
+def items_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Líneas de un pedido (get_order_items): PICKING, CLIENTE, ItemName y CANTIDAD."""
+    df["PICKING"] = clean_flag(df["PICKING"])
+    if "CLIENTE" in df.columns:
+        df["CLIENTE"] = clean_cliente(df["CLIENTE"])
+    if "ItemName" in df.columns:
+        df["ItemName"] = clean_text(df["ItemName"])
+    df["CANTIDAD"] = clean_cantidad(df["CANTIDAD"])
+    return df
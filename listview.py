@@ -0,0 +1,35 @@
+"""
+Listado compacto de pedidos: una sola tabla por rerun en lugar de ~8
+elementos de Streamlit por tarjeta.
+
+La tabla se arma vectorizada desde el DataFrame del listado (order_frame +
+avance). La app la muestra con st.dataframe y selección de fila: abrir un
+pedido es un rerun de la misma sesión, sin recargar la página ni poner el
+token de autologin en links.
+"""
+import numpy as np
+import pandas as pd
+
+TABLE_COLUMNS = ["Pedido", "Cliente", "RS", "Empresa", "Asignado", "Avance", "Picking", "Confirmado"]
+
+
+def _text(s: pd.Series, empty: str = "-") -> pd.Series:
+    return s.fillna("").astype(str).str.strip().replace("", empty)
+
+
+def list_table(orders_df: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por pedido con TABLE_COLUMNS; Avance va de 0 a 100."""
+    if orders_df.empty:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+    total = orders_df["total_items"].astype(int).to_numpy()
+    picked = orders_df["picked_items"].astype(int).to_numpy()
+    return pd.DataFrame({
+        "Pedido": orders_df["NUMERO"].astype(np.int64).to_numpy(),
+        "Cliente": _text(orders_df["CLIENTE"], "").to_numpy(dtype=object),
+        "RS": _text(orders_df["rs"]).to_numpy(dtype=object),
+        "Empresa": _text(orders_df["empresa"]).to_numpy(dtype=object),
+        "Asignado": _text(orders_df["usr_pick"], "—").to_numpy(dtype=object),
+        "Avance": np.where(total > 0, picked * 100 // np.maximum(total, 1), 0),
+        "Picking": [f"{p}/{t}" for p, t in zip(picked, total)],
+        "Confirmado": orders_df["has_any_y"].astype(bool).to_numpy(),
+    })[TABLE_COLUMNS]
@@ -0,0 +1,200 @@
+"""
+Instrumentación liviana de DB, render y reruns.
+
+  - `instrument(name)`: decorador para helpers de DB; mide tiempo y filas.
+  - `timed(name, kind)`: bloque medido (p. ej. el render de las tarjetas).
+  - `gauge_add(name, delta)`: contadores con pico (conexiones en uso).
+  - `annotate(**campos)`: datos extra del rerun en curso (p. ej. tamaño del
+    HTML enviado por el listado).
+  - `rerun(page)`: agrupa lo medido durante un rerun, lo guarda en memoria y
+    emite una línea JSON por el logger "picking.perf".
+
+Las métricas son por proceso y solo en memoria; `snapshot()`, `gauges()` y
+`recent_reruns()` alimentan la página de diagnóstico.
+"""
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+SAMPLES_PER_METRIC = 500
+RERUNS_KEPT = 200
+
+log = logging.getLogger("picking.perf")
+if not log.handlers:
+    _h = logging.StreamHandler()
+    _h.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_h)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+_lock = threading.Lock()
+_metrics: dict[str, dict] = {}
+_gauges: dict[str, dict] = {}
+_reruns: deque = deque(maxlen=RERUNS_KEPT)
+_sinks: list = []  # callables(stats) por cada rerun (p. ej. bench/loadtest.py)
+_current: contextvars.ContextVar[dict | None] = contextvars.ContextVar("picking_perf_rerun", default=None)
+
+
+def record(name: str, ms: float, rows: int | None = None, kind: str = "query"):
+    """Acumula una medición global y, si hay un rerun en curso, en ese rerun."""
+    with _lock:
+        m = _metrics.get(name)
+        if m is None:
+            m = _metrics[name] = {"kind": kind, "n": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                  "rows": 0, "samples": deque(maxlen=SAMPLES_PER_METRIC)}
+        m["n"] += 1
+        m["total_ms"] += ms
+        m["max_ms"] = max(m["max_ms"], ms)
+        m["rows"] += rows or 0
+        m["samples"].append(ms)
+    r = _current.get()
+    if r is not None:
+        r[f"{kind}_n"] = r.get(f"{kind}_n", 0) + 1
+        r[f"{kind}_ms"] = r.get(f"{kind}_ms", 0.0) + ms
+        if kind == "query":
+            r["calls"][name] = r["calls"].get(name, 0) + 1
+            r["rows"] += rows or 0
+
+
+def _rows_of(result) -> int | None:
+    if isinstance(result, (pd.DataFrame, list, dict)):
+        return len(result)
+    return None
+
+
+def instrument(name: str | None = None, kind: str = "query"):
+    """Decorador: tiempo y filas (len del resultado) de cada llamada."""
+    def deco(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                record(label, (time.perf_counter() - t0) * 1000.0, _rows_of(result), kind)
+        return wrapper
+    return deco
+
+
+@contextmanager
+def timed(name: str, kind: str = "render"):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - t0) * 1000.0, None, kind)
+
+
+def gauge_add(name: str, delta: int = 1):
+    with _lock:
+        g = _gauges.setdefault(name, {"value": 0, "peak": 0})
+        g["value"] += delta
+        g["peak"] = max(g["peak"], g["value"])
+        value = g["value"]
+    r = _current.get()
+    if r is not None:
+        r["peaks"][name] = max(r["peaks"].get(name, 0), value)
+
+
+def annotate(**fields):
+    """Agrega campos al resumen del rerun en curso (si lo hay)."""
+    r = _current.get()
+    if r is not None:
+        r.update(fields)
+
+
+@contextmanager
+def rerun(page: str, budget_ms: float | None = None, **fields):
+    """Mide un rerun completo; al salir guarda el resumen y lo loguea como JSON."""
+    stats = {"ts": time.time(), "page": page, "calls": {}, "rows": 0, "peaks": {}, **fields}
+    token = _current.set(stats)
+    t0 = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        stats["total_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+        for k in ("query_ms", "acquire_ms", "render_ms"):
+            if k in stats:
+                stats[k] = round(stats[k], 1)
+        stats["over_budget"] = bool(budget_ms) and stats["total_ms"] > budget_ms
+        with _lock:
+            _reruns.append(stats)
+            sinks = list(_sinks)
+        for fn in sinks:
+            try:
+                fn(stats)
+            except Exception:
+                pass
+        try:
+            line = json.dumps({"perf": "rerun", **stats}, default=str)
+            (log.warning if stats["over_budget"] else log.info)(line)
+        except Exception:
+            pass
+
+
+def snapshot() -> pd.DataFrame:
+    """Una fila por métrica: llamadas, promedio, p50/p95, máximo y filas."""
+    with _lock:
+        items = [(k, dict(v, samples=list(v["samples"]))) for k, v in _metrics.items()]
+    rows = []
+    for name, m in items:
+        s = pd.Series(m["samples"], dtype="float64")
+        rows.append({
+            "metrica": name, "tipo": m["kind"], "llamadas": m["n"],
+            "prom_ms": round(m["total_ms"] / m["n"], 1) if m["n"] else 0.0,
+            "p50_ms": round(s.quantile(0.5), 1) if len(s) else 0.0,
+            "p95_ms": round(s.quantile(0.95), 1) if len(s) else 0.0,
+            "max_ms": round(m["max_ms"], 1), "filas": m["rows"],
+        })
+    cols = ["metrica", "tipo", "llamadas", "prom_ms", "p50_ms", "p95_ms", "max_ms", "filas"]
+    return pd.DataFrame(rows, columns=cols).sort_values("p95_ms", ascending=False, ignore_index=True)
+
+
+def add_sink(fn):
+    """Registra un callable que recibe el resumen de cada rerun."""
+    with _lock:
+        _sinks.append(fn)
+
+
+def remove_sink(fn):
+    with _lock:
+        if fn in _sinks:
+            _sinks.remove(fn)
+
+
+def gauges() -> dict[str, dict]:
+    with _lock:
+        return {k: dict(v) for k, v in _gauges.items()}
+
+
+def recent_reruns(limit: int = 50) -> pd.DataFrame:
+    with _lock:
+        last = list(_reruns)[-limit:]
+    rows = [{
+        "hora": time.strftime("%H:%M:%S", time.localtime(r["ts"])), "pagina": r["page"],
+        "total_ms": r["total_ms"], "consultas": r.get("query_n", 0), "consultas_ms": r.get("query_ms", 0.0),
+        "conexiones": r.get("acquire_n", 0), "espera_pool_ms": r.get("acquire_ms", 0.0),
+        "filas": r["rows"], "excedido": r["over_budget"],
+        "elementos": r.get("list_elements"), "html_kb": r.get("list_html_kb"),
+        "detalle": ", ".join(f"{k}×{v}" for k, v in sorted(r["calls"].items())),
+    } for r in reversed(last)]
+    return pd.DataFrame(rows)
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+        _reruns.clear()
+        for g in _gauges.values():
+            g["peak"] = g["value"]
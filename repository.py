@@ -0,0 +1,1516 @@
+"""
+Capa de acceso a datos de picking.
+
+Todo el SQL de pedidos, ítems, avance, tiempos, asignación y usuarios vive en
+PickingRepository, que recibe el pool de conexiones y una caché enchufable.
+La app lo usa con la caché de Streamlit; bench/ y los procesos batch, con
+NoCache o MemoryCache y su propio pool. Con `replica_pool`, las lecturas
+pesadas van a la réplica mientras su demora sea menor a `max_lag_s`:
+
+    repo = PickingRepository(make_pool(cfg), cache=MemoryCache())
+    page = repo.orders(usr_pick="picker01", token=repo.cache_token("orders"))
+"""
+import heapq
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple, Protocol, TypedDict
+from zoneinfo import ZoneInfo
+
+import bcrypt
+import mysql.connector
+import numpy as np
+import pandas as pd
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+
+import perf
+from assignment import AssignmentPlan, plan_balanced_assignment
+from eta import RateModel, fit_rate_model
+from frames import items_frame, order_frame
+from routing import LOCATION_COLUMNS, ROUTE_COLUMNS, plan_route
+
+POOL_MAX_SIZE = 32  # límite de mysql.connector
+REPLICA_LAG_CHECK_S = 5  # cada cuánto se vuelve a medir la demora de la réplica
+REPLICA_ACQUIRE_S = 0.5  # espera máxima por una conexión de la réplica antes de ir al primario
+TZ_BA = ZoneInfo("America/Argentina/Buenos_Aires")
+
+ORDERS_PAGE_SIZE = 150
+SEARCH_MIN_CHARS = 3     # = innodb_ft_min_token_size por defecto
+NUMERO_MAX_DIGITS = 12
+_FT_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+ORDER_COLUMNS = ["NUMERO", "CLIENTE", "usr_pick", "rs", "empresa", "color_val"]
+ORDER_PROGRESS_COLUMNS = ["NUMERO", "total_items", "picked_items", "has_any_y"]
+USER_PROGRESS_COLUMNS = ["usuario", "pedidos", "pedidos_abiertos", "items", "items_picked",
+                         "qty_total", "qty_picked"]
+
+
+# ================== TIPOS ==================
+class UserRow(TypedDict):
+    id: int
+    username: str
+    password_hash: str
+    nombre: str | None
+    rol: str | None
+
+
+class CompletedOrder(NamedTuple):
+    filas: int
+    ts_start: datetime | None
+    ts_c: datetime | None
+
+
+class AssignmentResult(NamedTuple):
+    pedidos: int
+    filas: int
+
+
+class OrderTiming(NamedTuple):
+    ts_start: datetime | None
+    elapsed_min: int | None
+    now_ar: datetime
+    ts_start_ar: datetime | None
+
+
+# ================== CACHÉ ENCHUFABLE ==================
+class Cache(Protocol):
+    def get_or_load(self, name: str, key: tuple, loader: Callable[[], object]) -> object: ...
+    def clear(self) -> None: ...
+
+
+class NoCache:
+    """Sin caché: cada lectura va a la DB (benchmarks en frío, batch)."""
+
+    def get_or_load(self, name, key, loader):
+        return loader()
+
+    def clear(self):
+        pass
+
+
+class MemoryCache:
+    """LRU en memoria con TTL, segura entre hilos (procesos sin Streamlit)."""
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, name, key, loader):
+        k = (name, key)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(k)
+            if hit is not None and now - hit[0] < self.ttl:
+                self._data.move_to_end(k)
+                return hit[1]
+        value = loader()
+        with self._lock:
+            self._data[k] = (now, value)
+            self._data.move_to_end(k)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# ================== POOL ==================
+def make_pool(cfg: Mapping) -> pooling.MySQLConnectionPool:
+    """Pool desde la config de conexión (mismas claves que st.secrets["app_marco_new"])."""
+    size = int(cfg.get("pool_size", 10))
+    return pooling.MySQLConnectionPool(
+        pool_name=cfg.get("pool_name", "picking"),
+        pool_size=max(1, min(size, POOL_MAX_SIZE)),
+        pool_reset_session=True,
+        host=cfg["host"],
+        user=cfg["user"],
+        password=cfg["password"],
+        database=cfg["database"],
+        port=cfg.get("port", 3306),
+    )
+
+
+# ================== ESQUEMA SAP ==================
+# Columnas generadas sobre sap para que los filtros calientes usen índices:
+#   usr_pick_n = NULLIF(TRIM(usr_pick), '')                 -> asignación normalizada
+#   picking_y  = 1 si UPPER(TRIM(PICKING)) = 'Y', si no 0    -> flag de picking
+#   search_txt = CLIENTE + rs (STORED, para el índice FULLTEXT de la búsqueda)
+SAP_GENERATED_COLUMNS = {
+    "usr_pick_n": "VARCHAR(100) AS (NULLIF(TRIM(usr_pick), '')) VIRTUAL",
+    "picking_y":  "TINYINT AS (IF(UPPER(TRIM(COALESCE(PICKING,'N'))) = 'Y', 1, 0)) VIRTUAL",
+    "search_txt": "VARCHAR(255) AS (CONCAT_WS(' ', CLIENTE, rs)) STORED",
+}
+SAP_INDEXES = {
+    "idx_sap_numero_codigo":  ("INDEX", "(NUMERO, CODIGO)"),
+    "idx_sap_numero_picking": ("INDEX", "(NUMERO, picking_y)"),
+    "idx_sap_usr_numero":     ("INDEX", "(usr_pick_n, NUMERO)"),
+    "ft_sap_search":          ("FULLTEXT INDEX", "(search_txt)"),
+}
+SCHEMA_FEATURES_TTL = 300
+SCHEMA_FEATURES_MISSING_TTL = 5  # si falta algo de la migración se revisa seguido: puede aplicarla otro proceso
+REBUILD_CATCHUP_S = 60           # margen para escrituras en curso al tomar la foto de rebuild_order_header
+HEADER_SYNC_CHUNK = 1000
+ER_NO_SUCH_TABLE = 1146
+
+ORDER_HEADER_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        NUMERO        BIGINT PRIMARY KEY,
+        CLIENTE       VARCHAR(255),
+        rs            VARCHAR(100),
+        empresa       VARCHAR(100),
+        usr_pick      VARCHAR(100) NULL,
+        color         VARCHAR(50),
+        items         INT NOT NULL DEFAULT 0,
+        items_picked  INT NOT NULL DEFAULT 0,
+        qty_total     DECIMAL(18,3) NOT NULL DEFAULT 0,
+        qty_picked    DECIMAL(18,3) NOT NULL DEFAULT 0,
+        ts_start      DATETIME NULL,
+        ts_c          DATETIME NULL,
+        search_txt    VARCHAR(255),
+        actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        KEY idx_oh_usr_numero (usr_pick, NUMERO),
+        FULLTEXT KEY ft_oh_search (search_txt)
+    )
+"""
+_ORDER_HEADER_COLS = ("NUMERO, CLIENTE, rs, empresa, usr_pick, color, items, items_picked, "
+                      "qty_total, qty_picked, ts_start, ts_c, search_txt")
+
+# Versiones de caché. Cada escritura incrementa la versión de los scopes que afecta:
+#   "orders"      -> listados globales: qué pedidos hay y sus campos (asignación, cierre)
+#   "progress"    -> avance agregado (tablero del equipo); solo lo mira el agregador del proceso
+#   "users"       -> listados por usuario y usuarios distintos (asignaciones)
+#   "user:<u>"    -> pedidos asignados a <u>
+#   "order:<n>"   -> ítems y avance del pedido <n>
+# Un toggle de picking sube order:<n>, user:<u> y progress, no "orders": los
+# listados abiertos en otras sesiones siguen en caché y solo re-consultan el
+# avance de los pedidos que muestran.
+#   "locations"   -> ubicaciones del depósito (rutas de picking)
+#   "sap"         -> recarga completa (rebuild); va implícito en todos los tokens
+# Los lectores pasan cache_token(...) como parte de la clave de caché: si nada
+# cambió, la clave es la misma y no se re-consulta.
+CACHE_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS cache_version (
+        scope   VARCHAR(150) PRIMARY KEY,
+        version BIGINT UNSIGNED NOT NULL DEFAULT 0
+    )
+"""
+CACHE_FALLBACK_TTL = 30  # sin tabla cache_version: como el TTL anterior
+
+USUARIOS_DDL = """
+    CREATE TABLE IF NOT EXISTS usuarios (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        nombre VARCHAR(100),
+        rol VARCHAR(50),
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Ubicación de cada SKU en el depósito (ver routing.py), cargada desde CSV.
+UBICACIONES_DDL = """
+    CREATE TABLE IF NOT EXISTS ubicaciones (
+        CODIGO   VARCHAR(50) PRIMARY KEY,
+        pasillo  INT NOT NULL,
+        posicion INT NOT NULL,
+        nivel    VARCHAR(10) NOT NULL DEFAULT '',
+        actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+LOCATIONS_CHUNK = 1000
+PICK_HISTORY_DAYS = 30   # ventana de pedidos cerrados para estimar ritmos
+
+ORDER_ITEMS_SQL = """
+    SELECT NUMERO, CLIENTE, CODIGO, ItemName, CANTIDAD, COALESCE(PICKING, 'N') AS PICKING, TS, empresa
+    FROM sap
+    WHERE NUMERO = %s
+    ORDER BY CODIGO
+"""
+
+
+def _table_columns(cur, table: str) -> set[str]:
+    cur.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return {r[0] for r in cur.fetchall()}
+
+
+def _table_indexes(cur, table: str) -> set[str]:
+    cur.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return {r[0] for r in cur.fetchall()}
+
+
+# ================== BÚSQUEDA ==================
+def normalize_search(buscar: str | None) -> str | None:
+    """
+    Texto de búsqueda canónico (espacios colapsados, minúsculas) para que
+    variantes equivalentes compartan la misma entrada de caché. Devuelve None
+    si todavía no alcanza para consultar: los textos cortos se descartan
+    hasta tener SEARCH_MIN_CHARS (los números, siempre van).
+    """
+    q = " ".join((buscar or "").split()).lower()
+    if not q:
+        return None
+    if not q.isdigit() and len(q) < SEARCH_MIN_CHARS:
+        return None
+    return q
+
+
+def _numero_prefix_ranges(digits: str) -> list[tuple[int, int]]:
+    """Rangos de NUMERO que empiezan con `digits` (uno por largo posible): usan el índice."""
+    k = len(digits)
+    base = int(digits)
+    return [(base * 10 ** (n - k), (base + 1) * 10 ** (n - k) - 1)
+            for n in range(k, max(k, NUMERO_MAX_DIGITS) + 1)]
+
+
+def _search_clause(buscar: str, alias: str, fulltext: bool) -> tuple[str, list]:
+    """
+    Búsqueda del listado:
+      - solo dígitos -> NUMERO exacto o por prefijo (rangos sobre la PK/índice);
+                        con ceros a la izquierda, el texto tal cual (LIKE)
+      - texto        -> FULLTEXT sobre search_txt (CLIENTE + rs), cada palabra
+                        como prefijo; si la migración no está aplicada, LIKE.
+    `alias` es la tabla consultada (sap `s` u order_header `h`).
+    """
+    if buscar.isdigit():
+        if buscar.startswith("0"):  # int() perdería los ceros: "007" no es el prefijo 7
+            return f"CAST({alias}.NUMERO AS CHAR) LIKE %s", [f"{buscar}%"]
+        ranges = _numero_prefix_ranges(buscar)
+        sql = " OR ".join([f"{alias}.NUMERO BETWEEN %s AND %s"] * len(ranges))
+        return f"({sql})", [v for r in ranges for v in r]
+    if fulltext:
+        words = [w for w in _FT_OPERATORS.sub(" ", buscar).split() if len(w) >= SEARCH_MIN_CHARS]
+        if words:
+            return f"MATCH({alias}.search_txt) AGAINST (%s IN BOOLEAN MODE)", [" ".join(f"+{w}*" for w in words)]
+        return f"{alias}.CLIENTE LIKE %s", [f"{buscar}%"]
+    return (f"(CAST({alias}.NUMERO AS CHAR) LIKE %s OR {alias}.CLIENTE LIKE %s OR CAST({alias}.rs AS CHAR) LIKE %s)",
+            [f"%{buscar}%", f"%{buscar}%", f"%{buscar}%"])
+
+
+# ================== ASIGNACIÓN (en memoria) ==================
+def plan_usr_pick_assignment(orders: list[tuple[int, int]], pickers: list[str],
+                             strategy: str = "random") -> dict[int, str]:
+    """
+    Arma el mapeo NUMERO -> usr_pick en memoria.
+      - random:   cada pedido a un picker al azar (comportamiento histórico).
+      - balanced: round-robin ponderado por cantidad de ítems; los pedidos más
+                  grandes primero, siempre al picker con menos ítems acumulados.
+    `orders` es una lista de (NUMERO, items).
+    """
+    if not pickers:
+        raise ValueError("La lista de pickers está vacía.")
+    if strategy == "random":
+        return {num: random.choice(pickers) for num, _ in orders}
+    if strategy != "balanced":
+        raise ValueError(f"Estrategia de asignación desconocida: {strategy}")
+    order = pickers[:]
+    random.shuffle(order)  # desempate sin sesgo hacia el primero de la lista
+    heap = [(0, i, p) for i, p in enumerate(order)]
+    heapq.heapify(heap)
+    mapping = {}
+    for num, items in sorted(orders, key=lambda o: o[1], reverse=True):
+        load, i, p = heapq.heappop(heap)
+        mapping[num] = p
+        heapq.heappush(heap, (load + int(items or 0), i, p))
+    return mapping
+
+
+# ================== REPOSITORIO ==================
+class PickingRepository:
+    """
+    Consultas y escrituras de picking sobre un pool inyectado. Es seguro entre
+    hilos (sesiones de Streamlit, hilos de fondo, batch): el estado propio se
+    limita a la detección de esquema, los contadores locales de versión y el
+    estado de la réplica.
+
+    Las escrituras y order_items van siempre al primario. Las lecturas de
+    listados y tableros (orders, orders_progress, distinct_users,
+    user_progress y su cache_token) aceptan `primary=`: False las manda a la
+    réplica si está configurada y al día; True (leer lo propio recién escrito)
+    las deja en el primario. Token y datos deben pedirse con el mismo valor,
+    así un token nunca avanza antes de que la fuente tenga los datos.
+    """
+
+    def __init__(self, pool: pooling.MySQLConnectionPool, pool_timeout: float = 10.0,
+                 cache: Cache | None = None, replica_pool: pooling.MySQLConnectionPool | None = None,
+                 max_lag_s: float = 5.0):
+        self.pool = pool
+        self.pool_timeout = pool_timeout
+        self.cache = cache or NoCache()
+        self.replica_pool = replica_pool
+        self.max_lag_s = max_lag_s
+        self._replica = {"ok": False, "lag_s": None, "checked": None, "error": None}
+        self._replica_lock = threading.Lock()
+        self._features: dict | None = None
+        self._features_at = 0.0
+        self._features_lock = threading.Lock()
+        self._local_versions: dict[str, int] = {}
+        self._versions_lock = threading.Lock()
+        self._version_listeners: list = []  # callables(scopes) avisados en cada bump local
+
+    # ======= Conexión =======
+    def _acquire(self, pool, timeout: float):
+        """Conexión validada (ping + reconexión); reintenta mientras el pool esté agotado."""
+        t0 = time.monotonic()
+        deadline = t0 + timeout
+        while True:
+            try:
+                conn = pool.get_connection()
+                break
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=0.2)
+        except Exception:
+            try: conn.close()
+            except Exception: pass
+            raise
+        perf.record("db.acquire", (time.monotonic() - t0) * 1000.0, kind="acquire")
+        return conn
+
+    @contextmanager
+    def conn(self, primary: bool = True):
+        """
+        Toma una conexión del pool, la valida (ping + reconexión) y la devuelve
+        al pool al salir. Si el bloque falla, hace rollback de lo pendiente.
+        primary=False usa la réplica cuando está disponible (solo lecturas); si
+        no se puede conectar a ella, la lectura va al primario y la réplica
+        queda descartada hasta la próxima medición.
+        """
+        conn, gauge = None, "db.en_uso"
+        if not primary and self.replica_ok():
+            try:
+                conn = self._acquire(self.replica_pool, min(self.pool_timeout, REPLICA_ACQUIRE_S))
+                gauge = "db.replica.en_uso"
+            except Exception as e:
+                self._replica_failed(e)
+        if conn is None:
+            conn = self._acquire(self.pool, self.pool_timeout)
+        perf.gauge_add(gauge, 1)
+        try:
+            yield conn
+        except Exception:
+            try: conn.rollback()
+            except Exception: pass
+            raise
+        finally:
+            perf.gauge_add(gauge, -1)
+            try: conn.close()  # vuelve al pool
+            except Exception: pass
+
+    # ======= Réplica =======
+    @perf.instrument("replica_lag")
+    def _measure_replica_lag(self) -> float | None:
+        """Seconds_Behind_Source de la réplica (None si la replicación está detenida)."""
+        conn = self.replica_pool.get_connection()
+        try:
+            cur = conn.cursor(dictionary=True)
+            try:
+                try:
+                    cur.execute("SHOW REPLICA STATUS")        # MySQL >= 8.0.22
+                except mysql.connector.errors.Error:
+                    cur.execute("SHOW SLAVE STATUS")          # MySQL 5.7 / MariaDB
+                row = cur.fetchone()
+                cur.fetchall()
+            finally:
+                cur.close()
+        finally:
+            conn.close()
+        if not row:
+            return 0.0  # el servidor no es réplica (p. ej. un proxy): sin demora
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return float(lag) if lag is not None else None
+
+    def replica_ok(self) -> bool:
+        """La réplica existe, replica y su demora es menor a max_lag_s (medido cada pocos segundos)."""
+        if self.replica_pool is None:
+            return False
+        st = self._replica
+        with self._replica_lock:
+            if st["checked"] is not None and time.monotonic() - st["checked"] < REPLICA_LAG_CHECK_S:
+                return st["ok"]
+            st["checked"] = time.monotonic()  # una sola medición a la vez; el resto usa el valor previo
+        try:
+            lag, error = self._measure_replica_lag(), None
+        except Exception as e:
+            lag, error = None, str(e)
+        with self._replica_lock:
+            st.update(lag_s=lag, error=error, ok=lag is not None and lag <= self.max_lag_s)
+            return st["ok"]
+
+    def _replica_failed(self, error: Exception):
+        """Réplica caída o agotada: se deja de usar por REPLICA_LAG_CHECK_S segundos."""
+        perf.record("db.replica.fallback", 0.0, kind="acquire")
+        with self._replica_lock:
+            self._replica.update(ok=False, error=str(error), checked=time.monotonic())
+
+    def replica_status(self) -> dict:
+        """Estado de la réplica para diagnóstico: configurada, en uso, demora y último error."""
+        if self.replica_pool is None:
+            return {"configured": False, "ok": False, "lag_s": None, "error": None}
+        self.replica_ok()
+        with self._replica_lock:
+            return {"configured": True, "max_lag_s": self.max_lag_s,
+                    **{k: v for k, v in self._replica.items() if k != "checked"}}
+
+    # ======= Esquema =======
+    def features(self, refresh: bool = False) -> dict:
+        """
+        Qué partes de la migración están aplicadas. Se revisa cada
+        SCHEMA_FEATURES_TTL segundos, o cada SCHEMA_FEATURES_MISSING_TTL
+        mientras falte algo (así otro proceso que la aplica se nota enseguida).
+        Si la DB falla, devuelve lo último conocido (o propaga el error).
+        """
+        with self._features_lock:
+            if self._features is not None and not refresh:
+                ttl = SCHEMA_FEATURES_TTL if all(self._features.values()) else SCHEMA_FEATURES_MISSING_TTL
+                if time.monotonic() - self._features_at < ttl:
+                    return self._features
+        try:
+            value = self._read_features()
+        except Exception:
+            # Un error pasajero no es "falta la migración": se sigue con lo último
+            # conocido (sin memorizar, se reintenta en la próxima llamada).
+            with self._features_lock:
+                last = self._features
+            if last is None:
+                raise
+            return last
+        with self._features_lock:
+            self._features, self._features_at = value, time.monotonic()
+        return value
+
+    @perf.instrument("schema_features")
+    def _read_features(self) -> dict:
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cols = _table_columns(cur, "sap")
+            idxs = _table_indexes(cur, "sap")
+            header = _table_columns(cur, "order_header")
+            versions = _table_columns(cur, "cache_version")
+            locations = _table_columns(cur, "ubicaciones")
+            cur.close()
+        return {
+            "sap_norm": {"usr_pick_n", "picking_y"} <= cols,
+            "sap_search": "search_txt" in cols and "ft_sap_search" in idxs,
+            "order_header": bool(header),
+            "cache_version": bool(versions),
+            "ubicaciones": bool(locations),
+        }
+
+    def sap_cols(self, alias: str = "s") -> dict:
+        """
+        Expresiones SQL para usuario asignado ('usr', NULL si vacío) y flag de
+        picking ('picked', verdadero si Y): usan las columnas generadas si la
+        migración está aplicada; si no, las expresiones equivalentes.
+        """
+        p = f"{alias}." if alias else ""
+        if self.features().get("sap_norm"):
+            return {"usr": f"{p}usr_pick_n", "picked": f"{p}picking_y = 1"}
+        return {
+            "usr": f"NULLIF(TRIM({p}usr_pick), '')",
+            "picked": f"UPPER(TRIM(COALESCE({p}PICKING,'N'))) = 'Y'",
+        }
+
+    def ensure_sap_schema(self) -> list[str]:
+        """
+        Migración idempotente: agrega a sap las columnas generadas y los índices
+        compuestos que faltan (en un solo ALTER), indexa sap_color.empresa y crea
+        (y llena) la tabla resumen order_header. Devuelve los cambios aplicados.
+        """
+        applied = []
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                cols = _table_columns(cur, "sap")
+                idxs = _table_indexes(cur, "sap")
+                alters, fulltext = [], []
+                for name, ddl in SAP_GENERATED_COLUMNS.items():
+                    if name not in cols:
+                        alters.append(f"ADD COLUMN {name} {ddl}")
+                        applied.append(f"sap.{name}")
+                for name, (kind, ddl) in SAP_INDEXES.items():
+                    if name not in idxs:
+                        # InnoDB agrega un solo FULLTEXT por ALTER: van aparte.
+                        (fulltext if kind.startswith("FULLTEXT") else alters).append(f"ADD {kind} {name} {ddl}")
+                        applied.append(f"sap.{name}")
+                if alters:
+                    cur.execute("ALTER TABLE sap " + ", ".join(alters))
+                for ddl in fulltext:
+                    cur.execute("ALTER TABLE sap " + ddl)
+                cur.execute("""
+                    SELECT COUNT(*) FROM information_schema.STATISTICS
+                     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'sap_color'
+                       AND COLUMN_NAME = 'empresa' AND SEQ_IN_INDEX = 1
+                """)
+                if "empresa" in _table_columns(cur, "sap_color") and not cur.fetchone()[0]:
+                    cur.execute("ALTER TABLE sap_color ADD INDEX idx_sap_color_empresa (empresa)")
+                    applied.append("sap_color.idx_sap_color_empresa")
+                if not _table_columns(cur, "cache_version"):
+                    cur.execute(CACHE_VERSION_DDL)
+                    applied.append("cache_version")
+                conn.commit()
+                header_missing = not _table_columns(cur, "order_header")
+            finally:
+                cur.close()
+        self.features(refresh=True)
+        if header_missing:
+            self.rebuild_order_header()
+            applied.append("order_header")
+        self.cache.clear()
+        return applied
+
+    # ======= order_header: resumen por pedido =======
+    # Una fila por NUMERO con cabecera, conteos, cantidades y TS. Los métodos de
+    # escritura lo recalculan para los pedidos que tocan, en la misma
+    # transacción; sync_order_header() suma los pedidos que llegan por una
+    # recarga de SAP (la app lo corre cada HEADER_SYNC_S) y
+    # rebuild_order_header() lo regenera completo.
+    def _order_header_select(self, where_sql: str) -> str:
+        c = self.sap_cols("s")
+        qty = "COALESCE(CAST(s.CANTIDAD AS DECIMAL(18,3)),0)"
+        return f"""
+            SELECT
+              s.NUMERO,
+              MIN(s.CLIENTE), MIN(s.rs), MIN(s.empresa), MIN({c['usr']}), MIN(sc.color),
+              COUNT(*),
+              SUM(CASE WHEN {c['picked']} THEN 1 ELSE 0 END),
+              SUM({qty}),
+              SUM(CASE WHEN {c['picked']} THEN {qty} ELSE 0 END),
+              MAX(s.TS), MAX(s.TS_C),
+              CONCAT_WS(' ', MIN(s.CLIENTE), MIN(s.rs))
+            FROM sap s
+            -- un color por empresa: sap_color puede repetir empresa y duplicaría los conteos
+            LEFT JOIN (SELECT empresa, MIN(color) AS color FROM sap_color GROUP BY empresa) sc
+                   ON sc.empresa = s.empresa
+            {where_sql}
+            GROUP BY s.NUMERO
+        """
+
+    def refresh_order_header(self, cur, where_sql: str, params: list) -> int:
+        """
+        Recalcula order_header para los pedidos que cumplen `where_sql` (sobre sap
+        con alias s, p. ej. "WHERE s.NUMERO IN (...)"). Usa el cursor del llamador
+        para quedar en su transacción. No hace nada si la tabla no existe.
+
+        Aunque features() diga que falta, se intenta igual: la migración pudo
+        crearla recién en otro proceso y este no debe dejar de mantenerla
+        mientras dura el memo (sin tabla, falla solo esta sentencia).
+        """
+        # actualizado_en siempre se toca: es la marca que usa rebuild_order_header para ponerse al día
+        updates = ", ".join(f"{col} = VALUES({col})" for col in _ORDER_HEADER_COLS.split(", ")[1:])
+        updates += ", actualizado_en = CURRENT_TIMESTAMP"
+        try:
+            cur.execute(f"""
+                INSERT INTO order_header ({_ORDER_HEADER_COLS})
+                {self._order_header_select(where_sql)}
+                ON DUPLICATE KEY UPDATE {updates}
+            """, params)
+        except mysql.connector.errors.ProgrammingError as e:
+            if e.errno == ER_NO_SUCH_TABLE and not self.features().get("order_header"):
+                return 0
+            raise
+        return cur.rowcount or 0
+
+    def refresh_order_header_for(self, cur, numeros) -> int:
+        numeros = sorted({int(n) for n in numeros})
+        if not numeros:
+            return 0
+        marks = ", ".join(["%s"] * len(numeros))
+        return self.refresh_order_header(cur, f"WHERE s.NUMERO IN ({marks})", numeros)
+
+    @perf.instrument("rebuild_order_header")
+    def rebuild_order_header(self) -> int:
+        """
+        Regenera order_header desde sap en una tabla nueva y la intercambia con
+        RENAME (atómico para los lectores). Devuelve la cantidad de pedidos.
+
+        La foto es una lectura consistente (READ COMMITTED): no bloquea las
+        escrituras de los pickers. Mientras se llena la nueva, las escrituras
+        siguen refrescando la vieja; después del RENAME se recalculan en la
+        nueva los pedidos que la vieja marcó (actualizado_en) desde la foto,
+        con REBUILD_CATCHUP_S de margen.
+        """
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("DROP TABLE IF EXISTS order_header_new")
+                cur.execute(ORDER_HEADER_DDL.format(table="order_header_new"))
+                cur.execute(ORDER_HEADER_DDL.format(table="order_header"))
+                cur.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")  # solo la transacción de la foto
+                cur.execute("SELECT NOW() - INTERVAL %s SECOND", (REBUILD_CATCHUP_S,))
+                since = cur.fetchone()[0]
+                cur.execute(f"INSERT INTO order_header_new ({_ORDER_HEADER_COLS}) {self._order_header_select('')}")
+                n = cur.rowcount or 0
+                conn.commit()
+                cur.execute("RENAME TABLE order_header TO order_header_old, order_header_new TO order_header")
+                cur.execute("SELECT NUMERO FROM order_header_old WHERE actualizado_en >= %s", (since,))
+                self.refresh_order_header_for(cur, [num for (num,) in cur.fetchall()])
+                cur.execute("DROP TABLE IF EXISTS order_header_old")
+                scopes = self.bump_versions(cur, {"sap"})  # recarga de SAP: invalida todo
+                conn.commit()
+                self.publish_versions(scopes)
+            finally:
+                cur.close()
+        self.features(refresh=True)
+        return n
+
+    @perf.instrument("sync_order_header")
+    def sync_order_header(self) -> int:
+        """
+        Pone order_header al día con lo que cambió en sap por fuera de la app
+        (recargas de SAP): agrega los pedidos que faltan y quita los que ya no
+        están. Lecturas consistentes, sin bloquear a los pickers. Devuelve la
+        cantidad de pedidos agregados + quitados.
+        """
+        if not self.features().get("order_header"):
+            return 0
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                cur.execute("""
+                    SELECT DISTINCT s.NUMERO FROM sap s
+                      LEFT JOIN order_header h ON h.NUMERO = s.NUMERO
+                     WHERE h.NUMERO IS NULL
+                """)
+                nuevos = [n for (n,) in cur.fetchall()]
+                cur.execute("""
+                    SELECT h.NUMERO FROM order_header h
+                     WHERE NOT EXISTS (SELECT 1 FROM sap s WHERE s.NUMERO = h.NUMERO)
+                """)
+                viejos = [n for (n,) in cur.fetchall()]
+                if not nuevos and not viejos:
+                    conn.commit()
+                    return 0
+                for i in range(0, len(nuevos), HEADER_SYNC_CHUNK):
+                    self.refresh_order_header_for(cur, nuevos[i:i + HEADER_SYNC_CHUNK])
+                for i in range(0, len(viejos), HEADER_SYNC_CHUNK):
+                    chunk = viejos[i:i + HEADER_SYNC_CHUNK]
+                    cur.execute(f"DELETE FROM order_header WHERE NUMERO IN ({', '.join(['%s'] * len(chunk))})", chunk)
+                scopes = self.bump_versions(cur, {"orders", "users", "progress"})
+                conn.commit()
+                self.publish_versions(scopes)
+            finally:
+                cur.close()
+        return len(nuevos) + len(viejos)
+
+    # ======= Versiones de caché =======
+    def add_version_listener(self, fn):
+        with self._versions_lock:
+            self._version_listeners.append(fn)
+
+    def order_scopes(self, cur, numeros, listed: bool = False) -> set[str]:
+        """
+        Scopes afectados por escribir en estos pedidos (incluye sus usuarios
+        asignados). listed=True si cambian campos que muestra el listado global
+        (cierre, asignación); si no, solo avance.
+        """
+        numeros = sorted({int(n) for n in numeros})
+        scopes = {"progress"} | {f"order:{n}" for n in numeros} | ({"orders"} if listed else set())
+        if numeros:
+            marks = ", ".join(["%s"] * len(numeros))
+            if self.features().get("order_header"):
+                cur.execute(f"SELECT DISTINCT usr_pick FROM order_header WHERE NUMERO IN ({marks})", numeros)
+            else:
+                usr = self.sap_cols("")["usr"]
+                cur.execute(f"SELECT DISTINCT {usr} FROM sap WHERE NUMERO IN ({marks})", numeros)
+            scopes |= {f"user:{u}" for (u,) in cur.fetchall() if u}
+        return scopes
+
+    def bump_versions(self, cur, scopes) -> list[str]:
+        """
+        Sube cache_version de los scopes, si existe, en la transacción de `cur`.
+        No toca nada del proceso: el llamador pasa lo devuelto a
+        publish_versions() después del commit (un rollback no invalida nada).
+        """
+        scopes = sorted(set(scopes))
+        if scopes and self.features().get("cache_version"):
+            cur.executemany(
+                "INSERT INTO cache_version (scope, version) VALUES (%s, 1) "
+                "ON DUPLICATE KEY UPDATE version = version + 1",
+                [(sc,) for sc in scopes]
+            )
+        return scopes
+
+    def publish_versions(self, scopes):
+        """Ya confirmada la escritura: contador local del proceso y aviso a los listeners."""
+        if not scopes:
+            return
+        with self._versions_lock:
+            for sc in scopes:
+                self._local_versions[sc] = self._local_versions.get(sc, 0) + 1
+            listeners = list(self._version_listeners)
+        for fn in listeners:
+            try:
+                fn(scopes)
+            except Exception:
+                pass
+
+    @perf.instrument("cache_token")
+    def cache_token(self, *scopes: str, primary: bool = True) -> tuple:
+        """
+        Token barato para revalidar cachés: una lectura por PK de cache_version.
+        Sin esa tabla, cae a una ventana de CACHE_FALLBACK_TTL segundos más el
+        contador local (las escrituras de este proceso invalidan al instante).
+        """
+        scopes = ("sap",) + scopes
+        if self.features().get("cache_version"):
+            try:
+                marks = ", ".join(["%s"] * len(scopes))
+                with self.conn(primary) as conn:
+                    cur = conn.cursor()
+                    cur.execute(f"SELECT scope, version FROM cache_version WHERE scope IN ({marks})", list(scopes))
+                    found = dict(cur.fetchall())
+                    cur.close()
+                return ("db",) + tuple(int(found.get(sc, 0)) for sc in scopes)
+            except Exception:
+                pass
+        with self._versions_lock:
+            local = tuple(self._local_versions.get(sc, 0) for sc in scopes)
+        return ("ttl", int(time.time() // CACHE_FALLBACK_TTL)) + local
+
+    # ======= Pedidos =======
+    def _orders_sql(self, buscar: str | None = None, usr_pick: str | None = None,
+                    before: int | None = None, page_size: int = ORDERS_PAGE_SIZE) -> tuple[str, list]:
+        params, where = [], []
+        if self.features().get("order_header"):
+            # Desde order_header: una fila por pedido, sin GROUP BY.
+            if buscar:
+                clause, clause_params = _search_clause(buscar, "h", fulltext=True)
+                where.append(clause)
+                params.extend(clause_params)
+            if usr_pick:
+                where.append("h.usr_pick = %s")
+                params.append(usr_pick)
+            if before is not None:
+                where.append("h.NUMERO < %s")
+                params.append(int(before))
+            where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+            q = f"""
+                SELECT h.NUMERO, h.CLIENTE, h.usr_pick, h.rs, h.empresa, h.color AS color_val
+                FROM order_header h
+                {where_sql}
+                ORDER BY h.NUMERO DESC
+                LIMIT %s
+            """
+            params.append(int(page_size))
+            return q, params
+        c = self.sap_cols("s")
+        if buscar:
+            clause, clause_params = _search_clause(buscar, "s", self.features().get("sap_search"))
+            where.append(clause)
+            params.extend(clause_params)
+        if usr_pick:
+            where.append(f"{c['usr']} = %s")
+            params.append(usr_pick)
+        if before is not None:
+            where.append("s.NUMERO < %s")
+            params.append(int(before))
+        where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+        q = f"""
+            SELECT
+              s.NUMERO,
+              MIN(s.CLIENTE) AS CLIENTE,
+              MIN(s.usr_pick) AS usr_pick,
+              MIN(s.rs) AS rs,
+              MIN(s.empresa) AS empresa,
+              MIN(sc.color) AS color_val
+            FROM sap s
+            LEFT JOIN sap_color sc ON sc.empresa = s.empresa
+            {where_sql}
+            GROUP BY s.NUMERO
+            ORDER BY s.NUMERO DESC
+            LIMIT %s
+        """
+        params.append(int(page_size))
+        return q, params
+
+    @perf.instrument("get_orders")
+    def _load_orders(self, buscar, usr_pick, before, page_size, primary) -> pd.DataFrame:
+        q, params = self._orders_sql(buscar, usr_pick, before, page_size)
+        with self.conn(primary) as conn:
+            df = pd.read_sql(q, conn, params=params)
+        return order_frame(df)
+
+    def orders(self, buscar: str | None = None, usr_pick: str | None = None,
+               before: int | None = None, page_size: int = ORDERS_PAGE_SIZE,
+               token: tuple | None = None, primary: bool = False) -> pd.DataFrame:
+        """
+        Una página de pedidos (ORDER_COLUMNS), de NUMERO más alto a más bajo.
+        `usr_pick` filtra en SQL por usuario asignado (None = todos).
+        Paginación keyset: `before` es el último NUMERO de la página anterior.
+        Cada (búsqueda, usuario, cursor, token) queda cacheado por separado.
+        """
+        return self.cache.get_or_load(
+            "orders", (buscar, usr_pick, before, page_size, token),
+            lambda: self._load_orders(buscar, usr_pick, before, page_size, primary))
+
+    def _distinct_users_sql(self) -> str:
+        if self.features().get("order_header"):
+            return "SELECT DISTINCT usr_pick FROM order_header WHERE usr_pick IS NOT NULL ORDER BY 1"
+        usr = self.sap_cols("")["usr"]
+        return f"SELECT DISTINCT {usr} FROM sap WHERE {usr} IS NOT NULL ORDER BY 1"
+
+    @perf.instrument("get_distinct_users")
+    def _load_distinct_users(self, primary: bool = False) -> list[str]:
+        with self.conn(primary) as conn:
+            cur = conn.cursor()
+            cur.execute(self._distinct_users_sql())
+            rows = [r[0] for r in cur.fetchall() if r and r[0]]
+            cur.close()
+        return rows
+
+    def distinct_users(self, token: tuple | None = None, primary: bool = False) -> list[str]:
+        """Usuarios distintos en usr_pick (no vacíos)."""
+        return self.cache.get_or_load("distinct_users", (token,), lambda: self._load_distinct_users(primary))
+
+    def _orders_progress_sql(self, numeros: tuple[int, ...]) -> tuple[str, list]:
+        marks = ", ".join(["%s"] * len(numeros))
+        if self.features().get("order_header"):
+            sql = f"""
+                SELECT NUMERO, items AS total_items, items_picked AS picked_items
+                FROM order_header
+                WHERE NUMERO IN ({marks})
+            """
+            return sql, list(numeros)
+        picked = self.sap_cols("")["picked"]
+        sql = f"""
+            SELECT
+              NUMERO,
+              COUNT(*) AS total_items,
+              SUM(CASE WHEN {picked} THEN 1 ELSE 0 END) AS picked_items
+            FROM sap
+            WHERE NUMERO IN ({marks})
+            GROUP BY NUMERO
+        """
+        return sql, list(numeros)
+
+    @perf.instrument("get_orders_progress")
+    def _load_orders_progress(self, numeros: tuple[int, ...], primary: bool = False) -> pd.DataFrame:
+        sql, params = self._orders_progress_sql(numeros)
+        with self.conn(primary) as conn:
+            df = pd.read_sql(sql, conn, params=params)
+        for c in ("total_items", "picked_items"):
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
+        df["has_any_y"] = df["picked_items"] > 0
+        return df[ORDER_PROGRESS_COLUMNS]
+
+    def orders_progress(self, numeros: tuple[int, ...], token: tuple | None = None,
+                        primary: bool = False) -> pd.DataFrame:
+        """
+        Avance de picking para varios pedidos en una sola consulta
+        (ORDER_PROGRESS_COLUMNS): total_items, picked_items (ítems en Y) y
+        has_any_y.
+        """
+        if not numeros:
+            return pd.DataFrame(columns=ORDER_PROGRESS_COLUMNS)
+        numeros = tuple(int(n) for n in numeros)
+        return self.cache.get_or_load("orders_progress", (numeros, token),
+                                      lambda: self._load_orders_progress(numeros, primary))
+
+    @perf.instrument("get_order_items")
+    def order_items(self, numero: int) -> pd.DataFrame:
+        """Líneas del pedido (sin caché: el detalle las guarda en su sesión)."""
+        with self.conn() as conn:
+            df = pd.read_sql(ORDER_ITEMS_SQL, conn, params=[numero])
+        return items_frame(df)
+
+    @perf.instrument("get_wave_items")
+    def wave_items(self, numeros: tuple[int, ...]) -> pd.DataFrame:
+        """Líneas de varios pedidos en una consulta (olas de picking)."""
+        if not numeros:
+            return items_frame(pd.DataFrame(columns=["NUMERO", "CLIENTE", "CODIGO", "ItemName",
+                                                     "CANTIDAD", "PICKING", "TS", "empresa"]))
+        marks = ", ".join(["%s"] * len(numeros))
+        sql = ORDER_ITEMS_SQL.replace("WHERE NUMERO = %s", f"WHERE NUMERO IN ({marks})") \
+                             .replace("ORDER BY CODIGO", "ORDER BY NUMERO, CODIGO")
+        with self.conn() as conn:
+            df = pd.read_sql(sql, conn, params=list(numeros))
+        return items_frame(df)
+
+    # ======= Ubicaciones y ruta de picking =======
+    @perf.instrument("ensure_locations_table")
+    def ensure_locations_table(self):
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute(UBICACIONES_DDL)
+            conn.commit(); cur.close()
+        self.features(refresh=True)
+
+    @perf.instrument("load_locations")
+    def load_locations(self, loc: pd.DataFrame, replace: bool = False) -> int:
+        """
+        Upsert de ubicaciones (LOCATION_COLUMNS, p. ej. de routing.parse_locations).
+        replace=True borra antes las que no vengan en `loc`. Invalida "locations".
+        """
+        self.ensure_locations_table()
+        rows = [(str(c), int(a), int(p), "" if pd.isna(n) else str(n))
+                for c, a, p, n in loc[LOCATION_COLUMNS].itertuples(index=False)]
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                if replace:
+                    cur.execute("DELETE FROM ubicaciones")
+                for i in range(0, len(rows), LOCATIONS_CHUNK):
+                    cur.executemany(
+                        "INSERT INTO ubicaciones (CODIGO, pasillo, posicion, nivel) VALUES (%s, %s, %s, %s) "
+                        "ON DUPLICATE KEY UPDATE pasillo = VALUES(pasillo), posicion = VALUES(posicion), "
+                        "nivel = VALUES(nivel)", rows[i:i + LOCATIONS_CHUNK])
+                scopes = self.bump_versions(cur, {"locations"})
+                conn.commit()
+                self.publish_versions(scopes)
+            finally:
+                cur.close()
+        return len(rows)
+
+    @perf.instrument("get_order_route")
+    def _load_route(self, numeros: tuple[int, ...], strategy: str) -> pd.DataFrame:
+        if not numeros or not self.features().get("ubicaciones"):
+            return pd.DataFrame(columns=ROUTE_COLUMNS)
+        marks = ", ".join(["%s"] * len(numeros))
+        with self.conn() as conn:
+            loc = pd.read_sql(
+                "SELECT DISTINCT u.CODIGO, u.pasillo, u.posicion, u.nivel "
+                f"FROM sap s JOIN ubicaciones u ON u.CODIGO = s.CODIGO WHERE s.NUMERO IN ({marks})",
+                conn, params=list(numeros))
+        return plan_route(loc, strategy)
+
+    def order_route(self, numero: int, strategy: str = "s_shape", token: tuple | None = None) -> pd.DataFrame:
+        """
+        Ruta del pedido (ROUTE_COLUMNS), calculada una vez por pedido y versión
+        de ubicaciones: pasar cache_token("locations"), no el del pedido, así
+        los toggles no la recalculan.
+        """
+        return self.cache.get_or_load("order_route", (numero, strategy, token),
+                                      lambda: self._load_route((numero,), strategy))
+
+    def wave_route(self, numeros: tuple[int, ...], strategy: str = "s_shape",
+                   token: tuple | None = None) -> pd.DataFrame:
+        """Una sola ruta por los SKUs de todos los pedidos de una ola (misma caché que order_route)."""
+        numeros = tuple(sorted(numeros))
+        return self.cache.get_or_load("wave_route", (numeros, strategy, token),
+                                      lambda: self._load_route(numeros, strategy))
+
+    # ======= Avance por usuario =======
+    def _user_progress_sql(self) -> str:
+        if self.features().get("order_header"):
+            return """
+                SELECT
+                    usr_pick          AS usuario,
+                    COUNT(*)          AS pedidos,
+                    SUM(items > items_picked) AS pedidos_abiertos,
+                    SUM(items)        AS items,
+                    SUM(items_picked) AS items_picked,
+                    SUM(qty_total)    AS qty_total,
+                    SUM(qty_picked)   AS qty_picked
+                FROM order_header
+                WHERE usr_pick IS NOT NULL
+                GROUP BY usr_pick
+                ORDER BY usuario
+            """
+        c = self.sap_cols("")
+        return f"""
+            SELECT
+                {c['usr']}                  AS usuario,
+                COUNT(DISTINCT NUMERO)      AS pedidos,
+                COUNT(DISTINCT CASE WHEN NOT ({c['picked']}) THEN NUMERO END) AS pedidos_abiertos,
+                COUNT(*)                    AS items,
+                SUM(CASE WHEN {c['picked']} THEN 1 ELSE 0 END) AS items_picked,
+                SUM(COALESCE(CAST(CANTIDAD AS DECIMAL(18,3)),0)) AS qty_total,
+                SUM(
+                    CASE
+                        WHEN {c['picked']}
+                             THEN COALESCE(CAST(CANTIDAD AS DECIMAL(18,3)),0)
+                        ELSE 0
+                    END
+                ) AS qty_picked
+            FROM sap
+            WHERE {c['usr']} IS NOT NULL
+            GROUP BY {c['usr']}
+            ORDER BY usuario
+        """
+
+    @perf.instrument("read_user_progress")
+    def read_user_progress(self, primary: bool = False) -> pd.DataFrame:
+        """
+        Avance por usuario (USER_PROGRESS_COLUMNS), sin caché:
+          - usuario: usr_pick normalizado (solo no vacíos)
+          - pedidos: COUNT(DISTINCT NUMERO); pedidos_abiertos: con alguna línea sin Y
+          - items: COUNT(*); items_picked: líneas en Y
+          - qty_total: SUM(CANTIDAD)
+          - qty_picked: SUM(CANTIDAD) donde PICKING='Y'
+        """
+        with self.conn(primary) as conn:
+            df = pd.read_sql(self._user_progress_sql(), conn)
+        for c in ("pedidos", "pedidos_abiertos", "items", "items_picked"):
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
+        for c in ("qty_total", "qty_picked"):
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=USER_PROGRESS_COLUMNS)
+        return df
+
+    def user_progress(self, token: tuple | None = None, primary: bool = False) -> pd.DataFrame:
+        return self.cache.get_or_load("user_progress", (token,), lambda: self.read_user_progress(primary))
+
+    # ======= Escrituras de picking =======
+    @perf.instrument("update_picking_many")
+    def update_picking_many(self, rows: list[tuple[int, str, str]]):
+        """
+        Escribe PICKING para varias líneas (NUMERO, CODIGO, flag) con un solo
+        executemany y, en la misma transacción, sella TS en los pedidos que
+        recibieron alguna Y y todavía no tenían inicio.
+        """
+        if not rows:
+            return
+        started = sorted({int(n) for (n, _, flag) in rows if flag == "Y"})
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                cur.executemany(
+                    "UPDATE sap SET PICKING = %s WHERE NUMERO = %s AND CODIGO = %s",
+                    [(flag, numero, codigo) for (numero, codigo, flag) in rows]
+                )
+                if started:
+                    marks = ", ".join(["%s"] * len(started))
+                    cur.execute(f"UPDATE sap SET TS = NOW() WHERE NUMERO IN ({marks}) AND TS IS NULL", started)
+                touched = {n for (n, _, _) in rows}
+                self.refresh_order_header_for(cur, touched)
+                scopes = self.bump_versions(cur, self.order_scopes(cur, touched))
+                conn.commit()
+                self.publish_versions(scopes)
+            finally:
+                cur.close()
+
+    def complete_order(self, numero: int) -> CompletedOrder:
+        """
+        Cierra un pedido en un solo UPDATE: PICKING='Y' en todos los ítems, TS en
+        los que no lo tenían y TS_C = NOW(). Los timestamps finales se leen en la
+        misma transacción.
+        """
+        return self.complete_orders([numero])[numero]
+
+    @perf.instrument("complete_orders")
+    def complete_orders(self, numeros) -> dict[int, CompletedOrder]:
+        """
+        Cierra varios pedidos (una ola) en una transacción: un UPDATE por
+        pedido como complete_order, y una sola actualización de order_header
+        y de versiones al final.
+        """
+        numeros = list(dict.fromkeys(int(n) for n in numeros))
+        out = {}
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                for numero in numeros:
+                    cur.execute("""
+                        UPDATE sap
+                           SET PICKING = 'Y',
+                               TS      = COALESCE(TS, NOW()),
+                               TS_C    = NOW()
+                         WHERE NUMERO = %s
+                    """, (numero,))
+                    filas = cur.rowcount or 0
+                    cur.execute("SELECT MAX(TS), MAX(TS_C) FROM sap WHERE NUMERO = %s", (numero,))
+                    ts_start, ts_c = cur.fetchone() or (None, None)
+                    out[numero] = CompletedOrder(filas, ts_start, ts_c)
+                self.refresh_order_header_for(cur, numeros)
+                scopes = self.bump_versions(cur, self.order_scopes(cur, numeros, listed=True))
+                conn.commit()
+                self.publish_versions(scopes)
+            finally:
+                cur.close()
+        return out
+
+    # ======= Asignación =======
+    @perf.instrument("apply_usr_pick_assignment")
+    def apply_assignment(self, mapping: dict[int, str], mode: str = "all",
+                         chunk_size: int = 1000, max_retries: int = 3) -> AssignmentResult:
+        """
+        Aplica un mapeo NUMERO -> usr_pick con un UPDATE ... JOIN por chunk contra
+        una tabla temporal, cada chunk en su propia transacción (con reintentos
+        ante lock wait / deadlock). Con mode="all", un pedido que ya tiene
+        picker y alguna línea en Y no cambia de manos (puede haber empezado
+        después de armar el mapeo).
+        """
+        if not mapping:
+            return AssignmentResult(0, 0)
+        only_missing = f"AND {self.sap_cols('s')['usr']} IS NULL" if mode == "missing" else ""
+        items = list(mapping.items())
+        pedidos_afectados = 0
+        filas_actualizadas = 0
+        with self.conn() as conn:
+            cur = conn.cursor()
+            try:
+                try: cur.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                except Exception: pass
+                try: cur.execute("SET SESSION innodb_lock_wait_timeout = 5")
+                except Exception: pass
+                cur.execute("""
+                    CREATE TEMPORARY TABLE IF NOT EXISTS tmp_asignacion (
+                        NUMERO BIGINT PRIMARY KEY,
+                        usr_pick VARCHAR(100) NOT NULL
+                    ) ENGINE=MEMORY
+                """)
+                for i in range(0, len(items), chunk_size):
+                    chunk = items[i:i+chunk_size]
+                    for attempt in range(max_retries):
+                        try:
+                            cur.execute("DELETE FROM tmp_asignacion")
+                            cur.executemany("INSERT INTO tmp_asignacion (NUMERO, usr_pick) VALUES (%s, %s)", chunk)
+                            if mode != "missing":
+                                c = self.sap_cols("s")
+                                cur.execute(f"""
+                                    DELETE t FROM tmp_asignacion t
+                                      JOIN sap s ON s.NUMERO = t.NUMERO
+                                     WHERE {c['picked']} AND {c['usr']} IS NOT NULL
+                                """)
+                            cur.execute(f"""
+                                SELECT COUNT(DISTINCT s.NUMERO)
+                                  FROM sap s
+                                  JOIN tmp_asignacion t ON t.NUMERO = s.NUMERO
+                                 WHERE NOT (s.usr_pick <=> t.usr_pick) {only_missing}
+                                   FOR UPDATE
+                            """)
+                            pedidos = cur.fetchone()[0] or 0
+                            cur.execute(f"""
+                                UPDATE sap s
+                                  JOIN tmp_asignacion t ON t.NUMERO = s.NUMERO
+                                   SET s.usr_pick = t.usr_pick
+                                 WHERE 1 = 1 {only_missing}
+                            """)
+                            filas = cur.rowcount or 0
+                            self.refresh_order_header(cur, "WHERE s.NUMERO IN (SELECT NUMERO FROM tmp_asignacion)", [])
+                            scopes = self.bump_versions(cur, {"orders", "users", "progress"})
+                            conn.commit()
+                            self.publish_versions(scopes)
+                            pedidos_afectados += pedidos
+                            filas_actualizadas += filas
+                            break
+                        except mysql.connector.errors.DatabaseError as e:
+                            conn.rollback()
+                            if getattr(e, "errno", None) in (1205, 1213) and attempt + 1 < max_retries:
+                                time.sleep(0.4 * (attempt + 1) + random.random() * 0.3)
+                                continue
+                            raise
+                cur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_asignacion")
+            finally:
+                cur.close()
+        return AssignmentResult(pedidos_afectados, filas_actualizadas)
+
+    @perf.instrument("get_order_sizes")
+    def order_sizes(self, mode: str = "all") -> list[tuple[int, int]]:
+        """(NUMERO, items) de todos los pedidos, o solo de los sin usr_pick (mode="missing")."""
+        where = f"WHERE {self.sap_cols('')['usr']} IS NULL" if mode == "missing" else ""
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT NUMERO, COUNT(*) FROM sap {where} GROUP BY NUMERO")
+            orders = [(r[0], int(r[1] or 0)) for r in cur.fetchall()]
+            cur.close()
+        return orders
+
+    @perf.instrument("get_order_workloads")
+    def order_workloads(self) -> pd.DataFrame:
+        """
+        Trabajo pendiente por pedido abierto: NUMERO, usr_pick (None si no
+        tiene), empresa, lineas y unidades sin picking en Y, e iniciado (alguna
+        línea ya en Y).
+        """
+        if self.features().get("order_header"):
+            sql = """
+                SELECT NUMERO, usr_pick, empresa, items - items_picked AS lineas, qty_total - qty_picked AS unidades,
+                       items_picked > 0 AS iniciado
+                FROM order_header
+                WHERE items > items_picked
+            """
+        else:
+            c = self.sap_cols("s")
+            qty = "COALESCE(CAST(s.CANTIDAD AS DECIMAL(18,3)),0)"
+            sql = f"""
+                SELECT s.NUMERO, MIN({c['usr']}) AS usr_pick, MIN(s.empresa) AS empresa,
+                       SUM(CASE WHEN {c['picked']} THEN 0 ELSE 1 END) AS lineas,
+                       SUM(CASE WHEN {c['picked']} THEN 0 ELSE {qty} END) AS unidades,
+                       MAX(CASE WHEN {c['picked']} THEN 1 ELSE 0 END) AS iniciado
+                FROM sap s
+                GROUP BY s.NUMERO
+                HAVING lineas > 0
+            """
+        with self.conn() as conn:
+            df = pd.read_sql(sql, conn)
+        df["lineas"] = pd.to_numeric(df["lineas"], errors="coerce").fillna(0).astype(int)
+        df["unidades"] = pd.to_numeric(df["unidades"], errors="coerce").fillna(0.0).astype(float)
+        df["usr_pick"] = df["usr_pick"].where(df["usr_pick"].notna(), None)
+        df["iniciado"] = pd.to_numeric(df["iniciado"], errors="coerce").fillna(0).astype(bool)
+        return df
+
+    @perf.instrument("get_pick_history")
+    def pick_history(self, days: int = PICK_HISTORY_DAYS) -> pd.DataFrame:
+        """
+        Pedidos cerrados en los últimos `days` días: NUMERO, usr_pick,
+        empresa, lineas, unidades y minutos (del primer TS a TS_C). Recorre
+        sap por TS_C sin índice: es para procesos de fondo y del admin.
+        """
+        c = self.sap_cols("s")
+        qty = "COALESCE(CAST(s.CANTIDAD AS DECIMAL(18,3)),0)"
+        sql = f"""
+            SELECT s.NUMERO, MIN({c['usr']}) AS usr_pick, MIN(s.empresa) AS empresa,
+                   COUNT(*) AS lineas, SUM({qty}) AS unidades,
+                   TIMESTAMPDIFF(SECOND, MIN(s.TS), MAX(s.TS_C)) / 60 AS minutos
+            FROM sap s
+            WHERE s.TS_C >= NOW() - INTERVAL %s DAY
+            GROUP BY s.NUMERO
+        """
+        with self.conn() as conn:
+            df = pd.read_sql(sql, conn, params=[int(days)])
+        for col in ("lineas", "unidades", "minutos"):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        return df
+
+    def plan_assignment(self, pickers: list[str], mode: str = "all",
+                        model: RateModel | None = None) -> AssignmentPlan:
+        """
+        Reparto balanceado de los pedidos abiertos (mode="all") o de los que
+        no tienen usr_pick (mode="missing"), sin escribir nada. Lo que no se
+        reparte cuenta como carga previa de su picker: con "missing", todo lo
+        asignado; con "all", los pedidos ya empezados (no se le saca trabajo a
+        quien lo arrancó). Los pedidos cerrados no se reasignan (su usr_pick es
+        la historia de ritmos). Sin `model`, lo ajusta con pick_history().
+        """
+        work = self.order_workloads()
+        model = model or fit_rate_model(self.pick_history())
+        keep = work["usr_pick"].notna()
+        if mode != "missing":
+            keep &= work["iniciado"]
+        target, held = work[~keep], work[keep]
+        open_minutes = {u: float(np.sum(model.minutes(g["lineas"], g["unidades"], u, g["empresa"])))
+                        for u, g in held.groupby("usr_pick")}
+        return plan_balanced_assignment(target, pickers, model, open_minutes)._replace(conservados=len(held))
+
+    def bulk_assign(self, pickers: list[str], mode: str = "all", chunk_size: int = 1000,
+                    max_retries: int = 3, strategy: str = "lpt") -> AssignmentResult:
+        """
+        Asigna usr_pick a todos los pedidos salvo los ya empezados (mode="all")
+        o solo a los que no lo tienen (mode="missing"). El reparto se calcula en memoria —lpt:
+        plan_assignment; random/balanced: plan_usr_pick_assignment— y se
+        aplica en bloque (apply_assignment).
+        """
+        if not pickers:
+            raise ValueError("La lista de pickers está vacía.")
+        if strategy == "lpt":
+            mapping = self.plan_assignment(pickers, mode).mapping
+            return self.apply_assignment(mapping, mode=mode, chunk_size=chunk_size, max_retries=max_retries)
+        orders = self.order_sizes(mode)
+        if not orders:
+            return AssignmentResult(0, 0)
+        mapping = plan_usr_pick_assignment(orders, pickers, strategy)
+        return self.apply_assignment(mapping, mode=mode, chunk_size=chunk_size, max_retries=max_retries)
+
+    # ======= Usuarios =======
+    @perf.instrument("ensure_usuarios_table")
+    def ensure_usuarios_table(self):
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute(USUARIOS_DDL)
+            conn.commit(); cur.close()
+
+    @perf.instrument("count_users")
+    def count_users(self) -> int:
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM usuarios")
+            n = cur.fetchone()[0]
+            cur.close()
+        return n
+
+    @perf.instrument("get_user")
+    def get_user(self, username: str) -> UserRow | None:
+        with self.conn() as conn:
+            cur = conn.cursor(dictionary=True)
+            cur.execute("SELECT id, username, password_hash, nombre, rol FROM usuarios WHERE username = %s",
+                        (username,))
+            user = cur.fetchone()
+            cur.close()
+        return user
+
+    @perf.instrument("validar_usuario")
+    def validate_user(self, username: str, password: str) -> UserRow | None:
+        if not username or not password:
+            return None
+        user = self.get_user(username)
+        if not user:
+            return None
+        stored = user.get("password_hash")
+        if not stored or not isinstance(stored, str) or not stored.startswith("$2"):
+            return None
+        try:
+            ok = bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
+        except ValueError:
+            return None
+        return user if ok else None
+
+    @perf.instrument("create_user")
+    def create_user(self, username: str, plain_password: str, nombre: str, rol: str):
+        hashed = bcrypt.hashpw(plain_password.encode("utf-8"), bcrypt.gensalt()).decode()
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO usuarios (username, password_hash, nombre, rol) VALUES (%s, %s, %s, %s)",
+                (username, hashed, nombre, rol)
+            )
+            conn.commit(); cur.close()
+
+    @perf.instrument("list_users")
+    def list_users(self) -> list[tuple[str, str]]:
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT username, rol FROM usuarios ORDER BY username")
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    @perf.instrument("set_password")
+    def set_password(self, username: str, new_password: str):
+        hashed = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode()
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute("UPDATE usuarios SET password_hash=%s WHERE username=%s", (hashed, username))
+            conn.commit(); cur.close()
+
+    # ======= Diagnóstico =======
+    def _explain_targets(self) -> list[tuple[str, str, list]]:
+        """Consultas del repositorio (con parámetros de muestra) para el reporte EXPLAIN."""
+        with self.conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT MAX(NUMERO) FROM sap")
+            numero = (cur.fetchone() or [None])[0] or 0
+            cur.execute(f"SELECT {self.sap_cols('')['usr']} FROM sap WHERE NUMERO = %s LIMIT 1", (numero,))
+            usr = (cur.fetchone() or [None])[0] or ""
+            cur.close()
+        return [
+            ("get_orders", *self._orders_sql()),
+            ("get_orders (usr_pick)", *self._orders_sql(usr_pick=usr)),
+            ("get_orders (página siguiente)", *self._orders_sql(before=numero)),
+            ("get_orders (buscar número)", *self._orders_sql(buscar=str(numero)[:4])),
+            ("get_orders (buscar texto)", *self._orders_sql(buscar="cliente")),
+            ("get_orders_progress", *self._orders_progress_sql((numero,))),
+            ("get_order_items", ORDER_ITEMS_SQL, [numero]),
+            ("get_distinct_users", self._distinct_users_sql(), []),
+            ("get_user_progress", self._user_progress_sql(), []),
+            ("update_picking_many", "UPDATE sap SET PICKING = %s WHERE NUMERO = %s AND CODIGO = %s", ["Y", numero, ""]),
+        ]
+
+    @perf.instrument("explain_report")
+    def explain_report(self) -> pd.DataFrame:
+        """EXPLAIN de cada consulta: tabla, tipo de acceso, índice usado y filas estimadas."""
+        rows = []
+        targets = self._explain_targets()
+        with self.conn() as conn:
+            cur = conn.cursor(dictionary=True)
+            for name, sql, params in targets:
+                try:
+                    cur.execute("EXPLAIN " + sql, params)
+                    for r in cur.fetchall():
+                        rows.append({
+                            "consulta": name,
+                            "tabla": r.get("table"),
+                            "acceso": r.get("type"),
+                            "indices_posibles": r.get("possible_keys"),
+                            "indice": r.get("key"),
+                            "filas": r.get("rows"),
+                            "extra": r.get("Extra"),
+                        })
+                except Exception as e:
+                    rows.append({"consulta": name, "extra": f"Error: {e}"})
+            cur.close()
+        return pd.DataFrame(rows)
+
+
+# ================== RELOJ DE LA DB ==================
+class DbClock:
+    """
+    Reloj de la DB sin consultas por render: mide una vez (y cada `refresh`
+    segundos) el desfase UTC entre MySQL y este proceso y el offset de la zona
+    de la sesión (NOW() - UTC_TIMESTAMP()). Con eso calcula "ahora" en Buenos
+    Aires y convierte TS de la DB localmente con ZoneInfo.
+    """
+
+    def __init__(self, repo: PickingRepository, refresh: float = 600.0):
+        self.refresh = refresh
+        self._repo = repo
+        self._lock = threading.Lock()
+        self._measured_at: float | None = None
+        self._skew = timedelta(0)            # UTC de la DB - UTC local
+        self._session_offset = timedelta(0)  # NOW() - UTC_TIMESTAMP() en la DB
+
+    @perf.instrument("db_clock")
+    def _measure(self):
+        with self._repo.conn() as conn:
+            cur = conn.cursor()
+            t0 = time.time()
+            cur.execute("SELECT UTC_TIMESTAMP(6), NOW(6)")
+            utc_db, now_db = cur.fetchone()
+            t1 = time.time()
+            cur.close()
+        local_utc = datetime.fromtimestamp((t0 + t1) / 2, timezone.utc).replace(tzinfo=None)
+        self._skew = utc_db - local_utc
+        self._session_offset = now_db - utc_db
+
+    def _ensure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._measured_at is not None and now - self._measured_at < self.refresh:
+                return
+            try:
+                self._measure()
+                self._measured_at = now
+            except Exception:
+                # Sin DB: reloj local; se reintenta en 30 s.
+                self._measured_at = now - self.refresh + 30
+
+    def now_utc(self) -> datetime:
+        self._ensure()
+        return datetime.now(timezone.utc) + self._skew
+
+    def now_db(self) -> datetime:
+        """Equivalente local de NOW() en la sesión MySQL (naive)."""
+        return (self.now_utc() + self._session_offset).replace(tzinfo=None)
+
+    def now_ba(self) -> datetime:
+        """Equivalente local de CONVERT_TZ(NOW(), ..., Buenos_Aires) (naive)."""
+        return self.now_utc().astimezone(TZ_BA).replace(tzinfo=None)
+
+    def to_ba(self, ts_db: datetime | None) -> datetime | None:
+        """Convierte un DATETIME de la DB (zona de la sesión) a hora de Buenos Aires (naive)."""
+        if ts_db is None:
+            return None
+        self._ensure()
+        utc = (ts_db - self._session_offset).replace(tzinfo=timezone.utc)
+        return utc.astimezone(TZ_BA).replace(tzinfo=None)
+
+    def timing(self, ts_start: datetime | None) -> OrderTiming:
+        """Tiempos de un pedido a partir de su MAX(TS) ya leído (sin consultas)."""
+        now_ar = self.now_ba()
+        if ts_start is None:
+            return OrderTiming(None, None, now_ar, None)
+        elapsed_min = int((self.now_db() - ts_start).total_seconds() // 60)
+        return OrderTiming(ts_start, elapsed_min, now_ar, self.to_ba(ts_start))
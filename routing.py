@@ -0,0 +1,116 @@
+"""
+Secuencia de picking por ubicación.
+
+El depósito se modela como pasillos paralelos numerados, cada uno con
+posiciones 1..L y pasillos transversales en ambas puntas (frente = 0,
+fondo = L + 1). Cada CODIGO tiene una ubicación (pasillo, posicion, nivel)
+en la tabla `ubicaciones`; las líneas sin ubicación van al final, por CODIGO.
+
+Estrategias:
+  - s_shape: recorre solo los pasillos con picks, en orden, alternando el
+             sentido (serpentina). Simple de seguir para el picker.
+  - nearest: vecino más cercano desde el frente del primer pasillo con la
+             distancia del modelo (puede ahorrar pasillos casi vacíos).
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+ROUTE_STRATEGIES = ("s_shape", "nearest")
+LOCATION_COLUMNS = ["CODIGO", "pasillo", "posicion", "nivel"]
+ROUTE_COLUMNS = ["CODIGO", "ubicacion", "orden_ruta"]
+AISLE_GAP = 3.0  # distancia entre pasillos vecinos, en posiciones
+
+_LOCATION_CODE = re.compile(r"^\D*(\d+)\D+(\d+)(?:\W+(\w+))?")
+
+
+def parse_locations(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ubicaciones de un CSV: CODIGO más (pasillo, posicion[, nivel]) o una sola
+    columna `ubicacion` tipo "A03-12-2" (pasillo 3, posición 12, nivel 2).
+    Descarta filas sin CODIGO o sin pasillo/posición válidos.
+    """
+    cols = {c.strip().lower(): c for c in df.columns}
+    if "codigo" not in cols:
+        raise ValueError("Falta la columna CODIGO.")
+    out = pd.DataFrame({"CODIGO": df[cols["codigo"]].astype(str).str.strip()})
+    if "pasillo" in cols and "posicion" in cols:
+        out["pasillo"] = pd.to_numeric(df[cols["pasillo"]], errors="coerce")
+        out["posicion"] = pd.to_numeric(df[cols["posicion"]], errors="coerce")
+        out["nivel"] = df[cols["nivel"]].fillna("").astype(str).str.strip() if "nivel" in cols else ""
+    elif "ubicacion" in cols:
+        parts = df[cols["ubicacion"]].astype(str).str.strip().str.extract(_LOCATION_CODE)
+        out["pasillo"] = pd.to_numeric(parts[0], errors="coerce")
+        out["posicion"] = pd.to_numeric(parts[1], errors="coerce")
+        out["nivel"] = parts[2].fillna("")
+    else:
+        raise ValueError("Faltan las columnas pasillo/posicion o ubicacion.")
+    out = out[(out["CODIGO"] != "") & out["pasillo"].notna() & out["posicion"].notna()]
+    out = out.drop_duplicates("CODIGO", keep="last")
+    out["pasillo"] = out["pasillo"].astype(int)
+    out["posicion"] = out["posicion"].astype(int)
+    out["nivel"] = out["nivel"].replace({"nan": "", "None": ""})
+    return out[LOCATION_COLUMNS].reset_index(drop=True)
+
+
+def _s_shape(loc: pd.DataFrame) -> np.ndarray:
+    aisles = np.sort(loc["pasillo"].unique())
+    descending = {a: i % 2 == 1 for i, a in enumerate(aisles)}
+    pos = np.where(loc["pasillo"].map(descending), -loc["posicion"], loc["posicion"])
+    return np.lexsort((loc["nivel"].to_numpy(), pos, loc["pasillo"].to_numpy()))
+
+
+def _distance(a1, p1, a2, p2, depth: float) -> np.ndarray:
+    """Distancia entre ubicaciones: por el mismo pasillo, o saliendo por la punta más conveniente."""
+    cross = np.minimum(p1 + p2, 2 * depth - p1 - p2) + AISLE_GAP * np.abs(a1 - a2)
+    return np.where(a1 == a2, np.abs(p1 - p2), cross)
+
+
+def _nearest(loc: pd.DataFrame) -> np.ndarray:
+    a = loc["pasillo"].to_numpy(dtype=float)
+    p = loc["posicion"].to_numpy(dtype=float)
+    depth = float(p.max()) + 1.0
+    left = np.ones(len(loc), dtype=bool)
+    cur_a, cur_p = float(a.min()), 0.0
+    seq = []
+    for _ in range(len(loc)):
+        d = np.where(left, _distance(cur_a, cur_p, a, p, depth), np.inf)
+        nxt = int(np.argmin(d))
+        seq.append(nxt)
+        left[nxt] = False
+        cur_a, cur_p = a[nxt], p[nxt]
+    return np.array(seq, dtype=int)
+
+
+def plan_route(loc: pd.DataFrame, strategy: str = "s_shape") -> pd.DataFrame:
+    """
+    Orden de visita para las ubicaciones de un pedido (LOCATION_COLUMNS, un
+    CODIGO por fila). Devuelve ROUTE_COLUMNS, con orden_ruta desde 0.
+    """
+    if strategy not in ROUTE_STRATEGIES:
+        raise ValueError(f"Estrategia de ruta desconocida: {strategy}")
+    if loc.empty:
+        return pd.DataFrame(columns=ROUTE_COLUMNS)
+    loc = loc.drop_duplicates("CODIGO").reset_index(drop=True)
+    loc["nivel"] = loc["nivel"].fillna("").astype(str)
+    seq = _s_shape(loc) if strategy == "s_shape" else _nearest(loc)
+    out = loc.iloc[seq].reset_index(drop=True)
+    out["ubicacion"] = [f"P{a:02d}-{p:03d}" + (f"-{n}" if n else "")
+                        for a, p, n in zip(out["pasillo"], out["posicion"], out["nivel"])]
+    out["orden_ruta"] = np.arange(len(out))
+    return out[ROUTE_COLUMNS]
+
+
+def sequence_items(items_df: pd.DataFrame, route: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reordena las líneas del pedido según la ruta y agrega `ubicacion`. Lo que
+    no está en la ruta (sin ubicación cargada) queda al final, por CODIGO.
+    """
+    if route is None or route.empty:
+        return items_df.assign(ubicacion="")
+    rank = route.set_index("CODIGO")
+    codes = items_df["CODIGO"].astype(str)
+    out = items_df.assign(ubicacion=codes.map(rank["ubicacion"]).fillna(""),
+                          _orden=codes.map(rank["orden_ruta"]).fillna(len(route)))
+    return out.sort_values(["_orden", "CODIGO"], kind="stable").drop(columns="_orden").reset_index(drop=True)
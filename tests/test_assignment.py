@@ -0,0 +1,39 @@
+import pandas as pd
+
+from eta import DEFAULT_MODEL
+from repository import PickingRepository
+
+
+class WorkRepo(PickingRepository):
+    """Sin DB: order_workloads fijo."""
+
+    def __init__(self, work: pd.DataFrame):
+        super().__init__(pool=None)
+        self._work = work
+
+    def order_workloads(self) -> pd.DataFrame:
+        return self._work
+
+
+WORK = pd.DataFrame({
+    "NUMERO": [1, 2, 3, 4],
+    "usr_pick": ["ana", "ana", None, "beto"],
+    "empresa": ["DIA"] * 4,
+    "lineas": [10, 5, 8, 3],
+    "unidades": [10.0, 5.0, 8.0, 3.0],
+    "iniciado": [True, False, True, False],
+})
+
+
+def test_all_no_reasigna_pedidos_empezados():
+    plan = WorkRepo(WORK).plan_assignment(["ana", "beto"], "all", model=DEFAULT_MODEL)
+    assert sorted(plan.mapping) == [2, 3, 4]  # el 1 ya empezado sigue con ana
+    assert plan.conservados == 1
+    previa = dict(zip(plan.resumen["picker"], plan.resumen["carga_previa_min"]))
+    assert previa == {"ana": 12.0, "beto": 0.0}
+
+
+def test_missing_conserva_todo_lo_asignado():
+    plan = WorkRepo(WORK).plan_assignment(["ana", "beto"], "missing", model=DEFAULT_MODEL)
+    assert list(plan.mapping) == [3]
+    assert plan.conservados == 3
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from eta import DEFAULT_MODEL, MAX_ORDER_MINUTES, MIN_HISTORY_ORDERS, clean_history, fit_rate_model
+
+
+def _history(n, minutes, usr_pick="ana", empresa="DIA"):
+    rng = np.random.default_rng(3)
+    lineas = rng.integers(1, 40, n)
+    unidades = rng.integers(1, 200, n)
+    return pd.DataFrame({"NUMERO": np.arange(n), "usr_pick": usr_pick, "empresa": empresa,
+                         "lineas": lineas, "unidades": unidades, "minutos": minutes(lineas, unidades)})
+
+
+def test_limpieza_de_historia():
+    h = pd.DataFrame({"lineas": [3, 3, 3, 0, 3], "minutos": [5, 0, None, 5, MAX_ORDER_MINUTES + 1]})
+    assert clean_history(h).index.tolist() == [0]
+
+
+def test_poca_historia_usa_el_modelo_por_defecto():
+    m = fit_rate_model(_history(MIN_HISTORY_ORDERS - 1, lambda l, u: 1.0 + l))
+    assert m == DEFAULT_MODEL._replace(pedidos_historia=MIN_HISTORY_ORDERS - 1)
+
+
+def test_recupera_los_coeficientes():
+    m = fit_rate_model(_history(60, lambda l, u: 1.5 + 0.5 * l + 0.1 * u))
+    assert (m.por_pedido, m.por_linea, m.por_unidad) == pytest.approx((1.5, 0.5, 0.1))
+    assert m.speed["ana"] == pytest.approx(1.0)
+    assert float(m.minutes(10, 20, picker="ana", empresa="DIA")) == pytest.approx(8.5)
+
+
+def test_picker_rapido_tiene_factor_mayor():
+    rapido = _history(40, lambda l, u: 1.0 + 0.5 * l, usr_pick="rapido")
+    lento = _history(40, lambda l, u: 2.0 + 1.0 * l, usr_pick="lento")
+    m = fit_rate_model(pd.concat([rapido, lento], ignore_index=True))
+    assert m.speed["rapido"] > 1.0 > m.speed["lento"]
+    assert m.minutes(10, 0, picker="rapido") < m.minutes(10, 0) < m.minutes(10, 0, picker="lento")
+
+
+@pytest.mark.parametrize("hechas, elapsed, expected", [
+    (0, None, 12.0),             # sin avance: 2 por pedido + 1 por línea
+    (5, 7.0, 5.0),               # al ritmo esperado (2 + 5): quedan 5 líneas
+    (5, 27.0, 5.0 * 37 / 17),    # más lento: se corrige con peso ETA_PRIOR_MINUTES
+    (5, 500.0, 20.0),            # la corrección se acota a FACTOR_BOUNDS
+])
+def test_minutos_restantes(hechas, elapsed, expected):
+    assert DEFAULT_MODEL.remaining(10, 0.0, hechas, 0.0, elapsed) == pytest.approx(expected)
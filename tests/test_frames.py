@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from frames import items_frame, order_frame
+
+
+def test_order_frame_cliente_faltante_queda_vacio():
+    df = order_frame(pd.DataFrame({
+        "NUMERO": [1, 2, 3, 4],
+        "CLIENTE": [200123.0, None, np.nan, "DIA"],
+        "rs": [None, "7", np.nan, "x"],
+        "usr_pick": [None, "ana", "", "ana"],
+    }))
+    assert df["CLIENTE"].tolist() == ["200123", "", "", "DIA"]
+    assert df["rs"].tolist() == ["", "7", "", "x"]
+    assert df["usr_pick"].astype(str).tolist() == ["", "ana", "", "ana"]
+
+
+def test_order_frame_cliente_numerico_con_nan():
+    df = order_frame(pd.DataFrame({"CLIENTE": [200123.0, np.nan]}))
+    assert df["CLIENTE"].tolist() == ["200123", ""]
+
+
+def test_items_frame():
+    df = items_frame(pd.DataFrame({
+        "PICKING": [" y", None, ""], "CLIENTE": [None, 5.0, "A"],
+        "ItemName": ["Caja", None, np.nan], "CANTIDAD": ["2", "x", 3.0],
+    }))
+    assert df["PICKING"].tolist() == ["Y", "N", "N"]
+    assert df["CLIENTE"].tolist() == ["", "5", "A"]
+    assert df["ItemName"].tolist() == ["Caja", "", ""]
+    assert df["CANTIDAD"].tolist() == [2, 0, 3]
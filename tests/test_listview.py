@@ -0,0 +1,21 @@
+import pandas as pd
+
+from listview import TABLE_COLUMNS, list_table
+
+
+def test_list_table():
+    df = pd.DataFrame({
+        "NUMERO": [12, 11], "CLIENTE": ["DIA", None], "rs": ["7", ""], "empresa": ["VICBOR", None],
+        "usr_pick": ["", "ana"], "color_val": ["", "#fff"], "total_items": [4, 0],
+        "picked_items": [1, 0], "has_any_y": [True, False],
+    })
+    t = list_table(df)
+    assert t.columns.tolist() == TABLE_COLUMNS
+    assert t.values.tolist() == [
+        [12, "DIA", "7", "VICBOR", "—", 25, "1/4", True],
+        [11, "", "-", "-", "ana", 0, "0/0", False],
+    ]
+
+
+def test_list_table_vacia():
+    assert list_table(pd.DataFrame()).columns.tolist() == TABLE_COLUMNS
@@ -0,0 +1,92 @@
+import time
+
+import mysql.connector
+import pytest
+
+from repository import PickingRepository
+
+
+class FlakyPool:
+    """Pool que falla a pedido; sin DB real no hay más que eso."""
+
+    def __init__(self):
+        self.down = False
+
+    def get_connection(self):
+        if self.down:
+            raise ConnectionError("db caída")
+        return FakeConn()
+
+
+class FakeCursor:
+    rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchall(self):
+        return [("NUMERO",)] if "COLUMNS" in self.sql else []
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def ping(self, **kw):
+        pass
+
+    def cursor(self, **kw):
+        return FakeCursor()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_features_conserva_lo_ultimo_conocido_si_la_db_falla():
+    pool = FlakyPool()
+    repo = PickingRepository(pool, pool_timeout=0)
+    known = repo.features()
+    pool.down = True
+    assert repo.features(refresh=True) == known
+
+
+def test_features_sin_valor_previo_propaga_el_error():
+    pool = FlakyPool()
+    pool.down = True
+    with pytest.raises(ConnectionError):
+        PickingRepository(pool, pool_timeout=0).features()
+
+
+class NoHeaderCursor(FakeCursor):
+    def execute(self, sql, params=None):
+        if "INSERT INTO order_header" in sql:
+            raise mysql.connector.errors.ProgrammingError(msg="no existe", errno=1146)
+        super().execute(sql, params)
+
+
+def test_refresh_sin_tabla_no_rompe_la_escritura():
+    repo = PickingRepository(FlakyPool(), pool_timeout=0)
+    repo._features, repo._features_at = {"order_header": False}, time.monotonic()
+    assert repo.refresh_order_header_for(NoHeaderCursor(), [1, 2]) == 0
+
+
+def test_refresh_se_intenta_aunque_el_memo_diga_que_falta():
+    repo = PickingRepository(FlakyPool(), pool_timeout=0)
+    repo._features, repo._features_at = {"order_header": False}, time.monotonic()
+    cur = FakeCursor()
+    repo.refresh_order_header_for(cur, [1])
+    assert "INSERT INTO order_header" in cur.sql
+
+
+def test_lectura_va_al_primario_si_la_replica_no_conecta():
+    primary, replica = FlakyPool(), FlakyPool()
+    repo = PickingRepository(primary, pool_timeout=0, replica_pool=replica)
+    repo._replica.update(ok=True, checked=time.monotonic())
+    replica.down = True
+    with repo.conn(primary=False) as conn:
+        assert isinstance(conn, FakeConn)
+    assert not repo.replica_ok()
+    assert "db caída" in repo.replica_status()["error"]
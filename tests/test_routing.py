@@ -0,0 +1,51 @@
+import io
+
+import pandas as pd
+
+from routing import parse_locations, plan_route, sequence_items
+
+
+def _csv(text: str) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(text), dtype=str)
+
+
+def test_nivel_vacio_queda_en_blanco():
+    loc = parse_locations(_csv("CODIGO,pasillo,posicion,nivel\nA1,1,3,\nB2,1,5,2\n"))
+    assert loc["nivel"].tolist() == ["", "2"]
+    assert plan_route(loc)["ubicacion"].tolist() == ["P01-003", "P01-005-2"]
+
+
+def test_sin_columna_nivel():
+    loc = parse_locations(_csv("CODIGO,pasillo,posicion\nA1,2,7\n"))
+    assert loc["nivel"].tolist() == [""]
+
+
+def test_ubicacion_sin_nivel():
+    loc = parse_locations(_csv("CODIGO,ubicacion\nA1,A03-12\nB2,A03-14-1\n"))
+    assert loc[["pasillo", "posicion", "nivel"]].values.tolist() == [[3, 12, ""], [3, 14, "1"]]
+
+
+# Dos pasillos de 9 posiciones: A al frente del 1, B cerca del frente del 2, C al fondo del 1.
+_LAYOUT = "CODIGO,pasillo,posicion\nC,1,9\nB,2,2\nA,1,1\n"
+
+
+def test_rutas_en_dos_pasillos():
+    loc = parse_locations(_csv(_LAYOUT))
+    cases = [("s_shape", ["A", "C", "B"]), ("nearest", ["A", "B", "C"])]
+    for strategy, expected in cases:
+        route = plan_route(loc, strategy)
+        assert route["CODIGO"].tolist() == expected, strategy
+        assert route["orden_ruta"].tolist() == [0, 1, 2]
+
+
+def test_s_shape_alterna_el_sentido():
+    loc = parse_locations(_csv("CODIGO,pasillo,posicion\nA,1,2\nB,1,8\nC,2,1\nD,2,7\nE,3,4\nF,3,5\n"))
+    assert plan_route(loc)["CODIGO"].tolist() == ["A", "B", "D", "C", "E", "F"]
+
+
+def test_sin_ubicacion_va_al_final_por_codigo():
+    route = plan_route(parse_locations(_csv(_LAYOUT)))
+    items = pd.DataFrame({"CODIGO": ["Z", "B", "X", "A", "C"]})
+    out = sequence_items(items, route)
+    assert out["CODIGO"].tolist() == ["A", "C", "B", "X", "Z"]
+    assert out["ubicacion"].tolist() == ["P01-001", "P01-009", "P02-002", "", ""]
@@ -0,0 +1,18 @@
+from repository import _search_clause, normalize_search
+
+
+def test_numero_por_prefijo():
+    sql, params = _search_clause("1000", "h", fulltext=True)
+    assert sql.count("h.NUMERO BETWEEN") == len(params) // 2
+    assert params[:4] == [1000, 1000, 10000, 10009]
+
+
+def test_ceros_a_la_izquierda_se_buscan_tal_cual():
+    assert _search_clause("007", "h", fulltext=True) == ("CAST(h.NUMERO AS CHAR) LIKE %s", ["007%"])
+    assert _search_clause("0", "s", fulltext=False) == ("CAST(s.NUMERO AS CHAR) LIKE %s", ["0%"])
+
+
+def test_like_sin_fulltext_usa_el_alias():
+    sql, params = _search_clause(normalize_search("Dia  Sur"), "h", fulltext=False)
+    assert "s." not in sql and sql.count("h.") == 3
+    assert params == ["%dia sur%"] * 3
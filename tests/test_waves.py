@@ -0,0 +1,32 @@
+import pandas as pd
+
+from waves import consolidate, put_wall_slots, split_text
+
+
+def _items(rows):
+    return pd.DataFrame(rows, columns=["NUMERO", "CODIGO", "ItemName", "CANTIDAD", "PICKING"])
+
+
+def test_casilleros_en_orden_de_eleccion():
+    assert put_wall_slots([20, "10", 20, 30]) == {20: 1, 10: 2, 30: 3}
+
+
+def test_reparto_por_pedido():
+    slots = put_wall_slots([20, 10])
+    items = _items([
+        (10, "X", "Tornillo", 3, "Y"),
+        (20, "X", "Tornillo", 2, "N"),
+        (20, "Y", "Arandela", 1.5, "Y"),
+        (30, "X", "Tornillo", 7, "N"),  # fuera de la ola
+    ])
+    wave = consolidate(items, slots)
+    assert wave["CODIGO"].tolist() == ["X", "Y"]
+    assert wave["CANTIDAD"].tolist() == [5, 1.5]
+    assert wave["pedidos"].tolist() == [2, 1]
+    assert wave["reparto"].tolist() == [((1, 20, 2), (2, 10, 3)), ((1, 20, 1.5),)]
+    assert wave["picked"].tolist() == [False, True]
+    assert [split_text(r) for r in wave["reparto"]] == ["C1×2 · C2×3", "C1×1.5"]
+
+
+def test_ola_vacia():
+    assert consolidate(_items([]), {1: 1}).empty
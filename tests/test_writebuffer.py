@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from writebuffer import PickWriteBuffer
+
+
+class SlowRepo:
+    """update_picking_many que tarda hasta que el test lo suelta."""
+
+    def __init__(self, fail=False):
+        self.rows: dict[tuple[int, str], str] = {}
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+
+    def update_picking_many(self, items):
+        self.started.set()
+        assert self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("db caída")
+        for n, c, f in items:
+            self.rows[(n, c)] = f
+
+
+def test_flush_explicito_espera_al_volcado_de_fondo():
+    repo = SlowRepo()
+    buf = PickWriteBuffer(0.01, repo)
+    buf.put(7, "A", "Y")
+    assert repo.started.wait(5)  # el hilo de fondo tomó el lote y está escribiendo
+    assert buf.pending_for(7) == {"A": "Y"}
+
+    done = threading.Event()
+    t = threading.Thread(target=lambda: (buf.flush(7), done.set()))
+    t.start()
+    assert not done.wait(0.1)  # no vuelve mientras el lote de fondo no se confirmó
+    repo.release.set()
+    t.join(5)
+    assert done.is_set()
+    assert repo.rows == {(7, "A"): "Y"}
+    assert buf.pending_for(7) == {}
+
+
+def test_lote_fallido_no_pisa_un_toggle_mas_nuevo():
+    repo = SlowRepo(fail=True)
+    buf = PickWriteBuffer(3600, repo)
+    buf.put(7, "A", "Y")
+    buf.put(7, "B", "Y")
+    errors = []
+    t = threading.Thread(target=lambda: errors.append(pytest.raises(RuntimeError, buf.flush, 7)))
+    t.start()
+    assert repo.started.wait(5)
+    buf.put(7, "A", "N")  # llega mientras se escribe el lote viejo
+    repo.release.set()
+    t.join(5)
+    assert errors
+    assert buf.pending_for(7) == {"A": "N", "B": "Y"}
+
+    repo.fail = False
+    assert buf.flush(7) == 2
+    assert repo.rows == {(7, "A"): "N", (7, "B"): "Y"}
@@ -0,0 +1,49 @@
+"""
+Olas de picking: varios pedidos de un mismo picker en un solo recorrido.
+
+La lista consolidada suma CANTIDAD por CODIGO entre los pedidos de la ola y
+guarda el reparto para el put-wall: cada pedido recibe un casillero (1..N) y
+cada línea dice cuántas unidades van a cada uno.
+"""
+import pandas as pd
+
+from routing import sequence_items
+
+WAVE_COLUMNS = ["CODIGO", "ItemName", "CANTIDAD", "pedidos", "reparto", "picked", "ubicacion"]
+
+
+def put_wall_slots(numeros) -> dict[int, int]:
+    """Casillero del put-wall por pedido, en el orden en que se eligieron."""
+    return {int(n): i + 1 for i, n in enumerate(dict.fromkeys(int(n) for n in numeros))}
+
+
+def consolidate(items_df: pd.DataFrame, slots: dict[int, int], route: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Lista consolidada de la ola (WAVE_COLUMNS) a partir de las líneas de
+    todos sus pedidos. `reparto` es una tupla de (casillero, NUMERO, cantidad)
+    por casillero; `picked` es verdadero si la línea está en Y en todos los
+    pedidos. Con `route`, queda en el orden de la ruta.
+    """
+    if items_df.empty:
+        return pd.DataFrame(columns=WAVE_COLUMNS)
+    df = items_df[items_df["NUMERO"].isin(list(slots))].assign(
+        slot=lambda d: d["NUMERO"].map(slots),
+        y=lambda d: d["PICKING"].astype(str).str.upper().eq("Y"),
+    ).sort_values(["CODIGO", "slot"], kind="stable")
+    g = df.groupby("CODIGO", sort=True)
+    out = pd.DataFrame({
+        "ItemName": g["ItemName"].first(),
+        "CANTIDAD": g["CANTIDAD"].sum(),
+        "pedidos": g["NUMERO"].nunique(),
+        "reparto": pd.Series({k: tuple(zip(x["slot"], x["NUMERO"].astype(int), x["CANTIDAD"]))
+                              for k, x in g[["slot", "NUMERO", "CANTIDAD"]]}),
+        "picked": g["y"].all(),
+    }).rename_axis("CODIGO").reset_index()
+    return sequence_items(out, route)[WAVE_COLUMNS]
+
+
+def split_text(reparto) -> str:
+    """Reparto para mostrar: "C1×3 · C4×1" (casillero × cantidad)."""
+    def qty(c):
+        return str(int(c)) if float(c).is_integer() else str(c)
+    return " · ".join(f"C{slot}×{qty(c)}" for slot, _, c in reparto)
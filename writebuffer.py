@@ -0,0 +1,84 @@
+"""
+Write-behind de los toggles de "Picking".
+
+Un solo buffer por proceso guarda el último estado por (NUMERO, CODIGO) y un
+hilo de fondo lo vuelca cada `window` segundos con repo.update_picking_many
+(un executemany por ventana). Los volcados van de a uno (`_flush_lock`
+tomado durante la escritura): cuando flush(numero) vuelve, todo lo anotado
+antes para ese pedido ya está en la DB, y un lote viejo nunca se escribe
+después de uno más nuevo.
+"""
+import atexit
+import logging
+import threading
+import time
+
+log = logging.getLogger("picking.writebuffer")
+
+
+class PickWriteBuffer:
+    """
+    Buffer compartido por el proceso para los toggles de "Picking". Tocar dos
+    veces el mismo SKU deja una sola escritura; si un volcado falla, el lote
+    vuelve a la cola salvo las claves que recibieron un toggle más nuevo.
+    """
+
+    def __init__(self, window: float, repo):
+        self.window = window
+        self._repo = repo
+        self._pending: dict[tuple[int, str], str] = {}
+        self._inflight: dict[tuple[int, str], str] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="pick-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self._flush_quietly)
+
+    def put(self, numero: int, codigo: str, flag: str):
+        with self._lock:
+            self._pending[(int(numero), str(codigo))] = flag
+
+    def pending_for(self, numero: int) -> dict[str, str]:
+        """Lo anotado y todavía no confirmado en la DB para un pedido (incluye el lote en curso)."""
+        with self._lock:
+            both = {**self._inflight, **self._pending}
+        return {c: f for (n, c), f in both.items() if n == int(numero)}
+
+    def flush(self, numero: int | None = None) -> int:
+        """
+        Vuelca lo pendiente (todo, o solo un pedido) y devuelve las líneas
+        escritas. Si hay otro volcado en curso, lo espera antes de tomar el lote.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if numero is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {k: v for k, v in self._pending.items() if k[0] == int(numero)}
+                    for k in batch:
+                        del self._pending[k]
+                self._inflight = batch
+            if not batch:
+                return 0
+            try:
+                self._repo.update_picking_many([(n, c, f) for (n, c), f in batch.items()])
+            except Exception:
+                with self._lock:
+                    # lo que entró a _pending durante la escritura es más nuevo: gana eso
+                    self._pending = {**batch, **self._pending}
+                raise
+            finally:
+                with self._lock:
+                    self._inflight = {}
+            return len(batch)
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            log.warning("No se pudo volcar el buffer de picking; se reintenta en la próxima ventana", exc_info=True)
+
+    def _run(self):
+        while True:
+            time.sleep(self.window)
+            self._flush_quietly()